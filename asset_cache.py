@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Asset Cache
+Persistent, content-addressed store for downloaded clips and generated audio
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are then only serialized per process
+    fcntl = None
+
+# Defaults for the optional "cache" block in config.json
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": True,
+    "dir": ".asset_cache",
+    "max_size_mb": 5120
+}
+
+INDEX_VERSION = 1
+
+# Cache hits between index writes; recency from unflushed hits is only
+# approximate, which LRU eviction tolerates
+FLUSH_EVERY = 64
+
+# Objects used (by any process) this recently are never evicted
+IN_USE_SECONDS = 600
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def clip_key(url):
+    """Cache key for a stock clip (Pexels file links are stable per rendition)"""
+    return 'clip:' + _digest(url)
+
+
+def voiceover_key(voice_id, model_id, voice_settings, text):
+    """Cache key for a narration: same voice, model, settings and text = same audio"""
+    payload = json.dumps({
+        'voice_id': voice_id,
+        'model_id': model_id,
+        'voice_settings': voice_settings,
+        'text': _digest(text)
+    }, sort_keys=True)
+    return 'tts:' + _digest(payload)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class AssetCache:
+    """
+    Keys map to objects stored under their content digest, so identical bytes
+    fetched under different keys are kept once. The index (key -> object) is
+    an ordered dict, oldest-used first, giving O(1) lookups and cheap LRU
+    eviction when the size budget is exceeded.
+
+    Lookups only touch memory (and the object's mtime); the index is written
+    on put and every FLUSH_EVERY hits. Every write reloads the index from
+    disk and merges it under a file lock, so batch workers, the scheduler
+    and other processes sharing the directory keep each other's entries.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.index_path = self.root / 'index.json'
+        self.lock_path = self.root / 'index.lock'
+        self.max_bytes = max_bytes
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._index = self._read_index()
+        # Keys dropped since the last flush, with the object each one named
+        self._dropped = {}
+        self._dirty = 0
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_config(cls, settings=None):
+        """Build a cache from the config "cache" block, or None if disabled"""
+        merged = dict(DEFAULT_CACHE_SETTINGS)
+        merged.update(settings or {})
+        if not merged['enabled']:
+            return None
+        return cls(merged['dir'], int(merged['max_size_mb']) * 1024 * 1024)
+
+    def _read_index(self):
+        """The index on disk, oldest-used first, without entries whose object is gone"""
+        index = OrderedDict()
+        if not self.index_path.exists():
+            return index
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️  Asset cache index unreadable, starting empty: {self.index_path}")
+            return index
+        if data.get('version') != INDEX_VERSION:
+            return index
+        for key, entry in sorted(data.get('entries', []), key=lambda item: item[1]['last_used']):
+            if (self.objects_dir / entry['object']).exists():
+                index[key] = entry
+        return index
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize index writes (and object deletion) across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _merge(self, disk):
+        """
+        Combine the index on disk with this process's view: the most recent
+        use of each key wins, and keys either side dropped stay dropped
+
+        Returns:
+            Names of objects that lost their key in the merge
+        """
+        stale = set()
+        merged = {}
+        for key, entry in disk.items():
+            if self._dropped.get(key) != entry['object']:
+                merged[key] = entry
+        for key, entry in self._index.items():
+            other = merged.get(key)
+            if other is None:
+                # Every put is flushed, so a key missing on disk was evicted
+                # elsewhere, unless its object is still there
+                if key in disk or (self.objects_dir / entry['object']).exists():
+                    merged[key] = entry
+            elif entry['last_used'] >= other['last_used']:
+                if other['object'] != entry['object']:
+                    stale.add(other['object'])
+                merged[key] = entry
+            elif other['object'] != entry['object']:
+                stale.add(entry['object'])
+        self._index = OrderedDict(sorted(merged.items(), key=lambda item: item[1]['last_used']))
+        return stale
+
+    def _flush(self, protect=None):
+        """Merge with the index on disk, evict over budget and write it back"""
+        with self._file_lock():
+            self._flush_locked(protect)
+
+    def _flush_locked(self, protect=None):
+        stale = self._merge(self._read_index())
+        self._evict(protect)
+        stale.update(self._dropped.values())
+        referenced = {entry['object'] for entry in self._index.values()}
+        for name in stale - referenced:
+            (self.objects_dir / name).unlink(missing_ok=True)
+            # Sidecars such as cached loudness stats go with their object
+            for sidecar in self.objects_dir.glob(f"{name}.*.json"):
+                sidecar.unlink(missing_ok=True)
+        self._save_index()
+        self._dropped = {}
+        self._dirty = 0
+
+    def flush(self):
+        """Write pending LRU updates (also done at exit)"""
+        with self._lock:
+            if self._dirty or self._dropped:
+                self._flush()
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': list(self._index.items())}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def total_bytes(self):
+        """Bytes currently held by unique objects"""
+        with self._lock:
+            return self._objects_size()
+
+    def _objects_size(self):
+        sizes = {}
+        for entry in self._index.values():
+            sizes[entry['object']] = entry['size']
+        return sum(sizes.values())
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            path = self.objects_dir / entry['object']
+            try:
+                # The mtime tells other processes the object is in use
+                os.utime(path)
+            except FileNotFoundError:
+                self._drop(key)
+                return None
+            entry['last_used'] = time.time()
+            self._index.move_to_end(key)
+            self._dirty += 1
+            if self._dirty >= FLUSH_EVERY:
+                self._flush()
+            return path
+
+    def put(self, key, src_path, meta=None):
+        """
+        Move src_path into the cache under key
+
+        Returns:
+            Path of the cached object (use it in place of src_path)
+        """
+        src_path = Path(src_path)
+        object_name = file_digest(src_path) + src_path.suffix
+        object_path = self.objects_dir / object_name
+
+        with self._lock, self._file_lock():
+            if object_path.exists():
+                src_path.unlink()
+                os.utime(object_path)
+            else:
+                tmp_path = object_path.with_name(f"{object_name}.{os.getpid()}.tmp")
+                shutil.move(str(src_path), str(tmp_path))
+                os.replace(tmp_path, object_path)
+
+            if key in self._index:
+                self._drop(key)
+            self._index[key] = {
+                'object': object_name,
+                'size': object_path.stat().st_size,
+                'last_used': time.time(),
+                'meta': meta or {}
+            }
+            self._flush_locked(protect=key)
+            return object_path
+
+    def _drop(self, key):
+        """Forget key; its object is deleted on flush if nothing else names it"""
+        entry = self._index.pop(key)
+        self._dropped[key] = entry['object']
+
+    def _last_use(self, entry):
+        try:
+            mtime = (self.objects_dir / entry['object']).stat().st_mtime
+        except OSError:
+            mtime = 0
+        return max(entry['last_used'], mtime)
+
+    def _evict(self, protect=None):
+        """
+        Drop least-recently-used entries until the size budget is met,
+        sparing objects any process has used in the last IN_USE_SECONDS
+        """
+        total = self._objects_size()
+        if total <= self.max_bytes:
+            return
+        now = time.time()
+        names = Counter(entry['object'] for entry in self._index.values())
+        last_use = {key: self._last_use(entry) for key, entry in self._index.items()}
+        for key in sorted(last_use, key=last_use.get):
+            if total <= self.max_bytes or now - last_use[key] < IN_USE_SECONDS:
+                break
+            if key == protect:
+                continue
+            entry = self._index[key]
+            self._drop(key)
+            names[entry['object']] -= 1
+            if not names[entry['object']]:
+                total -= entry['size']
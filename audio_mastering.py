@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Audio Mastering
+Loudness analysis cached next to each audio asset, and the filtergraph that
+normalizes the voiceover, lays a music bed under it and ducks the music
+while the voice speaks, all inside the FFmpeg command that renders the video
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import subprocess
+from pathlib import Path
+
+# Defaults for the optional "audio" block in config.json
+DEFAULT_AUDIO_SETTINGS = {
+    "enabled": True,
+    # EBU R128 targets; YouTube plays back at about -14 LUFS
+    "target_lufs": -14.0,
+    "true_peak": -1.5,
+    "lra": 11.0,
+    "sample_rate": 48000,
+    "bitrate": "192k",
+    # Background music: a file, or a directory to pick a track from per
+    # video (None = voice only)
+    "music": None,
+    # Loudness of the music bed relative to the voice target
+    "music_level_lu": -18.0,
+    "music_fade_seconds": 2.0,
+    # Sidechain compression of the music, keyed by the voice
+    "ducking": True,
+    "duck_threshold": 0.02,
+    "duck_ratio": 8.0,
+    "duck_attack_ms": 20,
+    "duck_release_ms": 400
+}
+
+MUSIC_SUFFIXES = ('.mp3', '.m4a', '.aac', '.wav', '.flac', '.ogg', '.opus')
+
+LOUDNESS_FIELDS = ('input_i', 'input_tp', 'input_lra', 'input_thresh', 'target_offset')
+
+
+def _targets(settings):
+    return [float(settings['target_lufs']), float(settings['true_peak']), float(settings['lra'])]
+
+
+def sidecar_path(audio_path):
+    """Where an asset's loudness stats are cached (<file>.loudness.json)"""
+    return Path(f"{audio_path}.loudness.json")
+
+
+def measure_loudness(audio_path, settings=None):
+    """
+    Run the loudnorm analysis pass over a file
+
+    Returns:
+        Dict of input_i, input_tp, input_lra, input_thresh and target_offset,
+        or None if FFmpeg failed or the file is silent
+    """
+    merged = dict(DEFAULT_AUDIO_SETTINGS)
+    merged.update(settings or {})
+    target_i, true_peak, lra = _targets(merged)
+    cmd = [
+        'ffmpeg', '-hide_banner', '-nostats', '-i', str(audio_path), '-vn',
+        '-af', f'loudnorm=I={target_i}:TP={true_peak}:LRA={lra}:print_format=json',
+        '-f', 'null', '-'
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"⚠️  Loudness analysis failed for {audio_path}: {e}")
+        return None
+
+    # loudnorm prints the stats to stderr as a JSON object
+    blocks = re.findall(r'\{[^{}]*"input_i"[^{}]*\}', result.stderr.decode('utf-8', 'replace'))
+    try:
+        report = json.loads(blocks[-1])
+        stats = {field: float(report[field]) for field in LOUDNESS_FIELDS}
+    except (IndexError, KeyError, ValueError):
+        print(f"⚠️  Unreadable loudness analysis for {audio_path}")
+        return None
+    if not all(math.isfinite(value) for value in stats.values()):
+        return None
+    return stats
+
+
+def loudness_stats(audio_path, settings=None):
+    """
+    Loudness stats for a file, measured once and cached in a sidecar
+
+    The sidecar records the file size and mtime and the targets it was
+    measured for, so a rewritten file or new targets trigger a fresh pass.
+
+    Returns:
+        Stats dict (see measure_loudness), or None
+    """
+    merged = dict(DEFAULT_AUDIO_SETTINGS)
+    merged.update(settings or {})
+    audio_path = Path(audio_path)
+    stat = audio_path.stat()
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'targets': _targets(merged)}
+
+    sidecar = sidecar_path(audio_path)
+    try:
+        with open(sidecar, 'r') as f:
+            cached = json.load(f)
+        if cached.get('signature') == signature:
+            return cached['stats']
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    stats = measure_loudness(audio_path, merged)
+    if stats is not None:
+        tmp_path = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'signature': signature, 'stats': stats}, f)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            print(f"⚠️  Could not cache loudness stats for {audio_path}: {e}")
+    return stats
+
+
+def pick_music(music, seed):
+    """
+    The music track for one video: the configured file, or a track from
+    the configured directory chosen by seed (so a retried job keeps its track)
+
+    Returns:
+        Path, or None if no music is configured or none was found
+    """
+    if not music:
+        return None
+    music = Path(music)
+    if music.is_file():
+        return music
+    if not music.is_dir():
+        print(f"⚠️  Background music not found: {music}")
+        return None
+    tracks = sorted(path for path in music.iterdir()
+                    if path.suffix.lower() in MUSIC_SUFFIXES)
+    if not tracks:
+        print(f"⚠️  No music tracks in {music}")
+        return None
+    index = int(hashlib.sha256(str(seed).encode('utf-8')).hexdigest(), 16) % len(tracks)
+    return tracks[index]
+
+
+def plan_mastering(audio_path, settings=None):
+    """
+    Everything the render needs to master one voiceover: the settings,
+    the voice's loudness stats and the music track with its stats
+
+    Measuring is the only pass over the audio outside the render, and it
+    is skipped whenever the sidecars are current. The plan is plain JSON,
+    so it can travel in a render queue manifest.
+
+    Returns:
+        Plan dict, or None if mastering is disabled
+    """
+    merged = dict(DEFAULT_AUDIO_SETTINGS)
+    merged.update(settings or {})
+    if not merged['enabled']:
+        return None
+    plan = dict(merged)
+    plan['voice'] = loudness_stats(audio_path, merged)
+    music = pick_music(merged['music'], Path(audio_path).name)
+    plan['music'] = str(music) if music else None
+    plan['music_stats'] = loudness_stats(music, merged) if music else None
+    return plan
+
+
+def _voice_filter(plan):
+    """
+    loudnorm for the voice: linear (a constant gain) with the cached stats,
+    which loudnorm itself turns dynamic only if that gain would push the
+    peaks over the true-peak limit; single-pass dynamic without stats
+    """
+    target_i, true_peak, lra = _targets(plan)
+    text = f'loudnorm=I={target_i}:TP={true_peak}:LRA={lra}'
+    stats = plan.get('voice')
+    if stats:
+        text += (f":measured_I={stats['input_i']}:measured_TP={stats['input_tp']}"
+                 f":measured_LRA={stats['input_lra']}:measured_thresh={stats['input_thresh']}"
+                 f":offset={stats['target_offset']}:linear=true")
+    return text + ':print_format=none'
+
+
+def _music_gain(plan):
+    """dB that brings the music track to its level under the voice target"""
+    stats = plan.get('music_stats')
+    target = float(plan['target_lufs']) + float(plan['music_level_lu'])
+    if not stats:
+        # Unmeasured: assume a typical mastered track at about -14 LUFS
+        return target + 14.0
+    return target - stats['input_i']
+
+
+def audio_filtergraph(voice_input, music_input, plan, duration, count=1):
+    """
+    Filtergraph that masters the voiceover (and mixes the music bed)
+
+    Args:
+        voice_input: Input index of the voiceover
+        music_input: Input index of the music (opened with -stream_loop -1),
+            or None for voice only
+        count: Number of outputs; the mastered audio is split to each
+
+    Returns:
+        Filtergraph text with output k's audio labelled [aout<k>]
+    """
+    rate = int(plan['sample_rate'])
+    outs = ''.join(f'[aout{k}]' for k in range(count))
+    split = f',asplit={count}{outs}' if count > 1 else outs
+    voice = f'[{voice_input}:a]{_voice_filter(plan)}'
+
+    if music_input is None:
+        return f'{voice},aresample={rate}{split}'
+
+    stereo = f'aformat=sample_rates={rate}:channel_layouts=stereo'
+    fade = min(float(plan['music_fade_seconds']), duration / 2)
+    bed = f'[{music_input}:a]volume={_music_gain(plan):.2f}dB,{stereo}'
+    if fade > 0:
+        bed += f',afade=t=in:d={fade:.3f},afade=t=out:st={duration - fade:.3f}:d={fade:.3f}'
+    true_peak = 10 ** (float(plan['true_peak']) / 20)
+    mix = (f'amix=inputs=2:duration=first:dropout_transition=0:normalize=0,'
+           f'alimiter=limit={true_peak:.4f}:level=false')
+
+    if not plan['ducking']:
+        return ';'.join([f'{voice},{stereo}[voice]', f'{bed}[bed]',
+                         f'[voice][bed]{mix}{split}'])
+    return ';'.join([
+        f'{voice},{stereo},asplit=2[voice][key]',
+        f'{bed}[bed]',
+        (f"[bed][key]sidechaincompress=threshold={plan['duck_threshold']}"
+         f":ratio={plan['duck_ratio']}:attack={plan['duck_attack_ms']}"
+         f":release={plan['duck_release_ms']}[ducked]"),
+        f'[voice][ducked]{mix}{split}'
+    ])
+
+
+def audio_codec_args(plan=None):
+    """AAC settings for mastered audio (FFmpeg defaults without a plan)"""
+    if not plan:
+        return ['-c:a', 'aac']
+    return ['-c:a', 'aac', '-b:a', str(plan['bitrate']), '-ar', str(int(plan['sample_rate']))]
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Batch Runner
+Generates many videos from a topic list with a pipelined stage executor
+"""
+
+import queue
+import threading
+import time
+
+from instrumentation import METRICS
+
+STAGES = ['script', 'voiceover', 'footage', 'download', 'render', 'upload']
+
+# Job dict key each stage fills in
+STAGE_OUTPUTS = {
+    'script': 'script_data',
+    'voiceover': 'audio_path',
+    'footage': 'video_urls',
+    'download': 'video_files',
+    'render': 'video_path',
+    'upload': 'video_url'
+}
+
+# Defaults for the optional "batch" block in config.json
+DEFAULT_BATCH_SETTINGS = {
+    "queue_size": 2,
+    "workers": {
+        "script": 2,
+        "voiceover": 2,
+        "footage": 2,
+        "download": 2,
+        "render": 1,
+        "upload": 1
+    }
+}
+
+_DONE = object()
+
+
+def read_topics(topics_file):
+    """Read one topic per line, skipping blank lines and # comments"""
+    topics = []
+    with open(topics_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                topics.append(line)
+    return topics
+
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.busy_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self.lock:
+            self.busy_seconds += seconds
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+
+class PipelineExecutor:
+    """
+    Runs jobs through a chain of stages, each backed by its own pool of
+    worker threads. Stages are linked by bounded queues, so a fast stage
+    can only run queue_size jobs ahead of a slow one, while network-bound
+    stages keep working on later jobs during earlier jobs' renders.
+    """
+
+    def __init__(self, stages, queue_size=2):
+        # stages: list of (name, func, workers); func(job) -> truthy on success
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = [StageStats(name, max(1, workers)) for name, _, workers in stages]
+
+    def run(self, jobs):
+        """Push every job through the pipeline and return (finished, failed)"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        queues.append(queue.Queue())
+        failed = []
+        failed_lock = threading.Lock()
+        threads = []
+
+        for position, (name, func, workers) in enumerate(self.stages):
+            workers = max(1, workers)
+            inbox, outbox = queues[position], queues[position + 1]
+            stats = self.stats[position]
+            remaining = {'workers': workers}
+            remaining_lock = threading.Lock()
+
+            def worker(name=name, func=func, inbox=inbox, outbox=outbox, stats=stats,
+                       remaining=remaining, remaining_lock=remaining_lock):
+                while True:
+                    job = inbox.get()
+                    if job is _DONE:
+                        # Let sibling workers see the sentinel too; the last
+                        # one out passes it downstream
+                        inbox.put(_DONE)
+                        with remaining_lock:
+                            remaining['workers'] -= 1
+                            last = remaining['workers'] == 0
+                        if last:
+                            outbox.put(_DONE)
+                        return
+
+                    started = time.monotonic()
+                    try:
+                        ok = bool(func(job))
+                    except Exception as e:
+                        job['error'] = f"{name}: {e}"
+                        ok = False
+                    stats.record(time.monotonic() - started, ok)
+
+                    if ok:
+                        outbox.put(job)
+                    else:
+                        job.setdefault('error', f"{name} stage failed")
+                        job['failed_stage'] = name
+                        with failed_lock:
+                            failed.append(job)
+
+            for _ in range(workers):
+                thread = threading.Thread(target=worker, name=f"batch-{name}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        feeder = threading.Thread(target=self._feed, args=(queues[0], jobs), daemon=True)
+        feeder.start()
+
+        finished = []
+        while True:
+            job = queues[-1].get()
+            if job is _DONE:
+                break
+            finished.append(job)
+
+        for thread in threads:
+            thread.join()
+        return finished, failed
+
+    @staticmethod
+    def _feed(inbox, jobs):
+        for job in jobs:
+            inbox.put(job)
+        inbox.put(_DONE)
+
+
+def run_stage(automation, stage, job, upload=False):
+    """
+    Run one pipeline stage for a job dict, storing its output on the job
+
+    Returns:
+        Truthy if the stage succeeded and the job can move on
+    """
+    METRICS.set_job(job.get('index'))
+    if stage in ('voiceover', 'download', 'render') and 'workspace' not in job:
+        job['workspace'] = automation.workspaces.create(job.get('workspace_name'))
+    if stage == 'script':
+        job['script_data'] = automation.generate_script(job['topic'], prompt=False)
+        return job['script_data']
+
+    if stage == 'voiceover':
+        job['audio_path'] = automation.generate_voiceover(job['script_data']['script'],
+                                                     job['workspace'])
+        return job['audio_path']
+
+    if stage == 'footage':
+        script_data = job['script_data']
+        job['video_urls'] = automation.fetch_stock_footage(
+            script_data['keywords'], automation.estimate_duration(script_data['script']))
+        return True
+
+    if stage == 'download':
+        urls = job['video_urls']
+        job['video_files'] = automation.download_videos(urls, job['workspace']) if urls else []
+        return True
+
+    if stage == 'render':
+        job['video_path'] = automation.create_video(
+            job['audio_path'], job['video_files'], job['script_data'], job['workspace'])
+        if job['video_path']:
+            # The published video is all later stages need
+            job.pop('workspace').cleanup()
+        return job['video_path']
+
+    if stage == 'upload':
+        if upload:
+            job['video_url'] = automation.upload_to_youtube(
+                job['video_path'], job['script_data'], publish_at=job.get('publish_at'))
+            return job['video_url']
+        job['video_url'] = None
+        return True
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_batch(automation, topics, upload=False, settings=None):
+    """
+    Generate one video per topic without any interactive prompts
+
+    Args:
+        automation: YouTubeAutomation instance
+        topics: List of topic strings
+        upload: Upload each finished video to YouTube
+        settings: Overrides for DEFAULT_BATCH_SETTINGS
+
+    Returns:
+        Report dict with per-job results, throughput and stage utilization
+    """
+    merged = dict(DEFAULT_BATCH_SETTINGS)
+    merged.update(settings or {})
+    workers = dict(DEFAULT_BATCH_SETTINGS['workers'])
+    workers.update(merged.get('workers') or {})
+
+    def stage_func(name):
+        return lambda job: run_stage(automation, name, job, upload)
+
+    stages = [(name, stage_func(name), int(workers[name])) for name in STAGES]
+    executor = PipelineExecutor(stages, queue_size=int(merged['queue_size']))
+
+    jobs = [{'index': i, 'topic': topic} for i, topic in enumerate(topics)]
+    print("=" * 60)
+    print(f"🤖 BATCH STARTED: {len(jobs)} topics")
+    print("=" * 60)
+
+    automation.workspaces.maybe_collect()
+    started = time.monotonic()
+    finished, failed = executor.run(jobs)
+    wall_seconds = time.monotonic() - started
+    for job in failed:
+        if 'workspace' in job:
+            job.pop('workspace').cleanup(failed=True)
+
+    report = {
+        'total': len(jobs),
+        'succeeded': len(finished),
+        'failed': len(failed),
+        'wall_seconds': wall_seconds,
+        'videos_per_hour': len(finished) * 3600.0 / wall_seconds if wall_seconds > 0 else 0.0,
+        'stages': [
+            {
+                'stage': stats.name,
+                'workers': stats.workers,
+                'completed': stats.completed,
+                'failed': stats.failed,
+                'busy_seconds': stats.busy_seconds,
+                'utilization': (stats.busy_seconds / (wall_seconds * stats.workers)
+                                if wall_seconds > 0 else 0.0)
+            }
+            for stats in executor.stats
+        ],
+        'jobs': sorted(finished + failed, key=lambda job: job['index'])
+    }
+    print_report(report)
+    return report
+
+
+def print_report(report):
+    """Print a human-readable batch summary"""
+    print("\n" + "=" * 60)
+    print("📊 BATCH SUMMARY")
+    print("=" * 60)
+    print(f"   Videos: {report['succeeded']}/{report['total']} succeeded, {report['failed']} failed")
+    print(f"   Wall time: {report['wall_seconds']:.1f}s")
+    print(f"   Throughput: {report['videos_per_hour']:.1f} videos/hour")
+    print("\n   Stage        Workers  Done  Failed  Busy(s)  Utilization")
+    for stage in report['stages']:
+        print(f"   {stage['stage']:<12} {stage['workers']:>7}  {stage['completed']:>4}  "
+              f"{stage['failed']:>6}  {stage['busy_seconds']:>7.1f}  {stage['utilization']:>10.0%}")
+    for job in report['jobs']:
+        if job.get('error'):
+            print(f"   ❌ {job['topic']}: {job['error']}")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Encoder Profile Benchmark
+Compares render wall time and output size across encoder profiles and
+parallel segment counts, using synthetic lavfi test sources
+
+Usage:
+    python benchmarks/encoder_profiles.py [--duration 60] [--segments 1 4] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from video_renderer import ENCODER_PROFILES, render_video  # noqa: E402
+
+# Mixed sizes/rates, like real Pexels results
+SOURCES = [
+    ('testsrc2=s=3840x2160:r=30', 8),
+    ('mandelbrot=s=1920x1080:r=25', 8),
+    ('testsrc=s=1280x720:r=60', 8),
+    ('smptehdbars=s=2560x1440:r=24', 8)
+]
+
+
+def make_sources(workdir, duration):
+    """Encode the synthetic clips and a voiceover-length sine tone"""
+    clips = []
+    for i, (source, seconds) in enumerate(SOURCES):
+        path = workdir / f'clip_{i}.mp4'
+        subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                        '-f', 'lavfi', '-t', str(seconds), '-i', source,
+                        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+                        str(path)], check=True)
+        clips.append((path, float(seconds)))
+
+    audio = workdir / 'voiceover.mp3'
+    subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                    '-f', 'lavfi', '-i', f'sine=frequency=220:d={duration}',
+                    '-c:a', 'libmp3lame', str(audio)], check=True)
+    return clips, audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=60, help="Output length in seconds")
+    parser.add_argument('--resolution', default='1920x1080')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--profiles', nargs='+', default=list(ENCODER_PROFILES))
+    parser.add_argument('--segments', nargs='+', type=int, default=[1, os.cpu_count() or 1])
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='encoder_bench_') as tmp:
+        workdir = Path(tmp)
+        print("🎞️  Generating synthetic sources...")
+        clips, audio = make_sources(workdir, args.duration)
+        clip_paths = [path for path, _ in clips]
+        clip_durations = [seconds for _, seconds in clips]
+
+        print(f"\n   {'Profile':<10} {'Segments':>8} {'Wall(s)':>8} {'Size(MB)':>9} {'x realtime':>11}")
+        for profile in args.profiles:
+            for segments in args.segments:
+                output = workdir / f'out_{profile}_{segments}.mp4'
+                started = time.monotonic()
+                encodes = render_video(
+                    audio, clip_paths, output, args.duration,
+                    resolution=args.resolution, fps=args.fps,
+                    settings={'profile': profile, 'parallel_segments': segments,
+                              'min_segment_seconds': 1},
+                    clip_durations=clip_durations)
+                wall = time.monotonic() - started
+                size = output.stat().st_size
+                results.append({
+                    'profile': profile,
+                    'segments': encodes,
+                    'wall_seconds': round(wall, 3),
+                    'size_bytes': size,
+                    'realtime_factor': round(args.duration / wall, 2)
+                })
+                print(f"   {profile:<10} {encodes:>8} {wall:>8.1f} {size / 1e6:>9.2f} "
+                      f"{args.duration / wall:>10.2f}x")
+                output.unlink()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'duration': args.duration,
+                'resolution': args.resolution,
+                'fps': args.fps,
+                'cpu_count': os.cpu_count(),
+                'results': results
+            }, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Fake Services
+Local stand-ins for the Anthropic Messages and Message Batches, ElevenLabs,
+Pexels and YouTube resumable upload and thumbnail endpoints, with configurable
+latency, bandwidth, error rate, rate limiting (429), truncated clip downloads
+and YouTube API quota
+"""
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Units the fake YouTube API charges per call, as the real one does
+QUOTA_COSTS = {'videos.insert': 1600, 'thumbnails.set': 50}
+
+# Canned narration: long enough to pass script validation (150-200 words)
+NARRATION_WORDS = (
+    "Most people never notice how much a single habit shapes the rest of their day. "
+    "Small routines compound quietly, and after a few weeks the difference is hard to miss. "
+).split()
+
+
+class FakeServiceState:
+    """Media served by the fakes and the injected network conditions"""
+
+    def __init__(self, audio_path, clip_paths, latency=0.0, bandwidth=None, error_rate=0.0,
+                 quota_units=None, throttle_rate=0.0, truncate_rate=0.0, batch_seconds=1.0):
+        self.audio = Path(audio_path).read_bytes()
+        self.clips = {path.name: path for path in map(Path, clip_paths)}
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        # Fraction of Claude, Pexels search and clip requests answered 429
+        self.throttle_rate = throttle_rate
+        # Fraction of clip downloads cut off halfway (connection dropped)
+        self.truncate_rate = truncate_rate
+        # How long a Message Batch stays in_progress
+        self.batch_seconds = batch_seconds
+        self.batches = {}
+        # None = unlimited; otherwise calls past this many units get a 403
+        self.quota_units = quota_units
+        self.quota_used = 0
+        self.uploads = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def count(self, service):
+        with self.lock:
+            self.counts[service] = self.counts.get(service, 0) + 1
+
+    def charge(self, operation):
+        """Spend quota for one call; False if the daily quota would be exceeded"""
+        with self.lock:
+            cost = QUOTA_COSTS[operation]
+            if self.quota_units is not None and self.quota_used + cost > self.quota_units:
+                self.counts['quota_rejected'] = self.counts.get('quota_rejected', 0) + 1
+                return False
+            self.quota_used += cost
+            return True
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, *args):
+        pass
+
+    # --- helpers ---------------------------------------------------------
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length else b''
+        self._throttle(len(data))
+        return data
+
+    def _throttle(self, size):
+        if self.state.bandwidth:
+            time.sleep(size / self.state.bandwidth)
+
+    def _fail(self, throttle=False):
+        """
+        Simulate latency, then maybe answer 503 (or, for rate-limited
+        services, 429 with Retry-After) instead of the real response
+        """
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.error_rate and random.random() < self.state.error_rate:
+            self.state.count('errors')
+            self._send(503, b'{"error": "injected failure"}')
+            return True
+        if throttle and self.state.throttle_rate and random.random() < self.state.throttle_rate:
+            self.state.count('throttled')
+            self._send(429, b'{"error": {"type": "rate_limit_error"}}',
+                       headers={'Retry-After': '1'})
+            return True
+        return False
+
+    def _send(self, status, data=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self._write(data)
+
+    def _write(self, data, chunk_size=64 * 1024):
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i + chunk_size]
+            self._throttle(len(chunk))
+            self.wfile.write(chunk)
+
+    def _json(self, obj, status=200, headers=None):
+        self._send(status, json.dumps(obj).encode('utf-8'), headers=headers)
+
+    def _quota_exceeded(self):
+        self._json({"error": {"code": 403, "message": "The request cannot be completed because "
+                              "you have exceeded your quota.",
+                              "errors": [{"reason": "quotaExceeded",
+                                          "domain": "youtube.quota"}]}}, status=403)
+
+    # --- routing ---------------------------------------------------------
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        match = re.match(r'^/v1/messages/batches/([\w-]+)(/results)?$', path)
+        if match:
+            return self._batch_results(match.group(1)) if match.group(2) \
+                else self._batch_status(match.group(1))
+        if path == '/videos/search':
+            return self._pexels_search()
+        if path.startswith('/clips/'):
+            return self._clip(path.rsplit('/', 1)[1])
+        self._send(404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == '/v1/messages':
+            return self._anthropic()
+        if path == '/v1/messages/batches':
+            return self._batch_create()
+        if path.startswith('/v1/text-to-speech/'):
+            return self._tts()
+        if path == '/upload/youtube/v3/videos':
+            return self._upload_start()
+        if path == '/upload/youtube/v3/thumbnails/set':
+            return self._thumbnail()
+        self._body()
+        self._send(404)
+
+    def do_PUT(self):
+        path = urlparse(self.path).path
+        if path.startswith('/upload/session/'):
+            return self._upload_chunk(path.rsplit('/', 1)[1])
+        self._body()
+        self._send(404)
+
+    # --- services --------------------------------------------------------
+
+    def _anthropic(self):
+        request = json.loads(self._body() or b'{}')
+        self.state.count('anthropic')
+        if self._fail(throttle=True):
+            return
+        self._json(_script_message(request))
+
+    def _batch_create(self):
+        request = json.loads(self._body() or b'{}')
+        self.state.count('anthropic_batch')
+        if self._fail(throttle=True):
+            return
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:16]}"
+        with self.state.lock:
+            self.state.batches[batch_id] = {
+                'created': time.time(),
+                'results': [{"custom_id": entry['custom_id'],
+                             "result": {"type": "succeeded",
+                                        "message": _script_message(entry['params'])}}
+                            for entry in request.get('requests', [])]
+            }
+        self._json(self._batch_object(batch_id))
+
+    def _batch_object(self, batch_id):
+        batch = self.state.batches[batch_id]
+        created = datetime.fromtimestamp(batch['created'], timezone.utc)
+        ended = time.time() >= batch['created'] + self.state.batch_seconds
+        count = len(batch['results'])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else count,
+                               "succeeded": count if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": created.isoformat(),
+            "expires_at": (created + timedelta(hours=24)).isoformat(),
+            "ended_at": (created + timedelta(seconds=self.state.batch_seconds)).isoformat()
+            if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": (f"http://{self.headers['Host']}/v1/messages/batches/"
+                            f"{batch_id}/results") if ended else None
+        }
+
+    def _batch_status(self, batch_id):
+        self.state.count('anthropic_batch')
+        if batch_id not in self.state.batches:
+            return self._send(404)
+        if self._fail(throttle=True):
+            return
+        self._json(self._batch_object(batch_id))
+
+    def _batch_results(self, batch_id):
+        self.state.count('anthropic_batch')
+        batch = self.state.batches.get(batch_id)
+        if batch is None:
+            return self._send(404)
+        data = ''.join(json.dumps(line) + '\n' for line in batch['results']).encode('utf-8')
+        self._send(200, data, content_type='application/binary')
+
+    def _tts(self):
+        self._body()
+        self.state.count('elevenlabs')
+        if self._fail():
+            return
+        self._send(200, self.state.audio, content_type='audio/mpeg')
+
+    def _pexels_search(self):
+        self.state.count('pexels')
+        if self._fail(throttle=True):
+            return
+        query = parse_qs(urlparse(self.path).query)
+        per_page = int(query.get('per_page', ['5'])[0])
+        base = f"http://{self.headers['Host']}/clips"
+        names = sorted(self.state.clips)
+        seed = sum(map(ord, query.get('query', [''])[0]))
+        videos = []
+        for i in range(per_page):
+            name = names[(seed + i) % len(names)]
+            width, height = (int(n) for n in re.findall(r'(\d+)x(\d+)', name)[0])
+            video_id = seed * 100 + i
+            # Like Pexels, every video has its own link even where the bytes repeat
+            videos.append({
+                "id": video_id,
+                "duration": 8,
+                "video_files": [{"link": f"{base}/{name}?v={video_id}", "width": width,
+                                 "height": height, "file_type": "video/mp4"}]
+            })
+        self._json({"videos": videos})
+
+    def _clip(self, name):
+        self.state.count('clips')
+        if self._fail(throttle=True):
+            return
+        path = self.state.clips.get(name)
+        if not path:
+            return self._send(404)
+        data = path.read_bytes()
+        start = 0
+        status, headers = 200, {}
+        match = re.match(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            if start >= len(data):
+                return self._send(416, headers={'Content-Range': f'bytes */{len(data)}'})
+            status = 206
+            headers = {'Content-Range': f'bytes {start}-{len(data) - 1}/{len(data)}'}
+            self.state.count('clip_resumes')
+        body = data[start:]
+        if self.state.truncate_rate and random.random() < self.state.truncate_rate:
+            # Promise the whole body, send half and drop the connection, so
+            # the client is left with a .part file to resume with a Range
+            self.state.count('truncated')
+            self.send_response(status)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(len(body)))
+            for header, value in headers.items():
+                self.send_header(header, value)
+            self.end_headers()
+            self._write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self._send(status, body, content_type='video/mp4', headers=headers)
+
+    def _upload_start(self):
+        self._body()
+        self.state.count('youtube')
+        if self._fail():
+            return
+        if not self.state.charge('videos.insert'):
+            return self._quota_exceeded()
+        session_id = uuid.uuid4().hex
+        total = int(self.headers.get('X-Upload-Content-Length') or 0)
+        with self.state.lock:
+            self.state.uploads[session_id] = {'total': total, 'received': 0}
+        self._send(200, headers={
+            'Location': f"http://{self.headers['Host']}/upload/session/{session_id}"})
+
+    def _upload_chunk(self, session_id):
+        data = self._body()
+        upload = self.state.uploads.get(session_id)
+        if upload is None:
+            return self._send(404)
+        if self._fail():
+            return
+        match = re.match(r'bytes (\d+)-(\d+)/(\d+)', self.headers.get('Content-Range', ''))
+        if match and int(match.group(1)) == upload['received']:
+            upload['received'] += len(data)
+        if upload['received'] >= upload['total']:
+            return self._json({"id": f"fake{next(self.state._ids):06d}", "kind": "youtube#video"})
+        headers = {'Range': f"bytes=0-{upload['received'] - 1}"} if upload['received'] else {}
+        self._send(308, headers=headers)
+
+    def _thumbnail(self):
+        self._body()
+        self.state.count('thumbnails')
+        if self._fail():
+            return
+        if not self.state.charge('thumbnails.set'):
+            return self._quota_exceeded()
+        video_id = parse_qs(urlparse(self.path).query).get('videoId', [''])[0]
+        self._json({"kind": "youtube#thumbnailSetResponse",
+                    "items": [{"default": {"url": f"https://i.ytimg.com/vi/{video_id}/default.jpg"}}]})
+
+
+def _script_message(request):
+    """A Messages API response carrying a canned script for the requested topic"""
+    topic = request['messages'][0]['content'].rsplit(':', 1)[-1].strip()
+    words = list(itertools.islice(itertools.cycle(NARRATION_WORDS), 170))
+    text = (f"TITLE: {topic[:40].title()} In Depth\n"
+            f"DESCRIPTION: What {topic} really changes. #shorts #learning\n"
+            "TAGS: habits, focus, health, learning, science, routine, growth, mind\n"
+            "KEYWORDS: person walking city morning, coffee desk laptop, "
+            "sunrise mountain lake\n"
+            f"SCRIPT:\n{' '.join(words)}")
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:12]}",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get('model', 'fake'),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 900, "output_tokens": 320,
+                  "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+    }
+
+
+def start_fake_services(state, port=0):
+    """
+    Serve the fakes on 127.0.0.1 from a background thread
+
+    Returns:
+        (server, base_url)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeServiceHandler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
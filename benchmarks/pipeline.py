@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+Runs YouTubeAutomation end to end against local fakes for Anthropic, ElevenLabs,
+Pexels and the YouTube upload endpoint, using synthetic lavfi media, and reports
+per-stage latency percentiles, videos/hour per concurrency level and render fps
+
+Usage:
+    python benchmarks/pipeline.py [--videos 8] [--concurrency 1 4 8] [--latency 0.05]
+                                  [--bandwidth-mbps 100] [--error-rate 0.02]
+                                  [--throttle-rate 0.1] [--truncate-rate 0.2]
+                                  [--batch-scripts] [--quota-units 10000]
+                                  [--render-workers 2]
+                                  [--json out.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeServiceState, start_fake_services  # noqa: E402
+
+# Source clip sizes, like a typical mix of Pexels renditions
+CLIP_SOURCES = [
+    ('testsrc2', '1920x1080', 30),
+    ('mandelbrot', '1280x720', 25),
+    ('smptehdbars', '2560x1440', 24),
+    ('testsrc', '3840x2160', 30)
+]
+
+STAGE_ORDER = ['script_batch', 'script', 'voiceover', 'footage', 'download', 'render', 'thumbnail', 'upload',
+               'youtube_upload']
+
+
+def make_media(workdir, audio_seconds, clip_seconds=8):
+    """Encode the synthetic clips and a narration-length MP3"""
+    clips = []
+    for source, size, rate in CLIP_SOURCES:
+        path = workdir / f'clip_{source}_{size}.mp4'
+        subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                        '-f', 'lavfi', '-t', str(clip_seconds), '-i', f'{source}=s={size}:r={rate}',
+                        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+                        str(path)], check=True)
+        clips.append(path)
+
+    audio = workdir / 'narration.mp3'
+    subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                    '-f', 'lavfi', '-i', f'sine=frequency=180:d={audio_seconds}',
+                    '-c:a', 'libmp3lame', '-b:a', '128k', str(audio)], check=True)
+    return audio, clips
+
+
+def write_config(workdir, base_url, args):
+    """config.json for the run: every service pointed at the fakes, caches off"""
+    import youtube_automation
+
+    # create_config_template only writes the template; it needs no instance state
+    youtube_automation.AsyncYouTubeAutomation.create_config_template(None)
+    with open(youtube_automation.CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+
+    config['api_keys'] = {"anthropic": "bench", "elevenlabs": "bench", "pexels": "bench"}
+    config['youtube']['credentials_file'] = str(workdir / 'client_secrets.json')
+    config['video_settings'].update(resolution=args.resolution, fps=args.fps)
+    config['render'].update(profile=args.profile)
+    if args.shorts:
+        width, height = (int(n) for n in args.resolution.split('x'))
+        config['render']['outputs'].append(
+            {"name": "shorts", "resolution": f"{height * 9 // 16 // 2 * 2}x{height}",
+             "fit": "blur", "bitrate": None})
+    # Batched scripts reach the pipeline through the script memo
+    config['scripts'].update(base_url=base_url, memo=args.cache or args.batch_scripts,
+                             memo_dir=str(workdir / 'scripts'), batch_poll_seconds=0.2)
+    config['search'].update(cache_ttl_hours=24 if args.cache else 0,
+                            cache_dir=str(workdir / 'search_cache'),
+                            requests_per_hour=10 ** 6, burst=1000)
+    config['cache']['enabled'] = args.cache
+    config['cache']['dir'] = str(workdir / 'asset_cache')
+    config['uploads'].update(upload_url=f"{base_url}/upload/youtube/v3/videos",
+                             session_file=str(workdir / 'upload_sessions.json'),
+                             initial_chunk_mb=1, min_chunk_mb=1,
+                             thumbnail_url=f"{base_url}/upload/youtube/v3/thumbnails/set")
+    config['metrics'].update(enabled=True, dir=str(workdir / 'metrics'))
+    config['quota'].update(db=str(workdir / 'quota.db'),
+                           daily_units=args.quota_units or 10 ** 9)
+    config['async'].update(max_renders=args.max_renders)
+    if args.render_workers:
+        config['render_queue'].update(enabled=True, backend='sqlite', lease_seconds=30,
+                                      poll_seconds=0.2)
+
+    with open(youtube_automation.CONFIG_FILE, 'w') as f:
+        json.dump(config, f, indent=2)
+
+    # A long-lived fake token, so uploads skip the OAuth browser flow
+    from google.oauth2.credentials import Credentials
+    with open('token.pickle', 'wb') as f:
+        pickle.dump(Credentials(token='bench-token'), f)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 4),
+        'p50': round(percentile(values, 50), 4),
+        'p90': round(percentile(values, 90), 4),
+        'p99': round(percentile(values, 99), 4),
+        'max': round(max(values), 4)
+    }
+
+
+def read_records(metrics_dir, skip):
+    """Stage records appended to runs.jsonl after the first `skip` lines"""
+    path = Path(metrics_dir) / 'runs.jsonl'
+    if not path.exists():
+        return [], 0
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    return [json.loads(line) for line in lines[skip:]], len(lines)
+
+
+def run_level(automation, topics, concurrency, mode, upload, metrics_dir, seen,
+              batch_scripts=False):
+    started = time.monotonic()
+    if batch_scripts:
+        # Message Batches first, as in an overnight --scripts run
+        automation.generate_scripts(topics)
+    if mode == 'batch':
+        batch = automation.config.setdefault('batch', {})
+        batch['workers'] = {stage: (concurrency if stage not in ('render',) else 1)
+                            for stage in ('script', 'voiceover', 'footage', 'download',
+                                          'render', 'upload')}
+        report = automation.run_batch(topics, upload=upload)
+    else:
+        report = automation.run_many(topics, upload=upload, concurrency=concurrency)
+    wall = time.monotonic() - started
+
+    records, seen = read_records(metrics_dir, seen)
+    stages = {}
+    for name in STAGE_ORDER:
+        calls = [r for r in records if r['stage'] == name]
+        if not calls:
+            continue
+        stages[name] = summarize([r['wall_seconds'] for r in calls])
+        stages[name]['failures'] = sum(1 for r in calls if not r['ok'])
+
+    renders = [r for r in records if r['stage'] == 'render' and r['ok']]
+    render_fps = [r['counters']['encode_fps'] for r in renders if r['counters'].get('encode_fps')]
+    output_names = sorted({key[len('render_'):-len('_seconds')] for r in renders
+                           for key in r['counters'] if key.startswith('render_')
+                           and key.endswith('_seconds')})
+    level = {
+        'concurrency': concurrency,
+        'videos': len(topics),
+        'succeeded': report['succeeded'],
+        'failed': report['failed'],
+        'wall_seconds': round(wall, 3),
+        'videos_per_hour': round(report['succeeded'] * 3600.0 / wall, 1) if wall > 0 else 0.0,
+        'deferred': report.get('deferred', 0),
+        'stages': stages,
+        'render_fps': summarize(render_fps),
+        'outputs': {name: summarize([r['counters'][f'render_{name}_seconds'] for r in renders
+                                     if f'render_{name}_seconds' in r['counters']])
+                    for name in output_names}
+    }
+    return level, seen
+
+
+def print_level(level):
+    print(f"\n📊 Concurrency {level['concurrency']}: {level['succeeded']}/{level['videos']} ok, "
+          f"{level['wall_seconds']:.1f}s, {level['videos_per_hour']:.1f} videos/hour")
+    if level.get('deferred'):
+        print(f"   {level['deferred']} upload(s) deferred to the next quota window")
+    print(f"   {'Stage':<15} {'p50(s)':>8} {'p90(s)':>8} {'p99(s)':>8} {'Fail':>5}")
+    for name, stats in level['stages'].items():
+        print(f"   {name:<15} {stats['p50']:>8.3f} {stats['p90']:>8.3f} {stats['p99']:>8.3f} "
+              f"{stats['failures']:>5}")
+    if level['render_fps']:
+        print(f"   render fps p50 {level['render_fps']['p50']:.1f}")
+    for name, stats in level.get('outputs', {}).items():
+        print(f"   output {name:<8} ready p50 {stats['p50']:.2f}s")
+
+
+def compare(results, baseline_path):
+    """Print p50 and throughput changes against an earlier results file"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    old_levels = {level['concurrency']: level for level in baseline['levels']}
+
+    def change(new, old):
+        return f"{(new - old) * 100.0 / old:+.1f}%" if old else "n/a"
+
+    print(f"\n🔍 Compared with {baseline_path} ({(baseline.get('git_commit') or '?')[:10]})")
+    for level in results['levels']:
+        old = old_levels.get(level['concurrency'])
+        if not old:
+            continue
+        print(f"   concurrency {level['concurrency']}: videos/hour "
+              f"{change(level['videos_per_hour'], old['videos_per_hour'])}")
+        for name, stats in level['stages'].items():
+            if name in old['stages']:
+                print(f"      {name:<15} p50 {change(stats['p50'], old['stages'][name]['p50'])}")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--videos', type=int, default=4, help="Videos per concurrency level")
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--mode', choices=['async', 'batch'], default='async',
+                        help="run_many on the event loop, or the staged batch pipeline")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added per request")
+    parser.add_argument('--bandwidth-mbps', type=float, default=200,
+                        help="Per-connection transfer rate (0 = unlimited)")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of requests answered with 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help="Fraction of Claude, Pexels and clip requests answered with 429")
+    parser.add_argument('--truncate-rate', type=float, default=0.0,
+                        help="Fraction of clip downloads cut off halfway")
+    parser.add_argument('--batch-scripts', action='store_true',
+                        help="Generate each level's scripts through the Message Batches API")
+    parser.add_argument('--audio-seconds', type=float, default=30)
+    parser.add_argument('--resolution', default='1280x720')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--profile', default='fast')
+    parser.add_argument('--max-renders', type=int, default=1)
+    parser.add_argument('--shorts', action='store_true',
+                        help="Also render a 9:16 Short from the same decode")
+    parser.add_argument('--quota-units', type=int,
+                        help="Make the fake YouTube API enforce this daily quota (and the "
+                             "ledger budget for it)")
+    parser.add_argument('--render-workers', type=int, default=0,
+                        help="Render through the render queue with this many local "
+                             "--render-worker processes")
+    parser.add_argument('--no-upload', action='store_true')
+    parser.add_argument('--cache', action='store_true',
+                        help="Keep the asset/search/script caches on (off measures cold paths)")
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--compare', help="Earlier results file to diff against")
+    args = parser.parse_args()
+
+    results_path = Path(args.json).resolve() if args.json else None
+    baseline_path = Path(args.compare).resolve() if args.compare else None
+
+    with tempfile.TemporaryDirectory(prefix='pipeline_bench_') as tmp:
+        workdir = Path(tmp)
+        os.chdir(workdir)
+
+        print("🎞️  Generating synthetic media...")
+        audio, clips = make_media(workdir, args.audio_seconds)
+        bandwidth = args.bandwidth_mbps * 1e6 / 8 if args.bandwidth_mbps else None
+        state = FakeServiceState(audio, clips, args.latency, bandwidth, args.error_rate,
+                                 args.quota_units, args.throttle_rate, args.truncate_rate)
+        server, base_url = start_fake_services(state)
+
+        write_config(workdir, base_url, args)
+        import footage_search
+        import youtube_automation
+        youtube_automation.ELEVENLABS_TTS_URL = f"{base_url}/v1/text-to-speech"
+        footage_search.PEXELS_SEARCH_URL = f"{base_url}/videos/search"
+
+        workers = [subprocess.Popen([sys.executable, str(REPO_DIR / 'youtube_automation.py'),
+                                     '--render-worker', '--forever'], cwd=workdir,
+                                    stdout=subprocess.DEVNULL)
+                   for _ in range(args.render_workers)]
+        automation = youtube_automation.YouTubeAutomation()
+        metrics_dir = automation.config['metrics']['dir']
+        levels = []
+        seen = 0
+        for concurrency in args.concurrency:
+            topics = [f"benchmark topic {concurrency}-{i}" for i in range(args.videos)]
+            level, seen = run_level(automation, topics, concurrency, args.mode,
+                                    not args.no_upload, metrics_dir, seen, args.batch_scripts)
+            levels.append(level)
+        automation.close()
+        server.shutdown()
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+        for level in levels:
+            print_level(level)
+        injected = {name: state.counts[name] for name in ('errors', 'throttled', 'truncated',
+                                                          'clip_resumes') if state.counts.get(name)}
+        if injected:
+            print(f"\n💉 Injected: {', '.join(f'{count} {name}' for name, count in injected.items())}")
+        if args.quota_units:
+            print(f"\n🎫 Quota: {state.quota_used}/{args.quota_units} units used, "
+                  f"{state.counts.get('quota_rejected', 0)} call(s) rejected by the API")
+
+        results = {
+            'git_commit': git_commit(),
+            'created_at': time.time(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'settings': {key: value for key, value in vars(args).items()
+                         if key not in ('json', 'compare')},
+            'requests': state.counts,
+            'quota_used': state.quota_used,
+            'levels': levels
+        }
+
+    if baseline_path:
+        compare(results, baseline_path)
+    if results_path:
+        with open(results_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {results_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures interpreter start-up plus import time of the entry points with
+-X importtime, and wall time of quick CLI sub-commands, so regressions in
+what gets imported at module load show up before they reach cron jobs
+
+Usage:
+    python benchmarks/startup.py [--repeat 7] [--json out.json] [--compare baseline.json]
+                                 [--max-ms 250]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# (name, python arguments) run from a scratch directory holding a copy of config.json
+TARGETS = [
+    ('import youtube_automation', ['-c', 'import youtube_automation']),
+    ('import youtube_uploader', ['-c', 'import youtube_uploader']),
+    ('import scheduler', ['-c', 'import scheduler']),
+    ('cli --help', [str(REPO_DIR / 'youtube_automation.py'), '--help']),
+    ('cli --jobs', [str(REPO_DIR / 'youtube_automation.py'), '--jobs'])
+]
+
+# Imported by the Python start-up itself, so they are not charged to a target
+BASELINE = ('python -c pass', ['-c', 'pass'])
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output
+
+    Returns:
+        List of (module, self_us, cumulative_us, depth) in import order
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def top_imports(rows, count=8):
+    """
+    The heaviest imports made directly by the measured code: for
+    `import module`, that module's own imports
+    """
+    depth = 1 if len([row for row in rows if row[3] == 0]) == 1 else 0
+    top_level = [row for row in rows if row[3] == depth]
+    top_level.sort(key=lambda row: row[2], reverse=True)
+    return [{'module': name, 'ms': round(cumulative / 1000.0, 2)}
+            for name, _, cumulative, _ in top_level[:count]]
+
+
+def measure(args, workdir, repeat, exclude=()):
+    """
+    Median wall time over `repeat` runs, and one run's import breakdown
+
+    Args:
+        exclude: Modules the interpreter imports on its own start-up
+    """
+    env = dict(os.environ, PYTHONPATH=str(REPO_DIR))
+    walls = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=workdir, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        walls.append((time.perf_counter() - started) * 1000.0)
+
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = [row for row in parse_importtime(result.stderr) if row[0] not in exclude]
+    return {
+        'wall_ms': round(statistics.median(walls), 2),
+        'min_ms': round(min(walls), 2),
+        'import_ms': round(sum(row[2] for row in rows if row[3] == 0) / 1000.0, 2),
+        'modules': len(rows),
+        'top_imports': top_imports(rows),
+        'module_names': [row[0] for row in rows]
+    }
+
+
+def compare(results, baseline_path):
+    """Print wall time changes against an earlier results file"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+
+    print(f"\n🔍 Compared with {baseline_path} ({(baseline.get('git_commit') or '?')[:10]})")
+    for name, stats in results['targets'].items():
+        old = baseline['targets'].get(name)
+        if not old:
+            continue
+        change = (stats['wall_ms'] - old['wall_ms']) * 100.0 / old['wall_ms'] if old['wall_ms'] else 0
+        print(f"   {name:<26} {old['wall_ms']:>8.1f} -> {stats['wall_ms']:>8.1f} ms ({change:+.1f}%)")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7, help="Runs per target (median is reported)")
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--compare', help="Earlier results file to diff against")
+    parser.add_argument('--max-ms', type=float,
+                        help="Exit non-zero if any target's median exceeds interpreter "
+                             "start-up by more than this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='startup_bench_') as tmp:
+        workdir = Path(tmp)
+        if (REPO_DIR / 'config.json').exists():
+            shutil.copy(REPO_DIR / 'config.json', workdir / 'config.json')
+
+        baseline = measure(BASELINE[1], workdir, args.repeat)
+        startup_modules = set(baseline.pop('module_names'))
+        print(f"🐍 Interpreter start-up: {baseline['wall_ms']:.1f} ms")
+        print(f"\n   {'Target':<26} {'Wall(ms)':>9} {'+Start(ms)':>11} {'Imports(ms)':>12} {'Modules':>8}")
+
+        targets = {}
+        for name, target_args in TARGETS:
+            stats = measure(target_args, workdir, args.repeat, startup_modules)
+            stats.pop('module_names')
+            stats['over_startup_ms'] = round(stats['wall_ms'] - baseline['wall_ms'], 2)
+            targets[name] = stats
+            print(f"   {name:<26} {stats['wall_ms']:>9.1f} {stats['over_startup_ms']:>11.1f} "
+                  f"{stats['import_ms']:>12.1f} {stats['modules']:>8}")
+
+    print("\n📦 Heaviest imports of `import youtube_automation`:")
+    for entry in targets['import youtube_automation']['top_imports']:
+        print(f"   {entry['module']:<30} {entry['ms']:>8.1f} ms")
+
+    results = {
+        'git_commit': git_commit(),
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'startup': baseline,
+        'targets': targets
+    }
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+    if args.max_ms is not None:
+        over = [name for name, stats in targets.items() if stats['over_startup_ms'] > args.max_ms]
+        if over:
+            print(f"\n❌ Over the {args.max_ms:.0f} ms budget: {', '.join(over)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Clip Normalizer
+Converts downloaded stock clips once, in the background, into render-ready mezzanine files
+"""
+
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from asset_cache import file_digest
+from video_renderer import parse_resolution
+
+# Defaults for the optional "normalize" block in config.json
+DEFAULT_NORMALIZE_SETTINGS = {
+    "enabled": True,
+    "workers": 1,
+    "preset": "veryfast",
+    "crf": 18,
+    "gop_frames": 15
+}
+
+
+class ClipNormalizer:
+    """
+    Mezzanine clips are already at the output resolution, frame rate and
+    pixel format with a short, B-frame-free GOP, so renders skip the
+    expensive 4K decode and scale and can seek cheaply inside them. They
+    live in the asset cache, keyed by source content and target format,
+    so each source clip is converted at most once.
+    """
+
+    def __init__(self, cache, work_dir, resolution='1920x1080', fps=30, settings=None):
+        self.cache = cache
+        self.work_dir = Path(work_dir)
+        self.width, self.height = parse_resolution(resolution)
+        self.fps = fps
+        self.settings = dict(DEFAULT_NORMALIZE_SETTINGS)
+        self.settings.update(settings or {})
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(self.settings['workers'])),
+                                        thread_name_prefix='normalize')
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, cache, work_dir):
+        """Build a normalizer from config.json, or None if disabled / no cache"""
+        settings = config.get('normalize') or {}
+        if cache is None or not settings.get('enabled', DEFAULT_NORMALIZE_SETTINGS['enabled']):
+            return None
+        video_settings = config['video_settings']
+        return cls(cache, work_dir, video_settings.get('resolution', '1920x1080'),
+                   video_settings.get('fps', 30), settings)
+
+    def _content_id(self, source):
+        source = Path(source)
+        # Cache objects are already named by their content digest
+        if source.parent == self.cache.objects_dir:
+            return source.stem
+        return file_digest(source)
+
+    def mezzanine_key(self, source):
+        return (f"mezz:{self._content_id(source)}:{self.width}x{self.height}"
+                f"@{self.fps}:yuv420p:g{self.settings['gop_frames']}")
+
+    def build_command(self, source, output_path):
+        return [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-i', str(source),
+            '-vf', (f'scale={self.width}:{self.height}:force_original_aspect_ratio=decrease,'
+                    f'pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2,'
+                    f'setsar=1,fps={self.fps},format=yuv420p'),
+            '-an', '-c:v', 'libx264',
+            '-preset', self.settings['preset'], '-crf', str(self.settings['crf']),
+            '-g', str(self.settings['gop_frames']), '-bf', '0',
+            '-movflags', '+faststart',
+            str(output_path)
+        ]
+
+    def submit(self, source):
+        """Queue a clip for normalization unless it is done or already queued"""
+        key = self.mezzanine_key(source)
+        with self._lock:
+            if key in self._pending or self.cache.get(key):
+                return key
+            self._pending[key] = self._pool.submit(self._normalize, source, key)
+        return key
+
+    def _normalize(self, source, key):
+        # A directory of its own, so the workspace GC sweeps what a crash leaves behind
+        task_dir = self.work_dir / f"mezz_{uuid.uuid4().hex[:12]}"
+        output_path = task_dir / "mezzanine.mp4"
+        try:
+            task_dir.mkdir(parents=True, exist_ok=True)
+            subprocess.run(self.build_command(source, output_path), check=True)
+            return self.cache.put(key, output_path, {'source': str(source)})
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"⚠️  Could not normalize {Path(source).name}: {e}")
+            return None
+        finally:
+            shutil.rmtree(task_dir, ignore_errors=True)
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def resolve(self, source):
+        """The mezzanine for source if it is ready, otherwise source itself"""
+        mezzanine = self.cache.get(self.mezzanine_key(source))
+        return mezzanine or source
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Footage Search
+Pexels search with a TTL'd result cache, in-flight request coalescing and a shared token-bucket rate limit,
+plus per-phrase fan-out and ranking of the merged candidates
+"""
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from instrumentation import METRICS
+from stock_downloader import pick_rendition
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is then shared between threads only
+    fcntl = None
+
+PEXELS_SEARCH_URL = "https://api.pexels.com/videos/search"
+
+# Defaults for the optional "search" block in config.json
+DEFAULT_SEARCH_SETTINGS = {
+    "cache_dir": ".asset_cache/search",
+    "cache_ttl_hours": 24,
+    "requests_per_hour": 200,
+    "burst": 10,
+    "retries": 3,
+    "timeout": 30,
+    "per_phrase": 8,
+    "max_clips": 12,
+    "ideal_clip_seconds": 8,
+    "words_per_minute": 150
+}
+
+
+async def _in_thread(func, *args):
+    """Run blocking file I/O (cache files, the bucket's flock) off the event loop"""
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+def split_keywords(keywords):
+    """
+    Split the script's KEYWORDS line into distinct search phrases
+
+    Claude returns 3-5 comma-separated phrases, sometimes quoted or
+    bracketed; duplicates (after normalization) are dropped in order.
+    """
+    phrases = []
+    seen = set()
+    for part in re.split(r'[,;\n]', keywords or ''):
+        phrase = part.strip().strip('[]"\'').strip()
+        key = normalize_query(phrase)
+        if key and key not in seen:
+            seen.add(key)
+            phrases.append(phrase)
+    return phrases
+
+
+def estimate_narration_seconds(text, words_per_minute=150):
+    """Rough voiceover length from the script's word count"""
+    return len((text or '').split()) * 60.0 / words_per_minute
+
+
+def rank_candidates(results, width, height, ideal_seconds=8):
+    """
+    Merge per-phrase search results and rank them
+
+    Videos are deduplicated by Pexels id. Each one is scored on relevance
+    (its best position in any phrase's results, plus a bonus for matching
+    several phrases), how well its length suits a single cut, and how
+    closely its chosen rendition fits the output size.
+
+    Args:
+        results: List of per-phrase 'videos' lists, in phrase order
+
+    Returns:
+        List of candidate dicts (video, rendition, duration, score), best first
+    """
+    merged = {}
+    for videos in results:
+        for position, video in enumerate(videos or []):
+            video_id = video.get('id') or video.get('url')
+            if video_id is None:
+                continue
+            relevance = 1.0 / (1 + position)
+            entry = merged.get(video_id)
+            if entry is None:
+                merged[video_id] = {'video': video, 'relevance': relevance, 'matches': 1}
+            else:
+                entry['relevance'] = max(entry['relevance'], relevance)
+                entry['matches'] += 1
+
+    candidates = []
+    for entry in merged.values():
+        video = entry['video']
+        rendition = pick_rendition(video.get('video_files', []), width, height)
+        if not rendition or not rendition.get('link'):
+            continue
+
+        duration = float(video.get('duration') or 0)
+        if duration <= 0:
+            duration_fit = 0.3
+        elif duration < ideal_seconds:
+            duration_fit = duration / ideal_seconds
+        else:
+            # Long clips are fine to trim, but we pay to download all of it
+            duration_fit = min(1.0, 3.0 * ideal_seconds / duration)
+
+        rendition_pixels = (rendition.get('width') or 0) * (rendition.get('height') or 0)
+        if rendition_pixels <= 0:
+            size_fit = 0.5
+        else:
+            ratio = rendition_pixels / float(width * height)
+            # Undersized clips get upscaled (soft); oversized ones cost download/decode time
+            size_fit = ratio if ratio < 1 else 1.0 / ratio ** 0.5
+
+        relevance = entry['relevance'] + 0.25 * (entry['matches'] - 1)
+        candidates.append({
+            'video': video,
+            'rendition': rendition,
+            'duration': duration or None,
+            'score': round(0.6 * relevance + 0.25 * duration_fit + 0.15 * size_fit, 4)
+        })
+
+    candidates.sort(key=lambda c: c['score'], reverse=True)
+    return candidates
+
+
+def select_clips(candidates, target_seconds, max_clips=12, min_clips=1):
+    """
+    Take the best candidates until their footage covers target_seconds
+
+    A small margin is added so trimming at cut points never leaves the
+    render short and looping back to the first clip.
+    """
+    selected = []
+    covered = 0.0
+    needed = target_seconds * 1.1 if target_seconds else None
+    for candidate in candidates:
+        if len(selected) >= max_clips:
+            break
+        if needed is not None and covered >= needed and len(selected) >= min_clips:
+            break
+        selected.append(candidate)
+        covered += candidate['duration'] or 0
+    return selected
+
+
+def normalize_query(keywords):
+    """Lower-case, drop punctuation and collapse whitespace so equivalent queries share a key"""
+    words = re.sub(r'[^\w\s-]', ' ', keywords.lower()).split()
+    return ' '.join(words)
+
+
+def search_key(query, orientation, per_page):
+    payload = json.dumps({
+        'query': normalize_query(query),
+        'orientation': orientation,
+        'per_page': int(per_page)
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """One JSON file per search, so several processes can share the directory safely"""
+
+    def __init__(self, root, ttl_seconds):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key):
+        """Return cached results for key, or None if missing or expired"""
+        path = self.root / f"{key}.json"
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('stored_at', 0) > self.ttl_seconds:
+            return None
+        return entry.get('videos')
+
+    def put(self, key, query, videos):
+        path = self.root / f"{key}.json"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'query': query, 'stored_at': time.time(), 'videos': videos}, f)
+        os.replace(tmp_path, path)
+
+
+class TokenBucket:
+    """
+    Rate limiter that makes callers wait for a token rather than fail.
+
+    The bucket's level lives in a small state file guarded by an flock, so
+    every worker thread and process using the same file draws from one
+    budget. Without fcntl the state is kept in memory for this process.
+    """
+
+    def __init__(self, state_path, rate_per_hour, burst):
+        self.state_path = Path(state_path)
+        self.rate = rate_per_hour / 3600.0
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._memory = {'tokens': float(self.burst), 'updated': time.time()}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _take(self, state, now):
+        """Refill state up to now and take a token; return seconds to wait if empty"""
+        elapsed = max(0.0, now - state['updated'])
+        state['tokens'] = min(self.burst, state['tokens'] + elapsed * self.rate)
+        state['updated'] = now
+        if state['tokens'] >= 1:
+            state['tokens'] -= 1
+            return 0.0
+        return (1 - state['tokens']) / self.rate
+
+    def _try_acquire(self):
+        with self._lock:
+            now = time.time()
+            if fcntl is None:
+                return self._take(self._memory, now)
+            return self._take_shared(now)
+
+    def _take_shared(self, now):
+        with open(self.state_path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or 'null')
+                except ValueError:
+                    state = None
+                if not state:
+                    state = {'tokens': float(self.burst), 'updated': now}
+                wait = self._take(state, now)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    async def acquire_async(self):
+        """Wait for a token without blocking the event loop; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            # The flock can block on another process, so take it in a thread
+            wait = await _in_thread(self._try_acquire)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+class FootageSearch:
+    """
+    Searches go cache -> in-flight call -> rate limiter -> Pexels. Jobs that
+    ask for the same normalized query at the same time wait on the first
+    caller's request instead of making their own.
+    """
+
+    def __init__(self, api_key, settings=None):
+        self.api_key = api_key
+        self.settings = dict(DEFAULT_SEARCH_SETTINGS)
+        self.settings.update(settings or {})
+
+        cache_dir = Path(self.settings['cache_dir'])
+        ttl = float(self.settings['cache_ttl_hours']) * 3600
+        self.cache = SearchCache(cache_dir, ttl) if ttl > 0 else None
+        self.bucket = TokenBucket(cache_dir / 'pexels.bucket',
+                                  float(self.settings['requests_per_hour']),
+                                  self.settings['burst'])
+        self._async_in_flight = {}
+
+    def _params(self, query, per_page, orientation):
+        return {
+            "query": normalize_query(query) or query,
+            "per_page": per_page,
+            "orientation": orientation
+        }
+
+    async def search_async(self, client, query, per_page=5, orientation='landscape'):
+        """
+        Return the Pexels 'videos' list for a query, over an httpx.AsyncClient
+
+        Identical searches in flight on the same event loop are coalesced.
+
+        Returns:
+            List of video dicts (possibly empty), or None if the request failed
+        """
+        key = search_key(query, orientation, per_page)
+        if self.cache:
+            videos = await _in_thread(self.cache.get, key)
+            if videos is not None:
+                METRICS.add(cache_hits=1)
+                return videos
+
+        pending = self._async_in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._async_in_flight[key] = pending
+        try:
+            videos = await self._request_async(client, query, per_page, orientation)
+            if videos is not None and self.cache:
+                await _in_thread(self.cache.put, key, normalize_query(query), videos)
+            pending.set_result(videos)
+            return videos
+        except asyncio.CancelledError:
+            # set_exception() refuses CancelledError; cancelling the future
+            # wakes the coalesced waiters instead of stranding them
+            pending.cancel()
+            raise
+        except BaseException as e:
+            pending.set_exception(e)
+            # Mark retrieved so an unawaited failure isn't logged by asyncio
+            pending.exception()
+            raise
+        finally:
+            self._async_in_flight.pop(key, None)
+
+    async def search_many_async(self, client, phrases, per_page=8, orientation='landscape'):
+        """Search every phrase concurrently (None where a search failed)"""
+        return list(await asyncio.gather(
+            *(self.search_async(client, phrase, per_page, orientation) for phrase in phrases)))
+
+    async def _request_async(self, client, query, per_page, orientation):
+        import httpx
+
+        params = self._params(query, per_page, orientation)
+        headers = {"Authorization": self.api_key}
+        retries = int(self.settings['retries'])
+
+        for attempt in range(retries + 1):
+            await self.bucket.acquire_async()
+            try:
+                response = await client.get(PEXELS_SEARCH_URL, headers=headers, params=params,
+                                            timeout=self.settings['timeout'])
+            except httpx.HTTPError as e:
+                print(f"⚠️  Pexels search failed: {e}")
+                if attempt < retries:
+                    await asyncio.sleep(min(0.5 * 2 ** attempt, 8))
+                continue
+
+            METRICS.add(api_requests=1, bytes_downloaded=len(response.content))
+            if response.status_code == 200:
+                return response.json().get('videos', [])
+            if response.status_code == 429 and attempt < retries:
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt * 5
+                print(f"⏳ Pexels rate limit hit, retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+                continue
+            print(f"❌ Error fetching stock footage: {response.status_code}")
+            return None
+        return None
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Instrumentation
+Per-stage timing, usage and resource metrics exported as JSON lines and Prometheus text
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Defaults for the optional "metrics" block in config.json
+DEFAULT_METRICS_SETTINGS = {
+    "enabled": True,
+    "dir": "metrics",
+    "http_port": None,
+    "prices": {
+        "claude_input_per_mtok": 3.0,
+        "claude_output_per_mtok": 15.0,
+        "claude_cache_write_per_mtok": 3.75,
+        "claude_cache_read_per_mtok": 0.30,
+        "claude_batch_discount": 0.5,
+        "elevenlabs_per_1k_chars": 0.30
+    }
+}
+
+# ru_maxrss is kilobytes on Linux but bytes on macOS
+_RSS_DIVISOR = 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+# Context variables rather than thread-locals, so records follow asyncio
+# tasks as well as threads
+_STAGE_STACK = contextvars.ContextVar('ytauto_stage_stack', default=())
+_JOB = contextvars.ContextVar('ytauto_job', default=None)
+
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    return resource.getrusage(who).ru_maxrss / _RSS_DIVISOR
+
+
+class Instrumentation:
+    """
+    Collects one record per stage call. Stage code adds usage counters to
+    the record that is active in its thread or task via add(); finished
+    records are appended to runs.jsonl and folded into cumulative
+    Prometheus series.
+    """
+
+    def __init__(self):
+        self.settings = dict(DEFAULT_METRICS_SETTINGS)
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._server = None
+
+    def configure(self, settings=None):
+        merged = dict(DEFAULT_METRICS_SETTINGS)
+        merged.update(settings or {})
+        prices = dict(DEFAULT_METRICS_SETTINGS['prices'])
+        prices.update((settings or {}).get('prices') or {})
+        merged['prices'] = prices
+        self.settings = merged
+        if merged['enabled']:
+            Path(merged['dir']).mkdir(parents=True, exist_ok=True)
+            if merged.get('http_port') and self._server is None:
+                self._start_server(int(merged['http_port']))
+
+    @property
+    def enabled(self):
+        return self.settings['enabled']
+
+    # --- recording -------------------------------------------------------
+
+    def set_job(self, job):
+        """Label records made in this thread (or task) with a job id"""
+        _JOB.set(job)
+
+    def current_job(self):
+        return _JOB.get()
+
+    def add(self, **counters):
+        """Add usage counters (bytes, tokens, characters...) to the active stage"""
+        stack = _STAGE_STACK.get()
+        if not stack:
+            return
+        record = stack[-1]['counters']
+        for name, value in counters.items():
+            if value is None:
+                continue
+            record[name] = record.get(name, 0) + value
+
+    def set(self, **values):
+        """Set gauge-style values (fps, RSS) on the active stage"""
+        stack = _STAGE_STACK.get()
+        if stack:
+            stack[-1]['counters'].update({k: v for k, v in values.items() if v is not None})
+
+    def stage(self, name):
+        """Context manager timing one stage call"""
+        return _StageContext(self, name)
+
+    def _finish(self, record):
+        counters = record['counters']
+        prices = self.settings['prices']
+        batch_rate = prices['claude_batch_discount']
+        cost = (counters.get('claude_input_tokens', 0) * prices['claude_input_per_mtok'] / 1e6
+                + counters.get('claude_output_tokens', 0) * prices['claude_output_per_mtok'] / 1e6
+                + counters.get('claude_batch_input_tokens', 0)
+                * prices['claude_input_per_mtok'] * batch_rate / 1e6
+                + counters.get('claude_batch_output_tokens', 0)
+                * prices['claude_output_per_mtok'] * batch_rate / 1e6
+                + counters.get('claude_cache_write_tokens', 0)
+                * prices['claude_cache_write_per_mtok'] / 1e6
+                + counters.get('claude_cache_read_tokens', 0)
+                * prices['claude_cache_read_per_mtok'] / 1e6
+                + counters.get('tts_characters', 0) * prices['elevenlabs_per_1k_chars'] / 1e3)
+        if cost:
+            counters['estimated_cost_usd'] = round(cost, 6)
+        record['peak_rss_mb'] = _peak_rss_mb(resource.RUSAGE_SELF) if resource else None
+
+        with self._lock:
+            totals = self._totals.setdefault(record['stage'], {
+                'calls': 0, 'failures': 0, 'seconds': 0.0, 'counters': {}
+            })
+            totals['calls'] += 1
+            totals['failures'] += 0 if record['ok'] else 1
+            totals['seconds'] += record['wall_seconds']
+            for name, value in counters.items():
+                if isinstance(value, (int, float)) and not name.endswith(('_fps', '_mb')):
+                    totals['counters'][name] = totals['counters'].get(name, 0) + value
+
+            if self.enabled:
+                with open(Path(self.settings['dir']) / 'runs.jsonl', 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+                self._write_prometheus()
+
+    # --- export ----------------------------------------------------------
+
+    def prometheus_text(self):
+        """Cumulative metrics in the Prometheus text exposition format"""
+        with self._lock:
+            return self._render_prometheus()
+
+    def _render_prometheus(self):
+        lines = [
+            '# HELP ytauto_stage_seconds Wall time spent in pipeline stages',
+            '# TYPE ytauto_stage_seconds summary'
+        ]
+        for stage, totals in sorted(self._totals.items()):
+            lines.append(f'ytauto_stage_seconds_sum{{stage="{stage}"}} {totals["seconds"]:.3f}')
+            lines.append(f'ytauto_stage_seconds_count{{stage="{stage}"}} {totals["calls"]}')
+        lines += [
+            '# HELP ytauto_stage_failures_total Stage calls that failed',
+            '# TYPE ytauto_stage_failures_total counter'
+        ]
+        for stage, totals in sorted(self._totals.items()):
+            lines.append(f'ytauto_stage_failures_total{{stage="{stage}"}} {totals["failures"]}')
+        lines += [
+            '# HELP ytauto_usage_total Usage counters (bytes, tokens, characters, cost) by stage',
+            '# TYPE ytauto_usage_total counter'
+        ]
+        for stage, totals in sorted(self._totals.items()):
+            for name, value in sorted(totals['counters'].items()):
+                lines.append(f'ytauto_usage_total{{stage="{stage}",metric="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _write_prometheus(self):
+        path = Path(self.settings['dir']) / 'metrics.prom'
+        tmp_path = path.with_name(f"metrics.prom.{os.getpid()}.tmp")
+        tmp_path.write_text(self._render_prometheus())
+        os.replace(tmp_path, path)
+
+    def _start_server(self, port):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = instrumentation.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics endpoint: http://127.0.0.1:{port}/metrics")
+
+
+class _StageContext:
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.record = {
+            'run_id': instrumentation.run_id,
+            'job': _JOB.get(),
+            'stage': name,
+            'started_at': None,
+            'wall_seconds': None,
+            'ok': False,
+            'counters': {}
+        }
+        self._started = None
+        self._token = None
+
+    def __enter__(self):
+        self.record['started_at'] = time.time()
+        self._started = time.monotonic()
+        self._token = _STAGE_STACK.set(_STAGE_STACK.get() + (self.record,))
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        _STAGE_STACK.reset(self._token)
+        self.record['wall_seconds'] = round(time.monotonic() - self._started, 4)
+        if exc_type is not None:
+            self.record['ok'] = False
+            self.record['error'] = str(exc)
+        self.instrumentation._finish(self.record)
+        return False
+
+
+# Process-wide collector used by the pipeline and uploader
+METRICS = Instrumentation()
+
+
+def instrumented(stage):
+    """Decorator: time a stage method; returning None/False counts as failure"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with METRICS.stage(stage) as record:
+                    result = await func(*args, **kwargs)
+                    record['ok'] = result is not None and result is not False
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.stage(stage) as record:
+                result = func(*args, **kwargs)
+                record['ok'] = result is not None and result is not False
+                return result
+        return wrapper
+    return decorator
+
+
+def run_measured(cmd):
+    """
+    Run a subprocess and record its peak RSS on the active stage
+
+    Raises:
+        subprocess.CalledProcessError on a non-zero exit, like check=True
+    """
+    process = subprocess.Popen(cmd)
+    if hasattr(os, 'wait4'):
+        # wait4 reports this child's own resource usage, not all children's
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status) if hasattr(
+            os, 'waitstatus_to_exitcode') else (status >> 8)
+        METRICS.set(ffmpeg_peak_rss_mb=round(usage.ru_maxrss / _RSS_DIVISOR, 1))
+    else:
+        process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return process.returncode
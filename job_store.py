@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Job Store
+Durable SQLite job queue with per-stage checkpoints and worker leases
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from batch_runner import STAGES, STAGE_OUTPUTS, run_stage
+from quota_ledger import QuotaDeferred
+
+# Defaults for the optional "jobs" block in config.json
+DEFAULT_JOB_SETTINGS = {
+    "db": "jobs.db",
+    "lease_seconds": 600,
+    "max_attempts": 3
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT,
+    upload INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    outputs TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    not_before REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+"""
+
+# Outputs that point at files; a checkpoint is only reusable if they still exist
+_FILE_OUTPUTS = {'audio_path', 'video_path'}
+
+
+def _to_json(value):
+    """Make stage outputs (which may contain Paths) JSON-serializable"""
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobStore:
+    """
+    Every stage output is committed as soon as the stage finishes, so a
+    restarted worker picks the job up at its first incomplete stage. Workers
+    claim jobs with a time-limited lease; a job whose lease expires (crashed
+    worker) becomes claimable again.
+    """
+
+    def __init__(self, db_path='jobs.db', lease_seconds=600, max_attempts=3):
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'not_before' not in columns:
+                # Databases created before jobs could be deferred
+                conn.execute('ALTER TABLE jobs ADD COLUMN not_before REAL')
+
+    @classmethod
+    def from_config(cls, settings=None):
+        merged = dict(DEFAULT_JOB_SETTINGS)
+        merged.update(settings or {})
+        return cls(merged['db'], merged['lease_seconds'], merged['max_attempts'])
+
+    def _connect(self):
+        # isolation_level=None so BEGIN IMMEDIATE can take the write lock
+        # up front; that is what makes claiming safe across processes
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def add_job(self, topic, upload=False):
+        """Queue a new job and return its id"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (topic, upload, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                (topic, int(bool(upload)), now, now))
+            return cursor.lastrowid
+
+    def claim(self, worker_id):
+        """
+        Lease the oldest runnable job to worker_id
+
+        Returns:
+            Job dict (id, topic, upload, outputs, attempts) or None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Jobs whose workers keep dying (OOM, crashing FFmpeg) are not
+            # retried forever
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_owner = NULL, lease_expires = NULL, "
+                "error = 'lease expired too often', updated_at = ? "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            row = conn.execute(
+                "SELECT id, topic, upload, outputs, attempts FROM jobs "
+                "WHERE (status = 'pending' AND (not_before IS NULL OR not_before <= ?)) "
+                "OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1", (now, now)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        return {
+            'id': row[0],
+            'topic': row[1],
+            'upload': bool(row[2]),
+            'outputs': json.loads(row[3]),
+            'attempts': row[4] + 1
+        }
+
+    def _update_owned(self, job_id, worker_id, sql, params):
+        """Run an UPDATE only if worker_id still holds the lease"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                sql + " WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                params + (job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def renew(self, job_id, worker_id):
+        """Extend the lease; False means it was lost to another worker"""
+        now = time.time()
+        return self._update_owned(job_id, worker_id,
+                                  'UPDATE jobs SET lease_expires = ?, updated_at = ?',
+                                  (now + self.lease_seconds, now))
+
+    def save_stage(self, job_id, worker_id, outputs):
+        """Checkpoint the job's stage outputs and extend the lease"""
+        now = time.time()
+        return self._update_owned(job_id, worker_id,
+                                  'UPDATE jobs SET outputs = ?, lease_expires = ?, updated_at = ?',
+                                  (json.dumps(_to_json(outputs)), now + self.lease_seconds, now))
+
+    def complete(self, job_id, worker_id):
+        return self._update_owned(job_id, worker_id,
+                                  "UPDATE jobs SET status = 'done', lease_owner = NULL, "
+                                  "lease_expires = NULL, error = NULL, updated_at = ?",
+                                  (time.time(),))
+
+    def fail(self, job_id, worker_id, error, attempts):
+        """Release a failed job for retry, or park it once max_attempts is reached"""
+        status = 'failed' if attempts >= self.max_attempts else 'pending'
+        return self._update_owned(job_id, worker_id,
+                                  "UPDATE jobs SET status = ?, lease_owner = NULL, "
+                                  "lease_expires = NULL, error = ?, updated_at = ?",
+                                  (status, error, time.time()))
+
+    def defer(self, job_id, worker_id, until, reason):
+        """
+        Put a job back in the queue until `until` (e.g. the API quota reset)
+        without spending one of its attempts
+        """
+        return self._update_owned(job_id, worker_id,
+                                  "UPDATE jobs SET status = 'pending', lease_owner = NULL, "
+                                  "lease_expires = NULL, attempts = attempts - 1, error = ?, "
+                                  "not_before = ?, updated_at = ?",
+                                  (reason, until, time.time()))
+
+    def next_deferred(self):
+        """Earliest time a deferred job becomes claimable again, or None"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT MIN(not_before) FROM jobs WHERE status = 'pending' "
+                "AND not_before > ?", (time.time(),)).fetchone()[0]
+
+    def list_jobs(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id, topic, status, attempts, outputs, error FROM jobs ORDER BY id').fetchall()
+        return [
+            {
+                'id': row[0],
+                'topic': row[1],
+                'status': row[2],
+                'attempts': row[3],
+                'stages_done': [s for s in STAGES if s in json.loads(row[4])],
+                'error': row[5]
+            }
+            for row in rows
+        ]
+
+
+class _LeaseKeeper:
+    """Renews a job lease in the background while a long stage runs"""
+
+    def __init__(self, store, job_id, worker_id):
+        self.store = store
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        interval = max(1.0, self.store.lease_seconds / 3.0)
+        while not self._stop.wait(interval):
+            if not self.store.renew(self.job_id, self.worker_id):
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _checkpoint_valid(stage, value):
+    """A checkpointed file output is only reusable if the file survived"""
+    key = STAGE_OUTPUTS[stage]
+    if key in _FILE_OUTPUTS:
+        return bool(value) and os.path.exists(value)
+    if key == 'video_files':
+        return all(os.path.exists(path) for path in value)
+    return True
+
+
+def _release_workspace(automation, job):
+    """Keep a failed job's files for its retry; GC reclaims them if it never comes"""
+    if 'workspace' in job:
+        automation.workspaces.release(job.pop('workspace'))
+
+
+def run_job(automation, store, claimed, worker_id):
+    """
+    Run a claimed job from its first incomplete stage
+
+    Returns:
+        True if the job completed, False otherwise
+    """
+    job_id = claimed['id']
+    outputs = claimed['outputs']
+    # A stable workspace name lets a retried job find its checkpointed files
+    job = {'index': job_id, 'topic': claimed['topic'], 'workspace_name': f"job_{job_id}"}
+    for stage in STAGES:
+        if stage in outputs:
+            job[STAGE_OUTPUTS[stage]] = outputs[stage]
+
+    print(f"\n🔁 Job {job_id} ({claimed['topic']}) attempt {claimed['attempts']}")
+
+    # The render removes the voiceover and clips once the video is
+    # published; a surviving video stands in for all of them, so a failed
+    # upload is retried without paying for those stages again
+    skip = set()
+    if 'render' in outputs and _checkpoint_valid('render', outputs['render']):
+        skip = set(STAGES[:STAGES.index('render') + 1])
+
+    with _LeaseKeeper(store, job_id, worker_id) as lease:
+        for stage in STAGES:
+            if stage in skip or (stage in outputs and _checkpoint_valid(stage, outputs[stage])):
+                print(f"   ⏭️  {stage}: reusing checkpoint")
+                continue
+
+            try:
+                ok = run_stage(automation, stage, job, upload=claimed['upload'])
+            except QuotaDeferred as e:
+                # Everything up to the upload is checkpointed; wait for the quota reset
+                store.defer(job_id, worker_id, e.until, f"{stage}: {e}")
+                print(f"⏳ Job {job_id} deferred: {e}")
+                _release_workspace(automation, job)
+                return False
+            except Exception as e:
+                store.fail(job_id, worker_id, f"{stage}: {e}", claimed['attempts'])
+                print(f"❌ Job {job_id} failed at {stage}: {e}")
+                _release_workspace(automation, job)
+                return False
+
+            if not ok:
+                store.fail(job_id, worker_id, f"{stage} stage failed", claimed['attempts'])
+                print(f"❌ Job {job_id} failed at {stage}")
+                _release_workspace(automation, job)
+                return False
+
+            outputs[stage] = job[STAGE_OUTPUTS[stage]]
+            if lease.lost or not store.save_stage(job_id, worker_id, outputs):
+                print(f"⚠️  Job {job_id} lease lost to another worker, abandoning")
+                _release_workspace(automation, job)
+                return False
+
+    if 'workspace' in job:
+        job.pop('workspace').cleanup()
+    store.complete(job_id, worker_id)
+    print(f"✅ Job {job_id} completed")
+    return True
+
+
+def run_worker(automation, store, worker_id=None, stop_when_empty=True, poll_interval=10):
+    """
+    Claim and run jobs until the queue is empty (or forever)
+
+    Returns:
+        Number of jobs completed by this worker
+    """
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+    print(f"👷 Worker {worker_id} started")
+
+    while True:
+        automation.workspaces.maybe_collect()
+        claimed = store.claim(worker_id)
+        if claimed is None:
+            if stop_when_empty:
+                break
+            time.sleep(poll_interval)
+            continue
+        if run_job(automation, store, claimed, worker_id):
+            completed += 1
+
+    deferred_until = store.next_deferred()
+    if deferred_until:
+        print(f"⏳ Some jobs are waiting for API quota until "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(deferred_until))}")
+    print(f"👷 Worker {worker_id} finished: {completed} job(s) completed")
+    return completed
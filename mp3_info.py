@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+MP3 Info
+Duration from MPEG audio frame headers, computed incrementally without ffprobe
+"""
+
+# Bitrates in kbps, indexed by [version_is_mpeg1][layer][bitrate_index]
+_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+    }
+}
+
+# Sample rates indexed by version bits (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1)
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000]
+}
+
+_LAYERS = {3: 1, 2: 2, 1: 3}
+
+
+def parse_frame_header(header):
+    """
+    Decode a 4-byte MPEG audio frame header
+
+    Returns:
+        (frame_length_bytes, samples_per_frame, sample_rate) or None if invalid
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = (header[2] >> 4) & 0x0F
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 3
+    layer = _LAYERS[layer_bits]
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][rate_index]
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples, sample_rate
+
+
+def id3v2_size(data):
+    """Size of a leading ID3v2 tag in data (0 if none)"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+class Mp3DurationCounter:
+    """
+    Feed MP3 bytes as they arrive (e.g. from a streaming response) and read
+    the running duration at any time. Only frame headers are inspected.
+    """
+
+    def __init__(self):
+        self.duration = 0.0
+        self.frames = 0
+        self._buffer = b''
+        self._skip = 0
+        self._started = False
+
+    def feed(self, data):
+        buffer = self._buffer + data
+        pos = 0
+
+        if not self._started:
+            if len(buffer) < 10:
+                self._buffer = buffer
+                return self.duration
+            self._skip = id3v2_size(buffer)
+            self._started = True
+
+        if self._skip:
+            consumed = min(self._skip, len(buffer))
+            self._skip -= consumed
+            pos = consumed
+
+        while len(buffer) - pos >= 4:
+            info = parse_frame_header(buffer[pos:pos + 4])
+            if info is None or info[0] <= 0:
+                # Not on a frame boundary (junk or a trailing tag): resync
+                pos += 1
+                continue
+            length, samples, sample_rate = info
+            if len(buffer) - pos < length:
+                break
+            # A leading Xing/Info frame carries encoder metadata, not audio
+            frame = buffer[pos:pos + length]
+            if not (self.frames == 0 and (b'Xing' in frame[:64] or b'Info' in frame[:64])):
+                self.duration += samples / sample_rate
+                self.frames += 1
+            pos += length
+
+        self._buffer = buffer[pos:]
+        return self.duration
+
+
+def mp3_duration(path, chunk_size=256 * 1024):
+    """Duration of an MP3 file in seconds by walking its frame headers"""
+    counter = Mp3DurationCounter()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            counter.feed(chunk)
+    return counter.duration if counter.frames else None
+
+
+def strip_mp3_header(data):
+    """
+    Drop a leading ID3v2 tag and Xing/Info frame so MP3 byte streams can be
+    concatenated without metadata frames playing as gaps mid-stream
+    """
+    data = data[id3v2_size(data):]
+    info = parse_frame_header(data[:4])
+    if info and (b'Xing' in data[:64] or b'Info' in data[:64]):
+        data = data[info[0]:]
+    return data
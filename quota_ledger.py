@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Quota Ledger
+Local accounting of YouTube Data API quota units per Cloud project, shared
+by every process through SQLite, with priority admission of API calls
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+# Defaults for the optional "quota" block in config.json
+DEFAULT_QUOTA_SETTINGS = {
+    "enabled": True,
+    "db": "quota.db",
+    # Units per project per day (the default allocation of a Cloud project)
+    "daily_units": 10000,
+    # Units left unspent for calls made outside this tool
+    "reserve_units": 0,
+    # YouTube resets quotas at midnight Pacific time
+    "timezone": "America/Los_Angeles",
+    "costs": {
+        "videos.insert": 1600,
+        "thumbnails.set": 50,
+        "videos.update": 50,
+        "videos.list": 1
+    },
+    # How long a call may wait for quota before it is deferred to the
+    # next window (0 = defer straight away)
+    "max_wait_minutes": 0,
+    "poll_seconds": 30
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS charges (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project TEXT NOT NULL,
+    day TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    units INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'reserved',
+    label TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS charges_day ON charges (project, day, status);
+CREATE TABLE IF NOT EXISTS waiters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project TEXT NOT NULL,
+    units INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exhausted (
+    project TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (project, day)
+);
+"""
+
+# Waiters that stop polling (dead process) drop out of the queue after this
+WAITER_TTL = 120
+
+
+class QuotaDeferred(Exception):
+    """Not enough quota left today; the call should be retried after `until`"""
+
+    def __init__(self, project, operation, until):
+        self.project = project
+        self.operation = operation
+        self.until = until
+        super().__init__(f"YouTube API quota for {project} is used up, {operation} deferred "
+                         f"until {datetime.fromtimestamp(until):%Y-%m-%d %H:%M}")
+
+
+def project_key(credentials_file):
+    """
+    Quota is allocated per Cloud project, so channels authorized through
+    the same OAuth client share it; fall back to the file path if the
+    client secrets can't be read
+    """
+    try:
+        with open(credentials_file, 'r') as f:
+            secrets = json.load(f)
+        for section in ('installed', 'web'):
+            if secrets.get(section, {}).get('project_id'):
+                return secrets[section]['project_id']
+    except (OSError, ValueError, AttributeError):
+        pass
+    return os.path.abspath(credentials_file)
+
+
+def is_quota_error(error):
+    """True for the 403 the API answers once the daily quota is spent"""
+    return 'quotaExceeded' in str(error)
+
+
+def _timezone(name):
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except (ImportError, KeyError, ValueError):
+        print(f"⚠️  Unknown timezone {name}, using UTC for quota windows")
+        return timezone.utc
+
+
+class QuotaLedger:
+    """
+    Every call is reserved against today's window before it is made and
+    settled afterwards (spent, or refunded if it never reached the API).
+    Callers that don't fit wait in a priority queue shared through the
+    database: the budget goes to waiters in priority order, and a
+    lower-priority call that still fits (e.g. a thumbnail after the last
+    upload that fits) can use what is left, so the quota fills up without
+    a single rejected request.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_QUOTA_SETTINGS)
+        self.settings.update(settings or {})
+        self.costs = dict(DEFAULT_QUOTA_SETTINGS['costs'])
+        self.costs.update(self.settings.get('costs') or {})
+        self.enabled = bool(self.settings['enabled'])
+        self.db_path = str(self.settings['db'])
+        self.tz = _timezone(self.settings['timezone'])
+        if self.enabled:
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # isolation_level=None so BEGIN IMMEDIATE can take the write lock
+        # up front; admission decisions are then serialized across processes
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def day(self, now=None):
+        """The quota window (a Pacific-time date) containing now"""
+        return datetime.fromtimestamp(now or time.time(), self.tz).date().isoformat()
+
+    def next_reset(self, now=None):
+        """Epoch seconds at which the window containing now ends"""
+        local = datetime.fromtimestamp(now or time.time(), self.tz)
+        midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(),
+                                    tzinfo=self.tz)
+        return midnight.timestamp()
+
+    def cost(self, operation):
+        if operation not in self.costs:
+            raise ValueError(f"Unknown API operation: {operation}")
+        return int(self.costs[operation])
+
+    def _remaining(self, conn, project, day):
+        if conn.execute('SELECT 1 FROM exhausted WHERE project = ? AND day = ?',
+                        (project, day)).fetchone():
+            return 0
+        used = conn.execute(
+            "SELECT COALESCE(SUM(units), 0) FROM charges "
+            "WHERE project = ? AND day = ? AND status != 'refunded'", (project, day)).fetchone()[0]
+        return int(self.settings['daily_units']) - int(self.settings['reserve_units']) - used
+
+    def _admissible(self, conn, project, waiter_id, units, now):
+        """
+        Hand the remaining budget to waiters in priority order; waiter_id is
+        admitted if it fits in what the waiters ahead of it leave over
+        """
+        remaining = self._remaining(conn, project, self.day(now))
+        waiters = conn.execute(
+            'SELECT id, units FROM waiters WHERE project = ? AND expires >= ? '
+            'ORDER BY priority DESC, id', (project, now)).fetchall()
+        for other_id, other_units in waiters:
+            if other_id == waiter_id:
+                return units <= remaining
+            if other_units <= remaining:
+                remaining -= other_units
+        return units <= remaining
+
+    def acquire(self, project, operation, priority=0, label=None, max_wait=None):
+        """
+        Reserve the units for one API call
+
+        Args:
+            priority: Higher goes first when several callers are waiting
+            label: Shown in usage reports (e.g. the video title)
+            max_wait: Seconds to wait for quota (default: max_wait_minutes)
+
+        Returns:
+            Reservation dict for commit/refund, or None if the ledger is disabled
+
+        Raises:
+            QuotaDeferred if the call does not fit before max_wait runs out
+        """
+        if not self.enabled:
+            return None
+        units = self.cost(operation)
+        if max_wait is None:
+            max_wait = self.settings['max_wait_minutes'] * 60
+        deadline = time.time() + max_wait
+        waiter_id = None
+        conn = self._connect()
+        try:
+            while True:
+                now = time.time()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.execute('DELETE FROM waiters WHERE expires < ?', (now,))
+                    if waiter_id is None:
+                        waiter_id = conn.execute(
+                            'INSERT INTO waiters (project, units, priority, expires) '
+                            'VALUES (?, ?, ?, ?)',
+                            (project, units, priority, now + WAITER_TTL)).lastrowid
+                    else:
+                        conn.execute('UPDATE waiters SET expires = ? WHERE id = ?',
+                                     (now + WAITER_TTL, waiter_id))
+                    admitted = self._admissible(conn, project, waiter_id, units, now)
+                    if admitted:
+                        conn.execute('DELETE FROM waiters WHERE id = ?', (waiter_id,))
+                        charge_id = conn.execute(
+                            'INSERT INTO charges (project, day, operation, units, label, '
+                            'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (project, self.day(now), operation, units, label, now,
+                             now)).lastrowid
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                if admitted:
+                    waiter_id = None
+                    return {'id': charge_id, 'project': project, 'operation': operation,
+                            'units': units}
+
+                if now >= deadline:
+                    raise QuotaDeferred(project, operation, self.next_reset(now))
+                time.sleep(max(0.05, min(self.settings['poll_seconds'], deadline - now)))
+        finally:
+            if waiter_id is not None:
+                conn.execute('DELETE FROM waiters WHERE id = ?', (waiter_id,))
+            conn.close()
+
+    def _settle(self, reservation, status):
+        if not reservation:
+            return
+        with self._connect() as conn:
+            conn.execute('UPDATE charges SET status = ?, updated_at = ? WHERE id = ?',
+                         (status, time.time(), reservation['id']))
+
+    def commit(self, reservation):
+        """The call reached the API; its units are spent"""
+        self._settle(reservation, 'spent')
+
+    def refund(self, reservation):
+        """The call never reached the API (or was rejected for quota); free its units"""
+        self._settle(reservation, 'refunded')
+
+    def mark_exhausted(self, project):
+        """
+        The API reported quotaExceeded (e.g. calls made elsewhere); admit
+        nothing more for this project until the window resets
+        """
+        if not self.enabled:
+            return
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO exhausted (project, day) VALUES (?, ?)',
+                         (project, self.day()))
+        print(f"⚠️  YouTube API quota for {project} is exhausted until "
+              f"{datetime.fromtimestamp(self.next_reset()):%Y-%m-%d %H:%M}")
+
+    def usage(self):
+        """
+        Today's usage per project
+
+        Returns:
+            List of dicts with used/remaining units and calls per operation
+        """
+        if not self.enabled:
+            return []
+        day = self.day()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT project, operation, COUNT(*), SUM(units) FROM charges "
+                "WHERE day = ? AND status != 'refunded' GROUP BY project, operation",
+                (day,)).fetchall()
+            projects = sorted({row[0] for row in rows})
+            report = []
+            for project in projects:
+                report.append({
+                    'project': project,
+                    'used': sum(row[3] for row in rows if row[0] == project),
+                    'remaining': max(0, self._remaining(conn, project, day)),
+                    'calls': {row[1]: row[2] for row in rows if row[0] == project},
+                    'resets_at': self.next_reset()
+                })
+        return report
@@ -0,0 +1,865 @@
+#!/usr/bin/env python3
+"""
+Render Queue
+Distributed rendering: the coordinator publishes render jobs (audio and clip
+manifests by content hash) to a shared queue, and render workers on any node
+claim them under a lease, fetch the inputs, render and report back
+"""
+
+import hmac
+import json
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asset_cache import file_digest
+from video_renderer import render_video, resolve_outputs
+
+# Defaults for the optional "render_queue" block in config.json
+DEFAULT_RENDER_QUEUE_SETTINGS = {
+    "enabled": False,
+    # sqlite (a database file), dir (a shared directory) or http (a
+    # --render-queue-server); register_backend adds others
+    "backend": "sqlite",
+    # Database file or queue directory (None = the backend's DEFAULT_PATHS entry)
+    "path": None,
+    "url": "http://127.0.0.1:8765",
+    # Content-addressed inputs and outputs for the sqlite and dir backends
+    "blob_dir": "render_blobs",
+    "lease_seconds": 120,
+    "max_attempts": 3,
+    "poll_seconds": 2,
+    # The coordinator gives up on a job nobody finished in this time
+    "timeout_minutes": 120,
+    # Worker-side input cache and scratch space
+    "work_dir": "render_work",
+    # Blobs and cached inputs unused this long are deleted
+    "blob_ttl_hours": 48,
+    # The queue server trusts anyone who can reach it unless a token is set;
+    # it refuses to listen beyond loopback without one
+    "host": "127.0.0.1",
+    "port": 8765,
+    # Shared secret sent by http clients in the X-Render-Token header
+    "token": None
+}
+
+DEFAULT_PATHS = {'sqlite': 'render_queue.db', 'dir': 'render_queue'}
+
+TOKEN_HEADER = 'X-Render-Token'
+
+# Job and output names become file names on the worker
+SAFE_NAME_RE = re.compile(r'^[\w-][\w.-]*$')
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+SUFFIX_RE = re.compile(r'^(\.[A-Za-z0-9]+)?$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_jobs (
+    id TEXT PRIMARY KEY,
+    manifest TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS render_jobs_status ON render_jobs (status, lease_expires);
+"""
+
+
+def new_job_id():
+    # Sortable, so the directory backend hands out jobs oldest first
+    return f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def prune_files(root, max_age_hours):
+    """
+    Delete files under root not used (mtime is refreshed on every use)
+    for max_age_hours
+
+    Returns:
+        Bytes freed
+    """
+    cutoff = time.time() - max_age_hours * 3600
+    freed = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime < cutoff:
+                    os.unlink(path)
+                    freed += stat.st_size
+            except OSError:
+                pass
+    return freed
+
+
+def check_manifest(manifest):
+    """
+    Make sure nothing in a render job can point a worker outside its
+    scratch directory: names must be bare file names and inputs plain
+    digests with a short suffix
+
+    Raises:
+        ValueError naming the offending field
+    """
+    outputs = (manifest.get('render') or {}).get('outputs') or []
+    names = [manifest.get('name')] + [output.get('name', 'main') for output in outputs]
+    for name in names:
+        if not isinstance(name, str) or not SAFE_NAME_RE.match(name):
+            raise ValueError(f"Unsafe name in render job: {name!r}")
+    entries = [manifest.get('audio')] + list(manifest.get('clips') or [])
+    music = (manifest.get('mastering') or {}).get('music')
+    if music:
+        entries.append(music)
+    for entry in entries:
+        if not isinstance(entry, dict) or not DIGEST_RE.match(str(entry.get('sha256'))) \
+                or not SUFFIX_RE.match(str(entry.get('suffix', ''))):
+            raise ValueError(f"Bad input in render job: {entry!r}")
+
+
+def _write_json(path, data):
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# --- blob stores ---------------------------------------------------------
+
+class DirectoryBlobStore:
+    """Files stored under their SHA-256 in a directory every node can reach"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest):
+        if not DIGEST_RE.match(str(digest)):
+            raise ValueError(f"Not a SHA-256 digest: {digest!r}")
+        return self.root / digest[:2] / digest
+
+    def has(self, digest):
+        return self._path(digest).exists()
+
+    def put_file(self, path):
+        """Store a file (once per content) and return its digest"""
+        digest = file_digest(path)
+        dest = self._path(digest)
+        if dest.exists():
+            # Keep blobs still in use away from prune_files
+            os.utime(dest)
+        else:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = dest.with_name(f".{digest}.{uuid.uuid4().hex[:8]}.tmp")
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, dest)
+        return digest
+
+    def fetch(self, digest, dest_path):
+        """Copy a stored file to dest_path, checking it against its digest"""
+        os.utime(self._path(digest))
+        tmp_path = Path(f"{dest_path}.part")
+        shutil.copyfile(self._path(digest), tmp_path)
+        if file_digest(tmp_path) != digest:
+            tmp_path.unlink(missing_ok=True)
+            raise ValueError(f"Blob {digest[:12]} is corrupted")
+        os.replace(tmp_path, dest_path)
+        return Path(dest_path)
+
+
+class HTTPBlobStore:
+    """Blob store of a render queue server (see serve_render_queue)"""
+
+    def __init__(self, url, timeout=300, token=None):
+        import requests
+
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def has(self, digest):
+        response = self.session.head(f"{self.url}/blobs/{digest}", timeout=self.timeout)
+        return response.status_code == 200
+
+    def put_file(self, path):
+        digest = file_digest(path)
+        if not self.has(digest):
+            with open(path, 'rb') as f:
+                response = self.session.put(f"{self.url}/blobs/{digest}", data=f,
+                                            timeout=self.timeout)
+            response.raise_for_status()
+        return digest
+
+    def fetch(self, digest, dest_path):
+        tmp_path = Path(f"{dest_path}.part")
+        with self.session.get(f"{self.url}/blobs/{digest}", stream=True,
+                              timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(1024 * 1024):
+                    f.write(chunk)
+        if file_digest(tmp_path) != digest:
+            tmp_path.unlink(missing_ok=True)
+            raise ValueError(f"Blob {digest[:12]} arrived corrupted")
+        os.replace(tmp_path, dest_path)
+        return Path(dest_path)
+
+
+# --- queues --------------------------------------------------------------
+
+class SQLiteRenderQueue:
+    """
+    Render jobs in one SQLite file (local disk, or a shared volume for a few
+    nodes). Claims take the write lock with BEGIN IMMEDIATE, like jobs.db, so
+    exactly one worker wins each job; a job whose lease runs out (crashed or
+    partitioned worker) is handed to the next worker that asks.
+    """
+
+    def __init__(self, db_path, lease_seconds=120, max_attempts=3):
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def submit(self, manifest):
+        """Queue a render job and return its id (ValueError for an unsafe manifest)"""
+        check_manifest(manifest)
+        job_id = new_job_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT INTO render_jobs (id, manifest, created_at, updated_at) '
+                         'VALUES (?, ?, ?, ?)', (job_id, json.dumps(manifest), now, now))
+        return job_id
+
+    def claim(self, worker_id):
+        """
+        Lease the oldest runnable job to worker_id
+
+        Returns:
+            Dict with id, manifest and attempts, or None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Jobs whose workers keep dying are not retried forever
+            conn.execute(
+                "UPDATE render_jobs SET status = 'failed', error = 'lease expired too often', "
+                "updated_at = ? WHERE status = 'running' AND lease_expires < ? "
+                "AND attempts >= ?", (now, now, self.max_attempts))
+            row = conn.execute(
+                "SELECT id, manifest, attempts FROM render_jobs WHERE status = 'pending' "
+                "OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE render_jobs SET status = 'running', worker = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {'id': row[0], 'manifest': json.loads(row[1]), 'attempts': row[2] + 1}
+
+    def _update_owned(self, job_id, worker_id, sql, params):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                sql + " WHERE id = ? AND worker = ? AND status = 'running'",
+                params + (job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def renew(self, job_id, worker_id):
+        """Heartbeat: extend the lease; False means it was lost to another worker"""
+        now = time.time()
+        return self._update_owned(job_id, worker_id,
+                                  'UPDATE render_jobs SET lease_expires = ?, updated_at = ?',
+                                  (now + self.lease_seconds, now))
+
+    def complete(self, job_id, worker_id, result):
+        return self._update_owned(job_id, worker_id,
+                                  "UPDATE render_jobs SET status = 'done', result = ?, "
+                                  "lease_expires = NULL, updated_at = ?",
+                                  (json.dumps(result), time.time()))
+
+    def fail(self, job_id, worker_id, error, attempts):
+        """Release a failed job for another worker, or fail it for good at max_attempts"""
+        status = 'failed' if attempts >= self.max_attempts else 'pending'
+        return self._update_owned(job_id, worker_id,
+                                  "UPDATE render_jobs SET status = ?, error = ?, "
+                                  "lease_expires = NULL, updated_at = ?",
+                                  (status, error, time.time()))
+
+    def status(self, job_id):
+        """
+        Returns:
+            Dict with status, worker, attempts, result and error, or None
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT status, worker, attempts, result, error FROM render_jobs '
+                               'WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'worker': row[1], 'attempts': row[2],
+                'result': json.loads(row[3]) if row[3] else None, 'error': row[4]}
+
+
+class DirectoryRenderQueue:
+    """
+    Render jobs as JSON files in pending/, running/, done/ and failed/
+    under a shared directory. A claim is a rename out of pending/, which
+    only one worker can win; leases are stored in the job file.
+    """
+
+    STATES = ('pending', 'running', 'done', 'failed')
+
+    def __init__(self, root, lease_seconds=120, max_attempts=3):
+        self.root = Path(root)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in self.STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+
+    def _file(self, state, job_id):
+        return self.root / state / f"{job_id}.json"
+
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, manifest):
+        check_manifest(manifest)
+        job_id = new_job_id()
+        _write_json(self._file('pending', job_id),
+                    {'id': job_id, 'manifest': manifest, 'attempts': 0})
+        return job_id
+
+    def _requeue_expired(self):
+        now = time.time()
+        for path in (self.root / 'running').glob('*.json'):
+            job = self._read(path)
+            if not job or job.get('lease_expires', now) >= now:
+                continue
+            state = 'failed' if job['attempts'] >= self.max_attempts else 'pending'
+            if state == 'failed':
+                job['error'] = 'lease expired too often'
+            _write_json(path, job)
+            try:
+                os.rename(path, self._file(state, job['id']))
+            except OSError:
+                pass
+
+    def claim(self, worker_id):
+        self._requeue_expired()
+        for path in sorted((self.root / 'pending').glob('*.json')):
+            running = self.root / 'running' / path.name
+            try:
+                os.rename(path, running)
+            except OSError:
+                # Another worker got there first
+                continue
+            job = self._read(running)
+            job.update(worker=worker_id, lease_expires=time.time() + self.lease_seconds,
+                       attempts=job['attempts'] + 1)
+            _write_json(running, job)
+            return {'id': job['id'], 'manifest': job['manifest'], 'attempts': job['attempts']}
+        return None
+
+    def _owned(self, job_id, worker_id):
+        path = self._file('running', job_id)
+        job = self._read(path)
+        if not job or job.get('worker') != worker_id:
+            return None, None
+        return path, job
+
+    def renew(self, job_id, worker_id):
+        path, job = self._owned(job_id, worker_id)
+        if not job:
+            return False
+        job['lease_expires'] = time.time() + self.lease_seconds
+        _write_json(path, job)
+        return True
+
+    def complete(self, job_id, worker_id, result):
+        path, job = self._owned(job_id, worker_id)
+        if not job:
+            return False
+        job['result'] = result
+        _write_json(path, job)
+        os.rename(path, self._file('done', job_id))
+        return True
+
+    def fail(self, job_id, worker_id, error, attempts):
+        path, job = self._owned(job_id, worker_id)
+        if not job:
+            return False
+        job['error'] = error
+        _write_json(path, job)
+        os.rename(path, self._file('failed' if attempts >= self.max_attempts else 'pending',
+                                   job_id))
+        return True
+
+    def status(self, job_id):
+        for state in self.STATES:
+            job = self._read(self._file(state, job_id))
+            if job:
+                return {'status': state, 'worker': job.get('worker'),
+                        'attempts': job['attempts'], 'result': job.get('result'),
+                        'error': job.get('error')}
+        return None
+
+
+class HTTPRenderQueue:
+    """Client for a render queue served by serve_render_queue"""
+
+    def __init__(self, url, lease_seconds=120, timeout=30, token=None):
+        import requests
+
+        self.url = url.rstrip('/')
+        self.lease_seconds = lease_seconds
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def _post(self, path, payload):
+        response = self.session.post(f"{self.url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def submit(self, manifest):
+        return self._post('/jobs', {'manifest': manifest})['id']
+
+    def claim(self, worker_id):
+        return self._post('/jobs/claim', {'worker': worker_id}).get('job')
+
+    def renew(self, job_id, worker_id):
+        return self._post(f'/jobs/{job_id}/renew', {'worker': worker_id})['ok']
+
+    def complete(self, job_id, worker_id, result):
+        return self._post(f'/jobs/{job_id}/complete', {'worker': worker_id, 'result': result})['ok']
+
+    def fail(self, job_id, worker_id, error, attempts):
+        return self._post(f'/jobs/{job_id}/fail', {'worker': worker_id, 'error': error,
+                                                   'attempts': attempts})['ok']
+
+    def status(self, job_id):
+        response = self.session.get(f"{self.url}/jobs/{job_id}", timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+
+def _local_backend(queue_class, name):
+    def factory(settings):
+        queue = queue_class(settings['path'] or DEFAULT_PATHS[name], settings['lease_seconds'],
+                            settings['max_attempts'])
+        return queue, DirectoryBlobStore(settings['blob_dir'])
+    return factory
+
+
+def _http_backend(settings):
+    return (HTTPRenderQueue(settings['url'], settings['lease_seconds'], token=settings['token']),
+            HTTPBlobStore(settings['url'], token=settings['token']))
+
+
+# name -> factory(settings) returning (queue, blob store)
+BACKENDS = {
+    'sqlite': _local_backend(SQLiteRenderQueue, 'sqlite'),
+    'dir': _local_backend(DirectoryRenderQueue, 'dir'),
+    'http': _http_backend
+}
+
+
+def register_backend(name, factory):
+    """
+    Add a queue backend (e.g. a message broker)
+
+    Args:
+        factory: Callable(settings) returning (queue, blob_store) objects
+            with the methods of SQLiteRenderQueue and DirectoryBlobStore
+    """
+    BACKENDS[name] = factory
+
+
+def open_render_queue(settings=None):
+    """
+    Returns:
+        (merged settings, queue, blob store) for the configured backend
+    """
+    merged = dict(DEFAULT_RENDER_QUEUE_SETTINGS)
+    merged.update(settings or {})
+    if merged['backend'] not in BACKENDS:
+        raise ValueError(f"Unknown render queue backend: {merged['backend']}")
+    queue, blobs = BACKENDS[merged['backend']](merged)
+    return merged, queue, blobs
+
+
+# --- coordinator ---------------------------------------------------------
+
+def build_manifest(blobs, audio_path, video_files, duration, name, resolution, fps,
+                   render_settings, mastering=None):
+    """
+    Upload the inputs of one render and describe it by content hash, so a
+    worker that rendered the same clips before fetches nothing again
+
+    The audio mastering plan travels with its loudness stats, so workers
+    never re-measure; its music track is uploaded like any other input.
+    """
+    def entry(path):
+        return {'sha256': blobs.put_file(path), 'suffix': Path(path).suffix}
+
+    if mastering and mastering.get('music'):
+        mastering = dict(mastering, music=entry(mastering['music']))
+    return {
+        'name': name,
+        'audio': entry(audio_path),
+        'clips': [entry(path) for path in video_files],
+        'duration': duration,
+        'resolution': resolution,
+        'fps': fps,
+        'render': render_settings or {},
+        'mastering': mastering
+    }
+
+
+def fetch_outputs(blobs, result, rendered):
+    """
+    Download a finished job's outputs to the paths in rendered (from
+    resolve_outputs), matched by output name
+
+    Returns:
+        False if an expected output is missing from the result or arrived corrupted
+    """
+    by_name = {output['name']: output for output in result.get('outputs', [])}
+    for output in rendered:
+        remote = by_name.get(output['name'])
+        if not remote or not DIGEST_RE.match(str(remote.get('sha256'))):
+            return False
+        try:
+            blobs.fetch(remote['sha256'], output['path'])
+        except ValueError as e:
+            print(f"⚠️  {e}")
+            return False
+    return True
+
+
+# --- worker --------------------------------------------------------------
+
+class _Heartbeat:
+    """Renews a render job lease in the background while FFmpeg runs"""
+
+    def __init__(self, queue, job_id, worker_id, lease_seconds):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = max(1.0, lease_seconds / 3.0)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.renew(self.job_id, self.worker_id):
+                    self.lost = True
+                    return
+            except Exception as e:
+                # A missed beat is fine; the lease only lapses after several
+                print(f"⚠️  Heartbeat for render job {self.job_id} failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _fetch_input(blobs, entry, cache_dir):
+    """Inputs are cached by content hash across jobs (stock clips repeat a lot)"""
+    path = cache_dir / f"{entry['sha256']}{entry.get('suffix', '')}"
+    if not path.exists():
+        blobs.fetch(entry['sha256'], path)
+    else:
+        os.utime(path)
+    return path
+
+
+def render_job(blobs, job, work_dir):
+    """
+    Fetch a job's inputs, render it and store the outputs
+
+    Returns:
+        Result dict with the outputs' digests, when each was finished and the render time
+    """
+    manifest = job['manifest']
+    # Checked again here: the queue may be shared with other submitters
+    check_manifest(manifest)
+    cache_dir = Path(work_dir) / 'inputs'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    scratch = Path(work_dir) / 'jobs' / job['id']
+    scratch.mkdir(parents=True, exist_ok=True)
+    try:
+        audio_path = _fetch_input(blobs, manifest['audio'], cache_dir)
+        video_files = [_fetch_input(blobs, entry, cache_dir) for entry in manifest['clips']]
+        mastering = manifest.get('mastering')
+        if mastering and mastering.get('music'):
+            mastering = dict(mastering,
+                             music=str(_fetch_input(blobs, mastering['music'], cache_dir)))
+        outputs = resolve_outputs(scratch / manifest['name'], manifest['resolution'],
+                                  manifest['render'].get('outputs'))
+
+        started = time.monotonic()
+        timings = {}
+        encodes = render_video(audio_path, video_files, outputs[0]['path'], manifest['duration'],
+                     resolution=manifest['resolution'], fps=manifest['fps'],
+                     settings=manifest['render'], work_dir=scratch, mastering=mastering,
+                     timings=timings)
+        render_seconds = time.monotonic() - started
+
+        return {
+            'outputs': [{'name': output['name'], 'sha256': blobs.put_file(output['path']),
+                         'bytes': output['path'].stat().st_size,
+                         'ready_seconds': timings.get(str(output['path']), round(render_seconds, 3))}
+                        for output in outputs],
+            'render_seconds': round(render_seconds, 3),
+            'encodes': encodes
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_render_worker(settings=None, worker_id=None, stop_when_empty=True):
+    """
+    Claim and render jobs until the queue is empty (or forever)
+
+    Returns:
+        Number of jobs rendered by this worker
+    """
+    settings, queue, blobs = open_render_queue(settings)
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+    print(f"🖥️  Render worker {worker_id} started ({settings['backend']} queue)")
+
+    last_prune = 0.0
+    while True:
+        if time.time() - last_prune > 3600:
+            last_prune = time.time()
+            freed = prune_files(Path(settings['work_dir']) / 'inputs', settings['blob_ttl_hours'])
+            if isinstance(blobs, DirectoryBlobStore):
+                freed += prune_files(blobs.root, settings['blob_ttl_hours'])
+            if freed:
+                print(f"🧹 Freed {freed / (1024 * 1024):.1f} MB of unused render inputs")
+        try:
+            job = queue.claim(worker_id)
+        except Exception as e:
+            print(f"⚠️  Could not reach the render queue: {e}")
+            job = None
+        if job is None:
+            if stop_when_empty:
+                break
+            time.sleep(settings['poll_seconds'])
+            continue
+
+        print(f"\n🎬 Render job {job['id']} ({job['manifest']['name']}) attempt {job['attempts']}")
+        with _Heartbeat(queue, job['id'], worker_id, settings['lease_seconds']) as heartbeat:
+            try:
+                result = render_job(blobs, job, settings['work_dir'])
+            except Exception as e:
+                print(f"❌ Render job {job['id']} failed: {e}")
+                queue.fail(job['id'], worker_id, str(e), job['attempts'])
+                continue
+        result['worker'] = worker_id
+        if heartbeat.lost or not queue.complete(job['id'], worker_id, result):
+            print(f"⚠️  Render job {job['id']} lease lost to another worker, result dropped")
+            continue
+        completed += 1
+        print(f"✅ Render job {job['id']} done in {result['render_seconds']:.1f}s")
+
+    print(f"🖥️  Render worker {worker_id} finished: {completed} job(s) rendered")
+    return completed
+
+
+# --- network backend server ----------------------------------------------
+
+def serve_render_queue(settings=None):
+    """
+    Serve a SQLite queue and blob directory over HTTP for workers on other
+    nodes (backend "http"); blocks until interrupted
+
+    Anyone who can reach the server can queue renders and upload blobs, so
+    beyond loopback it only starts with a "token" that every client sends.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    merged = dict(DEFAULT_RENDER_QUEUE_SETTINGS)
+    merged.update(settings or {})
+    token = merged['token']
+    if not token and merged['host'] not in ('127.0.0.1', 'localhost', '::1'):
+        print(f"❌ Refusing to serve the render queue on {merged['host']} without a "
+              f"\"token\" in the \"render_queue\" block")
+        return
+    path = merged['path'] or DEFAULT_PATHS['sqlite']
+    queue = SQLiteRenderQueue(path, merged['lease_seconds'], merged['max_attempts'])
+    blobs = DirectoryBlobStore(merged['blob_dir'])
+
+    class QueueHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, payload=None, data=None):
+            body = data if data is not None else json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/octet-stream' if data is not None
+                             else 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def _authorized(self):
+            if not token or hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                return True
+            # The request body is left unread, so the connection can't be reused
+            self.close_connection = True
+            self._reply(401, {'error': 'bad or missing token'})
+            return False
+
+        def _payload(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _blob(self):
+            digest = self.path.rsplit('/', 1)[1]
+            if len(digest) != 64 or not all(c in '0123456789abcdef' for c in digest):
+                self._reply(400, {'error': 'bad digest'})
+                return None
+            return digest
+
+        def do_HEAD(self):
+            if not self._authorized():
+                return
+            digest = self._blob() if self.path.startswith('/blobs/') else None
+            self._reply(200 if digest and blobs.has(digest) else 404, {})
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path.startswith('/blobs/'):
+                digest = self._blob()
+                if digest is None:
+                    return
+                if not blobs.has(digest):
+                    return self._reply(404, {'error': 'no such blob'})
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                path = blobs._path(digest)
+                self.send_header('Content-Length', str(path.stat().st_size))
+                self.end_headers()
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+                return
+            if self.path.startswith('/jobs/'):
+                status = queue.status(self.path.rsplit('/', 1)[1])
+                return self._reply(200 if status else 404, status or {'error': 'no such job'})
+            self._reply(404, {'error': 'not found'})
+
+        def do_PUT(self):
+            if not self._authorized():
+                return
+            digest = self._blob() if self.path.startswith('/blobs/') else None
+            if digest is None:
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            tmp_path = blobs.root / f".upload.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            try:
+                if blobs.put_file(tmp_path) != digest:
+                    return self._reply(400, {'error': 'digest mismatch'})
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            self._reply(200, {'ok': True})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            payload = self._payload()
+            parts = self.path.strip('/').split('/')
+            if parts == ['jobs']:
+                try:
+                    return self._reply(200, {'id': queue.submit(payload['manifest'])})
+                except ValueError as e:
+                    return self._reply(400, {'error': str(e)})
+            if parts == ['jobs', 'claim']:
+                return self._reply(200, {'job': queue.claim(payload['worker'])})
+            if len(parts) == 3 and parts[0] == 'jobs':
+                job_id, action = parts[1], parts[2]
+                if action == 'renew':
+                    return self._reply(200, {'ok': queue.renew(job_id, payload['worker'])})
+                if action == 'complete':
+                    return self._reply(200, {'ok': queue.complete(job_id, payload['worker'],
+                                                                  payload['result'])})
+                if action == 'fail':
+                    return self._reply(200, {'ok': queue.fail(job_id, payload['worker'],
+                                                              payload['error'],
+                                                              payload['attempts'])})
+            self._reply(404, {'error': 'not found'})
+
+        def log_message(self, *args):
+            pass
+
+    def prune():
+        while True:
+            freed = prune_files(blobs.root, merged['blob_ttl_hours'])
+            if freed:
+                print(f"🧹 Freed {freed / (1024 * 1024):.1f} MB of unused blobs")
+            time.sleep(3600)
+
+    threading.Thread(target=prune, daemon=True).start()
+    server = ThreadingHTTPServer((merged['host'], int(merged['port'])), QueueHandler)
+    server.daemon_threads = True
+    print(f"📮 Render queue serving on http://{merged['host']}:{server.server_port} "
+          f"({path}, blobs in {merged['blob_dir']})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Render queue server stopped")
+    finally:
+        server.server_close()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Resumable Upload Module
+Chunked YouTube uploads with adaptive chunk size, retries and persisted sessions
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+THUMBNAIL_URL = "https://www.googleapis.com/upload/youtube/v3/thumbnails/set"
+
+# The resumable protocol requires chunks in multiples of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+
+# Defaults for the optional "uploads" block in config.json
+DEFAULT_UPLOAD_SETTINGS = {
+    "upload_url": UPLOAD_URL,
+    "thumbnail_url": THUMBNAIL_URL,
+    "initial_chunk_mb": 8,
+    "min_chunk_mb": 1,
+    "max_chunk_mb": 128,
+    "target_chunk_seconds": 8,
+    "max_retries": 8,
+    "timeout": 120,
+    "session_file": "upload_sessions.json",
+    "concurrency": 2
+}
+
+# Google keeps resumable sessions for about a week
+SESSION_MAX_AGE = 6 * 24 * 3600
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    """Upload failed with a non-retryable response or ran out of retries"""
+
+
+def _align(size):
+    return max(CHUNK_ALIGNMENT, (int(size) // CHUNK_ALIGNMENT) * CHUNK_ALIGNMENT)
+
+
+def _range_end(header):
+    """Parse the last acknowledged byte from a 'bytes=0-N' Range header"""
+    if not header or '-' not in header:
+        return -1
+    return int(header.rsplit('-', 1)[1])
+
+
+class UploadSessionStore:
+    """Persists session URIs so a restarted process continues an upload"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, sessions):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(sessions, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, fingerprint):
+        with self._lock:
+            entry = self._read().get(fingerprint)
+        if entry and time.time() - entry['created'] < SESSION_MAX_AGE:
+            return entry['uri']
+        return None
+
+    def put(self, fingerprint, uri):
+        with self._lock:
+            sessions = self._read()
+            sessions[fingerprint] = {'uri': uri, 'created': time.time()}
+            self._write(sessions)
+
+    def remove(self, fingerprint):
+        with self._lock:
+            sessions = self._read()
+            if sessions.pop(fingerprint, None) is not None:
+                self._write(sessions)
+
+
+def upload_fingerprint(video_file, body):
+    """Identify an upload by file identity plus metadata"""
+    stat = os.stat(video_file)
+    payload = json.dumps({
+        'file': os.path.abspath(video_file),
+        'size': stat.st_size,
+        'mtime': int(stat.st_mtime),
+        'body': body
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResumableUploader:
+    """
+    Speaks the resumable upload protocol directly over an authorized
+    requests session. After every chunk the server-acknowledged offset is
+    taken from the 308 Range header, so retries never resend confirmed
+    bytes. Chunk size follows measured throughput, aiming for each PUT to
+    take about target_chunk_seconds.
+    """
+
+    def __init__(self, session, settings=None):
+        self.session = session
+        self.settings = dict(DEFAULT_UPLOAD_SETTINGS)
+        self.settings.update(settings or {})
+        self.sessions = UploadSessionStore(self.settings['session_file'])
+        self.min_chunk = _align(self.settings['min_chunk_mb'] * 1024 * 1024)
+        self.max_chunk = _align(self.settings['max_chunk_mb'] * 1024 * 1024)
+        # Whether the last upload() started a session the API answered; only
+        # that request (videos.insert) costs quota, resumed sessions don't
+        self.reached_api = False
+
+    def _start_session(self, body, part, total):
+        response = self.session.post(
+            self.settings['upload_url'],
+            params={'uploadType': 'resumable', 'part': part},
+            json=body,
+            headers={
+                'X-Upload-Content-Type': 'video/*',
+                'X-Upload-Content-Length': str(total)
+            },
+            timeout=self.settings['timeout'])
+        self.reached_api = True
+        if response.status_code != 200 or 'Location' not in response.headers:
+            raise UploadError(f"Could not start upload session: {response.status_code} {response.text}")
+        return response.headers['Location']
+
+    def _backoff(self, retries, error):
+        """Wait before retry number `retries`, or give up once max_retries are spent"""
+        if retries > self.settings['max_retries']:
+            raise UploadError(f"Giving up after {retries - 1} retries: {error}")
+        delay = min(2 ** retries, 64) + random.random()
+        print(f"\n⚠️  Upload interrupted ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+    def _query_offset(self, uri, total):
+        """
+        Ask the server how much it already has, retrying dropped
+        connections and 5xx answers with the same backoff as chunks
+
+        Returns:
+            (offset, result) where result is the final JSON if already done,
+            or (None, None) if the session no longer exists
+        """
+        retries = 0
+        while True:
+            try:
+                return self._status_query(uri, total)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retries += 1
+                self._backoff(retries, e)
+
+    def _status_query(self, uri, total):
+        response = self.session.put(uri, headers={'Content-Range': f'bytes */{total}'},
+                                    timeout=self.settings['timeout'])
+        if response.status_code in (200, 201):
+            return total, response.json()
+        if response.status_code == 308:
+            return _range_end(response.headers.get('Range')) + 1, None
+        if response.status_code in (404, 410):
+            return None, None
+        if response.status_code in RETRYABLE_STATUS:
+            raise requests.ConnectionError(f"status query returned {response.status_code}")
+        raise UploadError(f"Upload status query failed: {response.status_code} {response.text}")
+
+    def _adapt(self, chunk_size, sent, elapsed):
+        if elapsed <= 0:
+            return chunk_size
+        target = sent / elapsed * self.settings['target_chunk_seconds']
+        # Move at most 4x per step so one odd measurement doesn't swing it wildly
+        target = min(max(target, chunk_size / 4), chunk_size * 4)
+        return min(max(_align(target), self.min_chunk), self.max_chunk)
+
+    def upload(self, video_file, body, part, progress=None):
+        """
+        Upload video_file with metadata body
+
+        Args:
+            progress: Optional callback(bytes_done, total)
+
+        Returns:
+            The API's JSON response for the created video
+        """
+        self.reached_api = False
+        total = os.path.getsize(video_file)
+        fingerprint = upload_fingerprint(video_file, body)
+        chunk_size = min(max(_align(self.settings['initial_chunk_mb'] * 1024 * 1024),
+                             self.min_chunk), self.max_chunk)
+
+        uri = self.sessions.get(fingerprint)
+        offset = 0
+        if uri:
+            offset, result = self._query_offset(uri, total)
+            if result is not None:
+                self.sessions.remove(fingerprint)
+                return result
+            if offset is None:
+                uri = None
+            else:
+                print(f"↪️  Resuming upload at {offset * 100 // max(total, 1)}%")
+        if not uri:
+            uri = self._start_session(body, part, total)
+            self.sessions.put(fingerprint, uri)
+            offset = 0
+
+        retries = 0
+        with open(video_file, 'rb') as f:
+            while True:
+                f.seek(offset)
+                data = f.read(min(chunk_size, total - offset))
+                end = offset + len(data) - 1
+                headers = {'Content-Range': f'bytes {offset}-{end}/{total}'}
+
+                started = time.monotonic()
+                try:
+                    response = self.session.put(uri, data=data, headers=headers,
+                                                timeout=self.settings['timeout'])
+                    if response.status_code in RETRYABLE_STATUS:
+                        raise requests.ConnectionError(f"server returned {response.status_code}")
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    retries += 1
+                    self._backoff(retries, e)
+                    # A failed chunk may have partly landed; trust the server
+                    offset, result = self._query_offset(uri, total)
+                    if result is not None:
+                        self.sessions.remove(fingerprint)
+                        return result
+                    if offset is None:
+                        self.sessions.remove(fingerprint)
+                        raise UploadError("Upload session expired")
+                    chunk_size = max(self.min_chunk, _align(chunk_size / 2))
+                    continue
+
+                if response.status_code in (200, 201):
+                    self.sessions.remove(fingerprint)
+                    if progress:
+                        progress(total, total)
+                    return response.json()
+
+                if response.status_code != 308:
+                    self.sessions.remove(fingerprint)
+                    raise UploadError(f"Upload failed: {response.status_code} {response.text}")
+
+                acknowledged = _range_end(response.headers.get('Range')) + 1
+                sent = acknowledged - offset
+                chunk_size = self._adapt(chunk_size, sent, time.monotonic() - started)
+                offset = acknowledged
+                retries = 0
+                if progress:
+                    progress(offset, total)
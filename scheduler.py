@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Scheduler Daemon
+Runs the pipeline for each slot in the config "schedule" block, early enough to publish on time
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from batch_runner import STAGES, read_topics, run_stage
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# Defaults for optional keys of the "schedule" block in config.json
+DEFAULT_SCHEDULE_SETTINGS = {
+    "enabled": False,
+    "time": "09:00",
+    "days": ["monday", "wednesday", "friday"],
+    "topics_file": None,
+    "upload": True,
+    "catch_up_limit": 3,
+    "state_file": "schedule_state.json",
+    "lock_file": "scheduler.lock"
+}
+
+# Used until a real run has been timed
+DEFAULT_STAGE_SECONDS = {
+    'script': 30,
+    'voiceover': 30,
+    'footage': 10,
+    'download': 60,
+    'render': 180,
+    'upload': 240
+}
+
+# Start this much earlier than the estimate says, to absorb a slow run
+LEAD_SAFETY_FACTOR = 1.5
+LEAD_MARGIN_SECONDS = 300
+EWMA_ALPHA = 0.3
+
+
+def upcoming_slots(schedule, after, count=7):
+    """
+    Precompute the next publish times from a schedule block
+
+    Args:
+        schedule: Dict with "time" (HH:MM) and "days" (weekday names)
+        after: Slots strictly after this datetime are returned
+        count: How many slots to return
+
+    Returns:
+        Sorted list of naive local datetimes
+    """
+    hour, minute = (int(part) for part in schedule['time'].split(':'))
+    weekdays = sorted({DAY_NAMES.index(day.strip().lower()) for day in schedule['days']})
+    if not weekdays:
+        return []
+
+    slots = []
+    day = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    while len(slots) < count:
+        if day.weekday() in weekdays and day > after:
+            slots.append(day)
+        day += timedelta(days=1)
+    return slots
+
+
+def slots_between(schedule, start, end):
+    """All publish times in (start, end]"""
+    slots = []
+    cursor = start
+    while True:
+        batch = upcoming_slots(schedule, cursor, count=7)
+        for slot in batch:
+            if slot > end:
+                return slots
+            slots.append(slot)
+        if not batch:
+            return slots
+        cursor = batch[-1]
+
+
+class ScheduleLock:
+    """Single-instance lock file; a lock held by a dead process is taken over"""
+
+    def __init__(self, path):
+        self.path = path
+        self.held = False
+
+    def acquire(self):
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._holder_alive():
+                    return False
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            self.held = True
+            return True
+        return False
+
+    def _holder_alive(self):
+        try:
+            with open(self.path, 'r') as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return False
+        if pid <= 0:
+            return False
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        return True
+
+    def release(self):
+        if self.held:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.held = False
+
+
+class ScheduleDaemon:
+    """
+    Sleeps until the next slot's start time (publish time minus the
+    estimated pipeline duration), runs one video and uploads it scheduled
+    to go public at the slot. Per-stage durations are kept as a rolling
+    average in the state file along with the last completed slot, so a
+    restarted daemon knows which slots were missed while it was down.
+    """
+
+    def __init__(self, automation, settings=None):
+        self.automation = automation
+        self.settings = dict(DEFAULT_SCHEDULE_SETTINGS)
+        self.settings.update(settings or {})
+        self.state_file = self.settings['state_file']
+        self.state = self._load_state()
+        self.lock = ScheduleLock(self.settings['lock_file'])
+        self._stop = threading.Event()
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️  Could not read {self.state_file}, starting fresh")
+        return {'last_slot': None, 'stage_seconds': {}, 'topic_index': 0}
+
+    def _save_state(self):
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def estimated_lead(self):
+        """Seconds before a slot that generation needs to start"""
+        stage_seconds = self.state.get('stage_seconds', {})
+        total = sum(stage_seconds.get(stage, DEFAULT_STAGE_SECONDS[stage]) for stage in STAGES)
+        return timedelta(seconds=total * LEAD_SAFETY_FACTOR + LEAD_MARGIN_SECONDS)
+
+    def _record_stage(self, stage, seconds):
+        stage_seconds = self.state.setdefault('stage_seconds', {})
+        previous = stage_seconds.get(stage)
+        if previous is None:
+            stage_seconds[stage] = seconds
+        else:
+            stage_seconds[stage] = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * previous
+
+    def _next_topic(self):
+        """Next line of topics_file, or None to let Claude pick within the niche"""
+        topics_file = self.settings.get('topics_file')
+        if not topics_file or not os.path.exists(topics_file):
+            return None
+        topics = read_topics(topics_file)
+        if not topics:
+            return None
+        index = self.state.get('topic_index', 0)
+        self.state['topic_index'] = index + 1
+        return topics[index % len(topics)]
+
+    def run_slot(self, slot):
+        """Generate (and upload) the video for one publish slot"""
+        # None lets Claude pick a fresh subject each slot; a fixed fallback
+        # string would hit the script memo and repeat the first video
+        topic = self._next_topic()
+        publish_at = slot if slot > datetime.now() else None
+        job = {'index': 0, 'topic': topic, 'publish_at': publish_at}
+        self.automation.workspaces.maybe_collect()
+
+        label = topic or f"a trending topic in {self.automation.config['video_settings']['niche']}"
+        print(f"\n⏰ Running slot {slot:%a %Y-%m-%d %H:%M} — topic: {label}")
+        ok = True
+        for stage in STAGES:
+            started = time.monotonic()
+            try:
+                ok = bool(run_stage(self.automation, stage, job, upload=self.settings['upload']))
+            except Exception as e:
+                print(f"❌ Scheduled run failed at {stage}: {e}")
+                ok = False
+            if not ok:
+                break
+            self._record_stage(stage, time.monotonic() - started)
+        if 'workspace' in job:
+            job.pop('workspace').cleanup(failed=not ok)
+
+        # A failed slot is still marked done so the daemon doesn't retry it
+        # in a tight loop; the next slot gets a fresh attempt
+        self.state['last_slot'] = slot.isoformat()
+        self._save_state()
+        return ok
+
+    def _due_slots(self, now):
+        """Slots missed since the last completed one, capped by catch_up_limit"""
+        last_slot = self.state.get('last_slot')
+        if not last_slot:
+            return []
+        missed = slots_between(self.settings, datetime.fromisoformat(last_slot), now)
+        limit = max(0, int(self.settings['catch_up_limit']))
+        if len(missed) > limit:
+            print(f"⚠️  {len(missed)} slots missed, catching up the latest {limit}")
+            skipped = missed[:len(missed) - limit]
+            self.state['last_slot'] = skipped[-1].isoformat()
+            self._save_state()
+            missed = missed[len(missed) - limit:]
+        return missed
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        """Main daemon loop; returns when stop() is called or the lock is held elsewhere"""
+        if not self.lock.acquire():
+            print(f"❌ Scheduler already running (lock: {self.settings['lock_file']})")
+            return False
+
+        try:
+            print("⏰ Scheduler started")
+            for slot in self._due_slots(datetime.now()):
+                if self._stop.is_set():
+                    return True
+                self.run_slot(slot)
+
+            while not self._stop.is_set():
+                now = datetime.now()
+                lead = self.estimated_lead()
+                # Counting from the last completed slot means a slot that a
+                # long run overran is picked up straight away
+                last_slot = self.state.get('last_slot')
+                after = datetime.fromisoformat(last_slot) if last_slot else now
+                slots = upcoming_slots(self.settings, after, count=7)
+                if not slots:
+                    print("⚠️  Schedule has no days configured")
+                    return False
+
+                print("📅 Upcoming slots: " + ", ".join(f"{slot:%a %m-%d %H:%M}" for slot in slots[:3]))
+                slot = slots[0]
+                start_at = slot - lead
+                wait_seconds = (start_at - now).total_seconds()
+                if wait_seconds > 0:
+                    print(f"💤 Sleeping until {start_at:%a %m-%d %H:%M} "
+                          f"(lead time {int(lead.total_seconds() // 60)} min)")
+                    # One timed wait per slot; stop() wakes it immediately
+                    if self._stop.wait(wait_seconds):
+                        break
+                    # Estimates may have changed (or the clock jumped) while asleep
+                    if datetime.now() < start_at:
+                        continue
+
+                self.run_slot(slot)
+            return True
+        finally:
+            self.lock.release()
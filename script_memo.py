@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Script Memo
+Local store of generated scripts, keyed by model, prompt and topic
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Defaults for the optional "scripts" block in config.json
+DEFAULT_SCRIPT_SETTINGS = {
+    "model": "claude-sonnet-4-5-20250929",
+    "max_tokens": 2000,
+    "prompt_caching": True,
+    "memo": True,
+    "memo_dir": ".asset_cache/scripts",
+    "batch_poll_seconds": 60,
+    "batch_timeout_hours": 24,
+    "max_reasks": 1,
+    "limits": None,
+    # Point at a stand-in Messages API (e.g. for testing); None = Anthropic
+    "base_url": None
+}
+
+
+def prompt_digest(*parts):
+    """Hash of the instruction text, so editing the prompt invalidates old scripts"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+def memo_key(model, prompt_hash, topic):
+    payload = json.dumps({
+        'model': model,
+        'prompt': prompt_hash,
+        'topic': ' '.join(topic.lower().split())
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ScriptMemo:
+    """One JSON file per script, like the footage search cache"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Message Batches submitted but not collected yet, one JSON file each
+        self.batches_dir = self.root / 'batches'
+        self.batches_dir.mkdir(exist_ok=True)
+
+    @classmethod
+    def from_config(cls, settings=None):
+        """Build the memo from the config "scripts" block, or None if disabled"""
+        merged = dict(DEFAULT_SCRIPT_SETTINGS)
+        merged.update(settings or {})
+        if not merged['memo']:
+            return None
+        return cls(merged['memo_dir'])
+
+    def get(self, key):
+        """Return the stored Claude response text for key, or None"""
+        try:
+            with open(self.root / f"{key}.json", 'r') as f:
+                return json.load(f).get('content')
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, topic, content, model):
+        path = self.root / f"{key}.json"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'topic': topic,
+                'model': model,
+                'created_at': time.time(),
+                'content': content
+            }, f)
+        os.replace(tmp_path, path)
+
+    def save_batch(self, batch_id, requests):
+        """
+        Remember a submitted batch, so a later run collects its results
+        instead of paying for the same scripts again
+
+        Args:
+            requests: custom_id -> {'topic', 'key', 'model'}
+        """
+        path = self.batches_dir / f"{batch_id}.json"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'id': batch_id, 'created_at': time.time(), 'requests': requests}, f)
+        os.replace(tmp_path, path)
+
+    def open_batches(self):
+        """Saved batches, oldest first, as (batch_id, requests) pairs"""
+        batches = []
+        for path in self.batches_dir.glob('*.json'):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                batches.append((data['created_at'], data['id'], data['requests']))
+            except (OSError, ValueError, KeyError):
+                continue
+        return [(batch_id, requests) for _, batch_id, requests in sorted(batches)]
+
+    def forget_batch(self, batch_id):
+        (self.batches_dir / f"{batch_id}.json").unlink(missing_ok=True)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Script Parser
+Single-pass parser and validator for Claude's labelled script responses
+"""
+
+import re
+
+LABELS = ('TITLE', 'DESCRIPTION', 'TAGS', 'KEYWORDS', 'SCRIPT')
+
+# "TITLE: ...", also tolerating markdown decoration such as "**TITLE:**" or "## SCRIPT:"
+LABEL_RE = re.compile(r'^[\s*#>_]*(' + '|'.join(LABELS) + r')[\s*_]*:[\s*_]*(.*)$', re.IGNORECASE)
+
+# Defaults for "limits" in the optional "scripts" block of config.json.
+# The prompt asks for 150-200 words; the word limits allow 10% slack.
+DEFAULT_SCRIPT_LIMITS = {
+    "max_title_chars": 60,
+    "min_tags": 5,
+    "max_tags": 15,
+    "min_keywords": 3,
+    "max_keywords": 5,
+    "min_words": 135,
+    "max_words": 220
+}
+
+
+def _clean(text):
+    """Strip whitespace, wrapping quotes and an echoed [placeholder] bracket pair"""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == '[' and text[-1] == ']':
+        text = text[1:-1].strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        text = text[1:-1].strip()
+    return text
+
+
+def _split_list(text):
+    return [item for item in (_clean(part).lstrip('#').strip() for part in text.split(','))
+            if item]
+
+
+def parse_script_response(content):
+    """
+    Split a labelled response into its sections in one pass
+
+    Lines after a label belong to it until the next label, so multi-line
+    descriptions and scripts are kept whole. Only the first occurrence of
+    each label counts; text before the first label is ignored.
+
+    Returns:
+        Dict with title, description, tags (list), keywords (comma-separated
+        string) and script, plus 'missing': labels that never appeared
+    """
+    sections = {}
+    current = None
+    for line in (content or '').splitlines():
+        match = LABEL_RE.match(line)
+        if match and match.group(1).upper() not in sections:
+            current = match.group(1).upper()
+            sections[current] = [match.group(2)]
+        elif current:
+            sections[current].append(line)
+
+    def text(label, joiner='\n'):
+        lines = [line.strip() for line in sections.get(label, [])]
+        return _clean(joiner.join(line for line in lines if line))
+
+    return {
+        'title': text('TITLE', ' '),
+        'description': text('DESCRIPTION', ' '),
+        'tags': _split_list(text('TAGS', ',')),
+        'keywords': ', '.join(_split_list(text('KEYWORDS', ','))),
+        'script': text('SCRIPT'),
+        'missing': [label for label in LABELS if label not in sections]
+    }
+
+
+def validate_script(data, limits=None):
+    """
+    Check a parsed script against the prompt's requirements
+
+    Returns:
+        List of human-readable problems (empty when the script is usable)
+    """
+    merged = dict(DEFAULT_SCRIPT_LIMITS)
+    merged.update(limits or {})
+    missing = data.get('missing', [])
+    problems = [f"the {label} section is missing" for label in missing]
+
+    title = data.get('title', '')
+    if 'TITLE' not in missing:
+        if not title:
+            problems.append("the title is empty")
+        elif len(title) > merged['max_title_chars']:
+            problems.append(f"the title is {len(title)} characters "
+                            f"(max {merged['max_title_chars']})")
+
+    tags = len(data.get('tags', []))
+    if 'TAGS' not in missing and not merged['min_tags'] <= tags <= merged['max_tags']:
+        problems.append(f"there are {tags} tags (need {merged['min_tags']}-{merged['max_tags']})")
+
+    keywords = len([k for k in data.get('keywords', '').split(',') if k.strip()])
+    if 'KEYWORDS' not in missing and not (
+            merged['min_keywords'] <= keywords <= merged['max_keywords']):
+        problems.append(f"there are {keywords} keyword phrases "
+                        f"(need {merged['min_keywords']}-{merged['max_keywords']})")
+
+    words = len(data.get('script', '').split())
+    if 'SCRIPT' not in missing and not merged['min_words'] <= words <= merged['max_words']:
+        problems.append(f"the script is {words} words "
+                        f"(need {merged['min_words']}-{merged['max_words']})")
+    return problems
+
+
+def reask_message(problems):
+    """Follow-up user turn asking Claude to fix only what failed validation"""
+    listed = '\n'.join(f"- {problem}" for problem in problems)
+    return (f"Your response did not meet the requirements:\n{listed}\n\n"
+            "Rewrite it, fixing these problems and keeping everything else. Reply with "
+            "all five labelled sections (TITLE, DESCRIPTION, TAGS, KEYWORDS, SCRIPT) "
+            "and nothing else.")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Stock Footage Downloader
+Pooled, parallel downloads with HTTP Range resume and per-host rate limiting
+"""
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+# Defaults for the optional "downloads" block in config.json
+DEFAULT_DOWNLOAD_SETTINGS = {
+    "concurrency": 4,
+    "chunk_size": 1024 * 1024,
+    "per_host_interval": 0.25,
+    "retries": 3,
+    "timeout": 30
+}
+
+
+class HostRateLimiter:
+    """Spaces out request starts per host instead of sleeping between every clip"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host):
+        """Claim this host's next request slot; returns seconds until it comes up"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+        return slot - now
+
+
+def _content_range_total(header):
+    """Return the total size from a 'bytes a-b/total' Content-Range header"""
+    if not header or '/' not in header:
+        return None
+    total = header.rsplit('/', 1)[1].strip()
+    return int(total) if total.isdigit() else None
+
+
+def pick_rendition(video_files, width, height):
+    """
+    Choose the smallest Pexels rendition that still covers width x height
+
+    Falls back to the largest available rendition when none is big enough,
+    so 4K files are only fetched when nothing smaller will do.
+    """
+    candidates = [f for f in video_files if f.get('link') and f.get('width') and f.get('height')]
+    if not candidates:
+        return video_files[0] if video_files else None
+
+    def area(f):
+        return f['width'] * f['height']
+
+    covering = [f for f in candidates if f['width'] >= width and f['height'] >= height]
+    if covering:
+        return min(covering, key=area)
+    return max(candidates, key=area)
+
+
+class AsyncStockDownloader:
+    """
+    Requests go through the caller's httpx.AsyncClient, so all jobs on an
+    event loop draw from one connection pool.
+    """
+
+    def __init__(self, client, settings=None):
+        self.client = client
+        self.settings = dict(DEFAULT_DOWNLOAD_SETTINGS)
+        self.settings.update(settings or {})
+        self.rate_limiter = HostRateLimiter(self.settings['per_host_interval'])
+
+    async def download(self, url, dest_path):
+        """
+        Download a single URL to dest_path
+
+        Data is streamed into '<dest_path>.part' and renamed into place once
+        complete. If a .part file is left over from an earlier attempt (or an
+        earlier run) the transfer resumes from its size with a Range request.
+
+        Returns:
+            dest_path on success; raises the last error after all retries
+        """
+        import httpx
+
+        dest_path = Path(dest_path)
+        part_path = dest_path.with_name(dest_path.name + '.part')
+        host = urlparse(url).netloc
+        chunk_size = int(self.settings['chunk_size'])
+        retries = int(self.settings['retries'])
+        last_error = None
+
+        for attempt in range(retries + 1):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            delay = self.rate_limiter.reserve(host)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                async with self.client.stream('GET', url, headers=headers,
+                                              timeout=self.settings['timeout'],
+                                              follow_redirects=True) as response:
+                    if response.status_code == 416:
+                        # Nothing past our offset: either the .part is already
+                        # complete or it is stale, in which case start over
+                        total = _content_range_total(response.headers.get('Content-Range'))
+                        if total is not None and total == offset:
+                            os.replace(part_path, dest_path)
+                            return dest_path
+                        part_path.unlink()
+                        raise IOError("stale partial download discarded")
+
+                    response.raise_for_status()
+
+                    if response.status_code == 206:
+                        mode = 'ab'
+                        expected = _content_range_total(response.headers.get('Content-Range'))
+                    else:
+                        # Server ignored the Range header, so rewrite from scratch
+                        mode = 'wb'
+                        length = response.headers.get('Content-Length')
+                        expected = int(length) if length and length.isdigit() else None
+
+                    with open(part_path, mode) as f:
+                        async for chunk in response.aiter_bytes(chunk_size):
+                            f.write(chunk)
+
+                size = part_path.stat().st_size
+                if expected is not None and size < expected:
+                    raise IOError(f"truncated response ({size}/{expected} bytes)")
+
+                os.replace(part_path, dest_path)
+                return dest_path
+
+            except (httpx.HTTPError, IOError) as e:
+                last_error = e
+                if attempt < retries:
+                    await asyncio.sleep(min(0.5 * 2 ** attempt, 8))
+
+        raise last_error
+
+    async def download_all(self, jobs):
+        """
+        Download several (url, dest_path) pairs concurrently
+
+        Returns:
+            List aligned with jobs: the downloaded path, or None on failure
+        """
+        if not jobs:
+            return []
+        semaphore = asyncio.Semaphore(max(1, int(self.settings['concurrency'])))
+
+        async def fetch(index, url, dest_path):
+            async with semaphore:
+                try:
+                    path = await self.download(url, dest_path)
+                    print(f"✅ Downloaded video {index + 1}/{len(jobs)}")
+                    return path
+                except Exception as e:
+                    print(f"⚠️  Failed to download video {index + 1}: {e}")
+                    return None
+
+        return list(await asyncio.gather(*(fetch(i, url, dest)
+                                           for i, (url, dest) in enumerate(jobs))))
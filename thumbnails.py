@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Thumbnails
+Picks the best frame of a rendered video and overlays the title on it
+"""
+
+import io
+import subprocess
+import textwrap
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Defaults for the optional "thumbnails" block in config.json
+DEFAULT_THUMBNAIL_SETTINGS = {
+    "enabled": True,
+    # Set the thumbnail on YouTube after each upload
+    "upload": True,
+    # Frames scored across the video, decoded at score_width pixels wide
+    "samples": 60,
+    "score_width": 320,
+    # Skip this fraction at each end (fades, black intro)
+    "skip_edges": 0.05,
+    "width": 1280,
+    "height": 720,
+    "title": True,
+    # TrueType font for the title (None = a bold system font)
+    "font": None,
+    "max_lines": 3,
+    # Frames darker than this mean luma (0-255) are never picked
+    "black_level": 24,
+    "weights": {"sharpness": 0.4, "contrast": 0.3, "colorfulness": 0.3},
+    # YouTube rejects custom thumbnails over 2 MB
+    "max_bytes": 2 * 1024 * 1024
+}
+
+FONT_CANDIDATES = ['DejaVuSans-Bold.ttf', 'Arial Bold.ttf', 'arialbd.ttf',
+                   '/System/Library/Fonts/Supplemental/Arial Bold.ttf',
+                   '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf']
+
+
+def sample_frames(video_path, start, length, samples, width, height):
+    """
+    Decode evenly spaced frames through one FFmpeg rawvideo pipe
+
+    Only one frame is held in memory at a time, however long the video.
+
+    Yields:
+        (timestamp, HxWx3 uint8 array)
+    """
+    rate = samples / length
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-ss', f'{start:.3f}', '-t', f'{length:.3f}', '-i', str(video_path),
+        '-an', '-vf', f'fps={rate:.6f},scale={width}:{height}',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+    ]
+    frame_bytes = width * height * 3
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    try:
+        index = 0
+        while True:
+            data = process.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield start + index / rate, np.frombuffer(data, np.uint8).reshape(height, width, 3)
+            index += 1
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def score_frame(rgb, black_level=24):
+    """
+    Sharpness (Laplacian variance), contrast (luma std) and colorfulness
+    (Hasler-Suesstrunk) of one frame, or None for a near-black frame
+    """
+    frame = rgb.astype(np.float32)
+    r, g, b = frame[..., 0], frame[..., 1], frame[..., 2]
+    luma = 0.299 * r + 0.587 * g + 0.114 * b
+    if luma.mean() < black_level or (luma < 16).mean() > 0.85:
+        return None
+
+    laplacian = (luma[1:-1, :-2] + luma[1:-1, 2:] + luma[:-2, 1:-1] + luma[2:, 1:-1]
+                 - 4 * luma[1:-1, 1:-1])
+    rg = r - g
+    yb = 0.5 * (r + g) - b
+    colorfulness = np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean())
+    return float(laplacian.var()), float(luma.std()), float(colorfulness)
+
+
+def pick_frame_time(video_path, duration, video_size, settings=None):
+    """
+    Score sampled frames and return the timestamp of the best one
+
+    Metrics are kept per frame (three floats) and normalized across all
+    samples at the end, so memory stays flat on long renders.
+
+    Returns:
+        Timestamp in seconds (the midpoint if every frame was rejected)
+    """
+    merged = dict(DEFAULT_THUMBNAIL_SETTINGS)
+    merged.update(settings or {})
+    width = int(merged['score_width'])
+    height = max(2, int(round(width * video_size[1] / video_size[0] / 2)) * 2)
+    start = duration * merged['skip_edges']
+    length = max(duration - 2 * start, 0.1)
+
+    times = []
+    metrics = []
+    for timestamp, frame in sample_frames(video_path, start, length, int(merged['samples']),
+                                          width, height):
+        scores = score_frame(frame, merged['black_level'])
+        if scores is not None:
+            times.append(timestamp)
+            metrics.append(scores)
+    if not metrics:
+        return duration / 2
+
+    values = np.array(metrics, dtype=np.float64)
+    # Laplacian variance spans orders of magnitude; compress it before scaling
+    values[:, 0] = np.log1p(values[:, 0])
+    peaks = values.max(axis=0)
+    values /= np.where(peaks > 0, peaks, 1)
+    weights = merged['weights']
+    score = values @ np.array([weights['sharpness'], weights['contrast'],
+                               weights['colorfulness']])
+    return times[int(score.argmax())]
+
+
+def extract_frame(video_path, timestamp, width, height):
+    """Decode one frame at timestamp, filled and centre-cropped to width x height"""
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-ss', f'{timestamp:.3f}', '-i', str(video_path), '-frames:v', '1', '-an',
+        '-vf', (f'scale={width}:{height}:force_original_aspect_ratio=increase,'
+                f'crop={width}:{height}'),
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+    ]
+    data = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+    if len(data) < width * height * 3:
+        raise ValueError(f"no frame at {timestamp:.2f}s")
+    return np.frombuffer(data[:width * height * 3], np.uint8).reshape(height, width, 3)
+
+
+def _load_font(font_path, size):
+    for candidate in ([font_path] if font_path else []) + FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has only the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def _fit_title(draw, title, settings, width, height):
+    """Largest font size at which the title wraps into max_lines within the frame"""
+    for size in range(height // 7, height // 20, -4):
+        font = _load_font(settings['font'], size)
+        chars_per_line = max(8, int(width * 0.9 / max(draw.textlength('M', font=font) * 0.6, 1)))
+        lines = textwrap.wrap(title, chars_per_line)
+        if len(lines) <= settings['max_lines'] and all(
+                draw.textlength(line, font=font) <= width * 0.9 for line in lines):
+            return font, lines
+    font = _load_font(settings['font'], height // 20)
+    return font, textwrap.wrap(title, 40)[:settings['max_lines']]
+
+
+def overlay_title(frame, title, settings=None):
+    """
+    Darken the lower part of the frame and draw the title over it
+
+    Returns:
+        PIL Image
+    """
+    merged = dict(DEFAULT_THUMBNAIL_SETTINGS)
+    merged.update(settings or {})
+    height, width = frame.shape[:2]
+
+    # Vertical gradient: untouched at the top, 65% darker at the bottom
+    shade = np.clip((np.arange(height, dtype=np.float32) / height - 0.35) / 0.65, 0, 1) * 0.65
+    image = Image.fromarray((frame * (1 - shade)[:, None, None]).astype(np.uint8))
+    if not title or not merged['title']:
+        return image
+
+    draw = ImageDraw.Draw(image)
+    font, lines = _fit_title(draw, title, merged, width, height)
+    size = getattr(font, 'size', 12)
+    line_height = int(size * 1.15)
+    y = height - int(height * 0.06) - line_height * len(lines)
+    for line in lines:
+        draw.text((int(width * 0.05), y), line, font=font, fill=(255, 255, 255),
+                  stroke_width=max(2, size // 14), stroke_fill=(0, 0, 0))
+        y += line_height
+    return image
+
+
+def save_jpeg(image, output_path, max_bytes):
+    """Save as JPEG, lowering quality until the file fits in max_bytes"""
+    for quality in (92, 85, 75, 65, 50):
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, optimize=True)
+        if buffer.tell() <= max_bytes:
+            break
+    with open(output_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    return output_path
+
+
+def create_thumbnail(video_path, title, duration, video_size, output_path, settings=None):
+    """
+    Pick the best frame of a video and save it with the title as a JPEG
+
+    Args:
+        duration: Video length in seconds
+        video_size: (width, height) of the video, for the scoring aspect ratio
+
+    Returns:
+        output_path
+    """
+    merged = dict(DEFAULT_THUMBNAIL_SETTINGS)
+    merged.update(settings or {})
+    timestamp = pick_frame_time(video_path, duration, video_size, merged)
+    frame = extract_frame(video_path, timestamp, int(merged['width']), int(merged['height']))
+    image = overlay_title(frame, title, merged)
+    return save_jpeg(image, output_path, int(merged['max_bytes']))
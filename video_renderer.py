@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Video Renderer
+Builds single-pass FFmpeg commands: scale/pad, trim, concat, audio mastering and mux
+in one encode, optionally split into GOP-aligned segments encoded in parallel, with any
+number of output formats (e.g. 16:9 and a 9:16 Short) encoded from the same decode
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from audio_mastering import audio_codec_args, audio_filtergraph
+
+
+def probe_duration(media_path):
+    """Return a media file's duration in seconds using ffprobe (None if unknown)"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        str(media_path)
+    ]
+    try:
+        output = subprocess.check_output(cmd).decode().strip()
+        return float(output)
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return None
+
+
+def parse_resolution(resolution):
+    """Turn a 'WIDTHxHEIGHT' string into an (int, int) tuple"""
+    width, height = resolution.lower().split('x')
+    return int(width), int(height)
+
+
+def plan_segments(clip_durations, total_duration):
+    """
+    Decide how many seconds to take from each clip to cover total_duration
+
+    Clips are used in order and cycled if the footage is too short. A clip
+    with an unknown duration (None) is allowed to cover whatever remains.
+
+    Returns:
+        List of (clip_index, seconds) pairs
+    """
+    segments = []
+    remaining = total_duration
+    if not clip_durations:
+        return segments
+
+    # Guard against looping forever over zero-length clips
+    usable = [d is None or d > 0.05 for d in clip_durations]
+    if not any(usable):
+        return [(0, total_duration)]
+
+    index = 0
+    while remaining > 0.01:
+        clip_duration = clip_durations[index]
+        if usable[index]:
+            take = remaining if clip_duration is None else min(clip_duration, remaining)
+            segments.append((index, take))
+            remaining -= take
+        index = (index + 1) % len(clip_durations)
+
+    return segments
+
+
+# Named x264 settings for the optional "render" block in config.json
+ENCODER_PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": 28, "tune": "fastdecode"},
+    "fast": {"preset": "veryfast", "crf": 23, "tune": None},
+    "balanced": {"preset": "medium", "crf": 21, "tune": None},
+    "quality": {"preset": "slow", "crf": 19, "tune": "film"}
+}
+
+DEFAULT_RENDER_SETTINGS = {
+    "profile": "balanced",
+    "parallel_segments": 1,
+    "threads": None,
+    "min_segment_seconds": 10,
+    # Output profiles rendered from one decode (None = one output at the
+    # video_settings resolution); see DEFAULT_OUTPUT
+    "outputs": None
+}
+
+# Defaults for each entry of the "outputs" list in the "render" block
+DEFAULT_OUTPUT = {
+    "name": "main",
+    # None = the video_settings resolution
+    "resolution": None,
+    # pad: letterbox to fit, crop: fill and cut the centre, blur: fit over a
+    # blurred, cropped copy of the same footage
+    "fit": "pad",
+    # Target bitrate such as "8M" (None = constant quality from the profile)
+    "bitrate": None,
+    # Encoder profile for this output (None = the render profile)
+    "profile": None,
+    # Upload this output as its own video; only applies after the first
+    "upload": True
+}
+
+FIT_MODES = ('pad', 'crop', 'blur')
+
+# Keyframe interval in seconds; parallel segments are cut on multiples of it
+GOP_SECONDS = 2
+
+
+def encoder_args(profile='balanced', fps=30, threads=None, bitrate=None):
+    """
+    x264 arguments for a named profile (or a dict of preset/crf/tune)
+
+    threads defaults to the machine's core count, so a lone encode uses
+    every core; parallel segment encodes pass their share instead. With a
+    bitrate the profile's CRF is replaced by a capped average bitrate.
+    """
+    settings = ENCODER_PROFILES[profile] if isinstance(profile, str) else profile
+    threads = threads or os.cpu_count() or 1
+    gop = int(round(fps * GOP_SECONDS))
+    args = ['-c:v', 'libx264', '-preset', settings['preset']]
+    if bitrate:
+        args += ['-b:v', str(bitrate), '-maxrate', str(bitrate), '-bufsize', _double(bitrate)]
+    else:
+        args += ['-crf', str(settings['crf'])]
+    if settings.get('tune'):
+        args += ['-tune', settings['tune']]
+    args += ['-threads', str(threads), '-g', str(gop), '-keyint_min', str(gop),
+             '-sc_threshold', '0', '-pix_fmt', 'yuv420p', '-r', str(fps)]
+    return args
+
+
+def _double(bitrate):
+    """Twice an FFmpeg bitrate string ('8M' -> '16M'), used as the VBV buffer size"""
+    text = str(bitrate).strip()
+    if text[-1:].upper() in ('K', 'M', 'G'):
+        return f"{float(text[:-1]) * 2:g}{text[-1]}"
+    return f"{float(text) * 2:g}"
+
+
+def resolve_outputs(output_path, resolution='1920x1080', outputs=None):
+    """
+    Fill in defaults for the configured output profiles and assign their files
+
+    The first output is written to output_path; each further one goes next
+    to it with its name as a suffix (video_..._shorts.mp4), so the set can
+    always be found again from the first output's path.
+
+    Returns:
+        List of output dicts with width, height and path added
+    """
+    resolved = []
+    for i, output in enumerate(outputs or [{}]):
+        merged = dict(DEFAULT_OUTPUT)
+        merged.update(output)
+        if merged['fit'] not in FIT_MODES:
+            raise ValueError(f"Unknown fit '{merged['fit']}' for output {merged['name']} "
+                             f"(expected one of {', '.join(FIT_MODES)})")
+        if any(other['name'] == merged['name'] for other in resolved):
+            raise ValueError(f"Duplicate output name: {merged['name']}")
+        merged['width'], merged['height'] = parse_resolution(merged['resolution'] or resolution)
+        path = Path(output_path)
+        if i:
+            path = path.with_name(f"{path.stem}_{merged['name']}{path.suffix}")
+        merged['path'] = path
+        resolved.append(merged)
+    return resolved
+
+
+def _fit_filters(source, label, width, height, fit):
+    """Filters that fit the [source] stream into width x height as [label]"""
+    fill = f'scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}'
+    fit_inside = f'scale={width}:{height}:force_original_aspect_ratio=decrease'
+    if fit == 'crop':
+        return [f'[{source}]{fill},setsar=1,format=yuv420p[{label}]']
+    if fit == 'blur':
+        return [
+            f'[{source}]split[{label}bg][{label}fg]',
+            f'[{label}bg]{fill},boxblur=20:2[{label}bgb]',
+            f'[{label}fg]{fit_inside}[{label}fgs]',
+            f'[{label}bgb][{label}fgs]overlay=(W-w)/2:(H-h)/2,setsar=1,format=yuv420p[{label}]'
+        ]
+    return [f'[{source}]{fit_inside},pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,'
+            f'setsar=1,format=yuv420p[{label}]']
+
+
+def _window(plan, start, length):
+    """
+    Map an output time window onto clip pieces
+
+    Returns:
+        List of (clip_index, clip_offset, seconds) covering [start, start + length)
+    """
+    pieces = []
+    end = start + length
+    cursor = 0.0
+    for clip_index, seconds in plan:
+        piece_start, piece_end = cursor, cursor + seconds
+        cursor = piece_end
+        overlap_start, overlap_end = max(piece_start, start), min(piece_end, end)
+        if overlap_end - overlap_start > 0.001:
+            pieces.append((clip_index, overlap_start - piece_start, overlap_end - overlap_start))
+    return pieces
+
+
+def _video_graph(video_files, pieces, outputs, fps, first_input=0):
+    """
+    Inputs and filtergraph that fit each piece to every output and concatenate them
+
+    Every clip is opened with input-side -ss/-t, so FFmpeg seeks straight to
+    the footage it needs and stops decoding as soon as it has enough. Each
+    piece is decoded once and split into one scaling chain per output.
+
+    Returns:
+        (input_args, filtergraph) with output k's video labelled [vout<k>]
+    """
+    inputs = []
+    filters = []
+    for n, (clip_index, offset, seconds) in enumerate(pieces):
+        if offset > 0.001:
+            inputs += ['-ss', f'{offset:.3f}']
+        inputs += ['-t', f'{seconds:.3f}', '-i', str(video_files[clip_index])]
+        if len(outputs) == 1:
+            filters.append(f'[{first_input + n}:v]fps={fps}[p{n}o0]')
+        else:
+            branches = ''.join(f'[p{n}o{k}]' for k in range(len(outputs)))
+            filters.append(f'[{first_input + n}:v]fps={fps},split={len(outputs)}{branches}')
+        for k, output in enumerate(outputs):
+            filters += _fit_filters(f'p{n}o{k}', f'v{n}o{k}', output['width'], output['height'],
+                                    output['fit'])
+    for k in range(len(outputs)):
+        concat_inputs = ''.join(f'[v{n}o{k}]' for n in range(len(pieces)))
+        filters.append(f'{concat_inputs}concat=n={len(pieces)}:v=1:a=0[vout{k}]')
+    return inputs, ';'.join(filters)
+
+
+def _encoder_threads(threads, count):
+    """Split the thread budget between encoders running in one process"""
+    return max(1, (threads or os.cpu_count() or 1) // count)
+
+
+def _audio_inputs(audio_path, first_input, duration, count, mastering=None):
+    """
+    Inputs for the voiceover (and the looped music bed) and the filters
+    that master them
+
+    Returns:
+        (input_args, filtergraph or '', audio map for each of count outputs)
+    """
+    inputs = ['-i', str(audio_path)]
+    if not mastering:
+        return inputs, '', [f'{first_input}:a'] * count
+    music_input = None
+    if mastering.get('music'):
+        music_input = first_input + 1
+        inputs += ['-stream_loop', '-1', '-i', str(mastering['music'])]
+    graph = audio_filtergraph(first_input, music_input, mastering, duration, count)
+    return inputs, graph, [f'[aout{k}]' for k in range(count)]
+
+
+def build_render_command(audio_path, video_files, output_path, duration,
+                         resolution='1920x1080', fps=30, profile='balanced',
+                         threads=None, clip_durations=None, outputs=None, mastering=None):
+    """
+    Build one FFmpeg invocation that renders the final video
+
+    Clips are trimmed to just the footage the audio needs, scaled/padded to
+    the target resolution and frame rate, concatenated and muxed with the
+    voiceover. Nothing is written to disk apart from the output files.
+
+    Args:
+        outputs: Resolved output profiles (see resolve_outputs); each gets
+            its own encoder. Defaults to output_path at resolution.
+        mastering: Plan from audio_mastering.plan_mastering; the voiceover
+            is normalized and mixed in the same graph (None = muxed as is)
+
+    Returns:
+        Argument list suitable for subprocess.run
+    """
+    outputs = outputs or resolve_outputs(output_path, resolution)
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y']
+
+    if not video_files:
+        for output in outputs:
+            cmd += ['-f', 'lavfi', '-i',
+                    f"color=c=black:s={output['width']}x{output['height']}:r={fps}:d={duration}"]
+        video_maps = [f'{k}:v' for k in range(len(outputs))]
+        audio_input = len(outputs)
+        graph = ''
+    else:
+        if clip_durations is None:
+            clip_durations = [probe_duration(path) for path in video_files]
+        pieces = _window(plan_segments(clip_durations, duration), 0, duration)
+        inputs, graph = _video_graph(video_files, pieces, outputs, fps)
+        video_maps = [f'[vout{k}]' for k in range(len(outputs))]
+        audio_input = len(pieces)
+        cmd += inputs
+
+    audio_args, audio_graph, audio_maps = _audio_inputs(audio_path, audio_input, duration,
+                                                        len(outputs), mastering)
+    cmd += audio_args
+    graph = ';'.join(part for part in (graph, audio_graph) if part)
+    if graph:
+        cmd += ['-filter_complex', graph]
+
+    encoder_threads = _encoder_threads(threads, len(outputs))
+    for output, video_map, audio_map in zip(outputs, video_maps, audio_maps):
+        cmd += ['-map', video_map, '-map', audio_map]
+        cmd += encoder_args(output['profile'] or profile, fps, encoder_threads, output['bitrate'])
+        cmd += audio_codec_args(mastering)
+        cmd += ['-t', f'{duration:.3f}', '-shortest', '-movflags', '+faststart',
+                str(output['path'])]
+    return cmd
+
+
+def build_segment_commands(video_files, segment_dir, duration, resolution='1920x1080',
+                           fps=30, profile='balanced', segments=2, clip_durations=None,
+                           outputs=None):
+    """
+    Split the video track into GOP-aligned time segments, one FFmpeg command each
+
+    Each segment starts on a keyframe boundary and has an exact frame count,
+    so the encoded pieces can be joined with the concat demuxer (stream copy).
+    A segment command encodes that time range for every output at once.
+
+    Returns:
+        (commands, segment_paths) where segment_paths[k] lists output k's segments
+    """
+    outputs = outputs or resolve_outputs(Path(segment_dir) / 'video.mp4', resolution)
+    if clip_durations is None:
+        clip_durations = [probe_duration(path) for path in video_files]
+    plan = plan_segments(clip_durations, duration)
+
+    total_frames = int(round(duration * fps))
+    gop = int(round(fps * GOP_SECONDS))
+    gops = -(-total_frames // gop)
+    gops_per_segment = -(-gops // segments)
+    threads = _encoder_threads(max(1, (os.cpu_count() or 1) // segments), len(outputs))
+
+    commands = []
+    paths = [[] for _ in outputs]
+    first_frame = 0
+    while first_frame < total_frames:
+        frames = min(gops_per_segment * gop, total_frames - first_frame)
+        start, length = first_frame / fps, frames / fps
+        pieces = _window(plan, start, length)
+        if not pieces:
+            break
+        inputs, graph = _video_graph(video_files, pieces, outputs, fps)
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y'] + inputs
+        # Hold the last frame if footage runs a frame short, so every
+        # segment has exactly its share of frames
+        graph += ''.join(f';[vout{k}]tpad=stop_mode=clone:stop=-1[vseg{k}]'
+                         for k in range(len(outputs)))
+        cmd += ['-filter_complex', graph]
+        for k, output in enumerate(outputs):
+            path = Path(segment_dir) / f"segment_{len(commands):03d}_{output['name']}.mp4"
+            cmd += ['-map', f'[vseg{k}]', '-an']
+            cmd += encoder_args(output['profile'] or profile, fps, threads, output['bitrate'])
+            cmd += ['-frames:v', str(frames), str(path)]
+            paths[k].append(path)
+        commands.append(cmd)
+        first_frame += frames
+    return commands, paths
+
+
+def build_stitch_command(concat_list, audio_path, output_path, duration, mastering=None):
+    """Join encoded segments losslessly and master and mux the audio (no video re-encode)"""
+    audio_args, audio_graph, audio_maps = _audio_inputs(audio_path, 1, duration, 1, mastering)
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+           '-f', 'concat', '-safe', '0', '-i', str(concat_list)] + audio_args
+    if audio_graph:
+        cmd += ['-filter_complex', audio_graph]
+    cmd += ['-map', '0:v', '-map', audio_maps[0], '-c:v', 'copy'] + audio_codec_args(mastering)
+    cmd += ['-t', f'{duration:.3f}', '-shortest', '-movflags', '+faststart', str(output_path)]
+    return cmd
+
+
+def plan_render(audio_path, video_files, output_path, duration, resolution='1920x1080',
+                fps=30, settings=None, clip_durations=None, work_dir=None, mastering=None):
+    """
+    Work out the FFmpeg commands for a render without running any of them
+
+    Commands within a phase are independent and may run concurrently; each
+    phase must finish before the next starts. Parallel segment renders
+    write into scratch_dir (created under work_dir, default the output's
+    directory), which the caller removes afterwards.
+
+    Returns:
+        (phases, scratch_dir) where scratch_dir is None for a single encode
+    """
+    merged = dict(DEFAULT_RENDER_SETTINGS)
+    merged.update(settings or {})
+    segments = int(merged['parallel_segments'] or 1)
+    if segments <= 0:
+        segments = os.cpu_count() or 1
+    # Short videos don't amortize the extra process start-up and stitch
+    segments = min(segments, max(1, int(duration // merged['min_segment_seconds'])))
+
+    outputs = resolve_outputs(output_path, resolution, merged['outputs'])
+
+    if clip_durations is None and video_files:
+        clip_durations = [probe_duration(path) for path in video_files]
+
+    if segments <= 1 or not video_files:
+        command = build_render_command(audio_path, video_files, output_path, duration,
+                                       resolution, fps, merged['profile'], merged['threads'],
+                                       clip_durations, outputs, mastering)
+        return [[command]], None
+
+    segment_dir = Path(tempfile.mkdtemp(prefix='segments_', dir=work_dir or Path(output_path).parent))
+    commands, paths = build_segment_commands(video_files, segment_dir, duration, resolution,
+                                             fps, merged['profile'], segments, clip_durations,
+                                             outputs)
+    stitches = []
+    for output, output_paths in zip(outputs, paths):
+        concat_list = segment_dir / f"segments_{output['name']}.txt"
+        with open(concat_list, 'w') as f:
+            for path in output_paths:
+                f.write(f"file '{path.absolute()}'\n")
+        stitches.append(build_stitch_command(concat_list, audio_path, output['path'], duration,
+                                             mastering))
+    return [commands, stitches], segment_dir
+
+
+def _output_paths(output_path, resolution, settings):
+    return {str(output['path'])
+            for output in resolve_outputs(output_path, resolution, (settings or {}).get('outputs'))}
+
+
+def _record_ready(timings, cmd, paths, started):
+    """Note the time since started for every output a finished command wrote"""
+    if timings is None:
+        return
+    elapsed = time.monotonic() - started
+    for arg in cmd:
+        if arg in paths:
+            timings[arg] = round(elapsed, 3)
+
+
+def render_video(audio_path, video_files, output_path, duration, resolution='1920x1080',
+                 fps=30, settings=None, runner=None, clip_durations=None, work_dir=None,
+                 mastering=None, timings=None):
+    """
+    Render the final video, in one encode or as parallel keyframe-aligned segments
+
+    Args:
+        settings: The config "render" block (profile, parallel_segments, threads, outputs)
+        runner: Callable that runs one command and raises CalledProcessError
+            on failure (defaults to subprocess.run with check=True)
+        clip_durations: Known clip lengths in seconds (probed if omitted)
+        work_dir: Where segment intermediates go (e.g. a tmpfs job directory)
+        mastering: Audio mastering plan (see audio_mastering.plan_mastering)
+        timings: Optional dict, filled with the seconds from the start of the
+            render until each output file (by path) was finished. A single
+            encode writes every output from one FFmpeg process, so they all
+            get the time it exited; only segmented renders, which stitch each
+            output separately, time them apart.
+
+    Returns:
+        Number of FFmpeg encodes that ran
+    """
+    runner = runner or (lambda cmd: subprocess.run(cmd, check=True))
+    started = time.monotonic()
+    paths = _output_paths(output_path, resolution, settings)
+    phases, scratch_dir = plan_render(audio_path, video_files, output_path, duration,
+                                      resolution, fps, settings, clip_durations, work_dir,
+                                      mastering)
+
+    def run(cmd):
+        runner(cmd)
+        _record_ready(timings, cmd, paths, started)
+
+    try:
+        for commands in phases:
+            if len(commands) == 1:
+                run(commands[0])
+                continue
+            with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+                for future in [pool.submit(run, cmd) for cmd in commands]:
+                    future.result()
+        return len(phases[0])
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+async def run_command_async(cmd):
+    """
+    Run one FFmpeg command without blocking the event loop
+
+    Raises:
+        subprocess.CalledProcessError on a non-zero exit, like check=True
+    """
+    process = await asyncio.create_subprocess_exec(*cmd)
+    returncode = await process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
+
+
+async def render_video_async(audio_path, video_files, output_path, duration,
+                             resolution='1920x1080', fps=30, settings=None, runner=None,
+                             clip_durations=None, work_dir=None, mastering=None,
+                             timings=None):
+    """
+    Coroutine version of render_video; FFmpeg runs via create_subprocess_exec
+
+    Args:
+        runner: Coroutine function that runs one command (defaults to run_command_async)
+        timings: Optional dict of seconds until each output was finished (see render_video)
+
+    Returns:
+        Number of FFmpeg encodes that ran
+    """
+    runner = runner or run_command_async
+    started = time.monotonic()
+    paths = _output_paths(output_path, resolution, settings)
+    loop = asyncio.get_running_loop()
+    # Planning may probe clip durations, which blocks
+    phases, scratch_dir = await loop.run_in_executor(
+        None, lambda: plan_render(audio_path, video_files, output_path, duration,
+                                  resolution, fps, settings, clip_durations, work_dir,
+                                  mastering))
+
+    async def run(cmd):
+        await runner(cmd)
+        _record_ready(timings, cmd, paths, started)
+
+    try:
+        for commands in phases:
+            # Let every segment finish before raising, so none is still
+            # writing into scratch_dir when it is removed
+            results = await asyncio.gather(*(run(cmd) for cmd in commands),
+                                           return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return len(phases[0])
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
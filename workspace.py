@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Job Workspaces
+Per-job scratch directories, atomic publishing of finished videos and
+garbage collection of abandoned scratch space and old outputs
+"""
+
+import errno
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Defaults for the optional "workspace" block in config.json
+DEFAULT_WORKSPACE_SETTINGS = {
+    # Per-job directories for audio and downloaded clips; keep this on the
+    # same filesystem as the output directory so publishing is a rename
+    "scratch_dir": "generated_videos/.jobs",
+    # Optional RAM-backed directory (e.g. "/dev/shm") for render intermediates
+    "tmpfs_dir": None,
+    "tmpfs_min_free_mb": 512,
+    "keep_failed": False,
+    # Scratch directories untouched this long belong to dead jobs
+    "stale_hours": 24,
+    # Delete finished videos older than this (None = keep forever)
+    "retention_days": None,
+    # Disk budget for finished videos plus scratch space (None = unlimited)
+    "max_output_gb": None,
+    # Never delete a finished video younger than this, e.g. one awaiting upload
+    "min_age_minutes": 60,
+    "gc_interval_minutes": 30
+}
+
+# Finished videos and their thumbnails, and loose files left in the output directory by older versions
+OUTPUT_RE = re.compile(r'^video_.*(\.mp4|_thumb\.jpg)$')
+LEGACY_RE = re.compile(r'^(audio_.*\.mp3|stock_.*\.mp4(\.part)?|mezz_.*\.mp4|temp_concat\.mp4'
+                       r'|concat_list\.txt)$')
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(name))[:80]
+
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _tree_mtime(path):
+    """Most recent modification time of a directory or anything inside it"""
+    latest = os.lstat(path).st_mtime
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                latest = max(latest, os.lstat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                pass
+    return latest
+
+
+def publish(src_path, dest_path):
+    """
+    Move a finished file into place atomically
+
+    Readers of the destination directory never see a partial file: a
+    same-filesystem move is a single rename, otherwise the file is copied
+    to a temporary name next to the destination and renamed from there.
+
+    Returns:
+        Path of the published file
+    """
+    src_path = Path(src_path)
+    dest_path = Path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(src_path, dest_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        tmp_path = dest_path.with_name(f".{dest_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        src_path.unlink(missing_ok=True)
+    return dest_path
+
+
+class JobWorkspace:
+    """Scratch space owned by one job"""
+
+    def __init__(self, manager, name, path, tmpfs_root=None):
+        self.manager = manager
+        self.name = name
+        self.path = Path(path)
+        self.tmpfs_root = Path(tmpfs_root) if tmpfs_root else None
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def file(self, name):
+        """Path for a file in this job's scratch directory"""
+        return self.path / name
+
+    def intermediates_dir(self):
+        """
+        Directory for short-lived render intermediates: under tmpfs_dir when
+        configured (and it had room at start-up), else the job's scratch directory
+        """
+        if self.tmpfs_root:
+            path = self.tmpfs_root / f"ytjob_{self.name}"
+            path.mkdir(parents=True, exist_ok=True)
+            return path
+        return self.path
+
+    def cleanup(self, failed=False):
+        """Delete the job's scratch space (kept for inspection if failed and keep_failed)"""
+        self.manager.release(self)
+        if failed and self.manager.settings['keep_failed']:
+            print(f"⚠️  Keeping scratch files of failed job: {self.path}")
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+        if self.tmpfs_root:
+            shutil.rmtree(self.tmpfs_root / f"ytjob_{self.name}", ignore_errors=True)
+
+
+class WorkspaceManager:
+    """
+    Hands out job workspaces and reclaims disk space. Workspaces held by
+    this process are never collected; ones left behind by other (or dead)
+    processes are only removed once they have gone stale_hours untouched.
+    """
+
+    def __init__(self, output_dir, settings=None):
+        self.settings = dict(DEFAULT_WORKSPACE_SETTINGS)
+        self.settings.update(settings or {})
+        self.output_dir = Path(output_dir)
+        self.root = Path(self.settings['scratch_dir'])
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.tmpfs_root = self._usable_tmpfs()
+        self._active = set()
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+
+    def _usable_tmpfs(self):
+        tmpfs_dir = self.settings.get('tmpfs_dir')
+        if not tmpfs_dir or not os.path.isdir(tmpfs_dir):
+            return None
+        free_mb = shutil.disk_usage(tmpfs_dir).free / (1024 * 1024)
+        if free_mb < self.settings['tmpfs_min_free_mb']:
+            print(f"⚠️  {tmpfs_dir} has only {free_mb:.0f} MB free, keeping intermediates on disk")
+            return None
+        return Path(tmpfs_dir)
+
+    def create(self, name=None):
+        """
+        Open the workspace for a job
+
+        Args:
+            name: Stable job name (e.g. a job store id) so a retried job
+                finds its earlier files; a unique name is made if omitted
+        """
+        name = _safe_name(name) if name is not None else \
+            f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            self._active.add(name)
+        workspace = JobWorkspace(self, name, self.root / name, self.tmpfs_root)
+        # Touch the directory so a resumed job is not mistaken for a stale one
+        os.utime(workspace.path)
+        return workspace
+
+    def release(self, workspace):
+        with self._lock:
+            self._active.discard(workspace.name)
+
+    def maybe_collect(self):
+        """Run collect_garbage if gc_interval_minutes have passed since the last run"""
+        interval = self.settings['gc_interval_minutes'] * 60
+        with self._lock:
+            if time.time() - self._last_gc < interval:
+                return None
+            self._last_gc = time.time()
+        return self.collect_garbage()
+
+    def collect_garbage(self):
+        """
+        Remove stale scratch directories and legacy loose files, then old
+        videos past retention_days, then the oldest videos until the
+        output directory fits in max_output_gb
+
+        Returns:
+            Dict with the number of entries and bytes removed
+        """
+        now = time.time()
+        stale_seconds = self.settings['stale_hours'] * 3600
+        removed = {'scratch': 0, 'videos': 0, 'bytes': 0}
+
+        with self._lock:
+            active = set(self._active)
+
+        scratch_roots = [(self.root, '')]
+        if self.tmpfs_root:
+            scratch_roots.append((self.tmpfs_root, 'ytjob_'))
+        for scratch_root, prefix in scratch_roots:
+            for entry in list(scratch_root.iterdir()):
+                if entry.is_file() and scratch_root == self.root and LEGACY_RE.match(entry.name):
+                    # Loose mezzanines written here by earlier versions
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if now - stat.st_mtime >= stale_seconds:
+                        entry.unlink(missing_ok=True)
+                        removed['scratch'] += 1
+                        removed['bytes'] += stat.st_size
+                    continue
+                if not entry.is_dir() or not entry.name.startswith(prefix):
+                    continue
+                if entry.name[len(prefix):] in active:
+                    continue
+                try:
+                    if now - _tree_mtime(entry) < stale_seconds:
+                        continue
+                    size = _tree_size(entry)
+                except OSError:
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+                removed['scratch'] += 1
+                removed['bytes'] += size
+
+        videos = []
+        for entry in self.output_dir.iterdir():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if not entry.is_file():
+                continue
+            if LEGACY_RE.match(entry.name) and now - stat.st_mtime >= stale_seconds:
+                entry.unlink(missing_ok=True)
+                removed['scratch'] += 1
+                removed['bytes'] += stat.st_size
+            elif OUTPUT_RE.match(entry.name):
+                videos.append((stat.st_mtime, stat.st_size, entry))
+        videos.sort()
+
+        min_age = self.settings['min_age_minutes'] * 60
+        retention_days = self.settings['retention_days']
+        kept = []
+        for mtime, size, path in videos:
+            if retention_days is not None and now - mtime > retention_days * 86400 \
+                    and now - mtime >= min_age:
+                path.unlink(missing_ok=True)
+                removed['videos'] += 1
+                removed['bytes'] += size
+            else:
+                kept.append((mtime, size, path))
+
+        budget_gb = self.settings['max_output_gb']
+        if budget_gb is not None:
+            budget = budget_gb * 1024 ** 3
+            used = sum(size for _, size, _ in kept) + _tree_size(self.root)
+            for mtime, size, path in kept:
+                if used <= budget:
+                    break
+                if now - mtime < min_age:
+                    continue
+                path.unlink(missing_ok=True)
+                removed['videos'] += 1
+                removed['bytes'] += size
+                used -= size
+            if used > budget:
+                print(f"⚠️  Output directory is {used / 1024 ** 3:.1f} GB, over the "
+                      f"{budget_gb} GB budget, but nothing else is old enough to delete")
+
+        if removed['scratch'] or removed['videos']:
+            print(f"🧹 Freed {removed['bytes'] / (1024 * 1024):.1f} MB: "
+                  f"{removed['scratch']} scratch item(s), {removed['videos']} old video(s)")
+        return removed
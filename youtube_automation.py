@@ -7,23 +7,144 @@ No n8n required - runs completely on your local machine
 import os
 import json
 import time
+import hashlib
+import uuid
+import argparse
+import asyncio
+import contextvars
+import functools
+import re
+import threading
 from datetime import datetime
 from pathlib import Path
-import requests
-from anthropic import Anthropic
 import subprocess
-import tempfile
+from stock_downloader import AsyncStockDownloader
+from footage_search import (FootageSearch, estimate_narration_seconds, rank_candidates,
+                            select_clips, split_keywords)
+from asset_cache import AssetCache, clip_key, voiceover_key
+from audio_mastering import loudness_stats, plan_mastering
+from video_renderer import probe_duration, render_video_async, resolve_outputs
+from clip_normalizer import ClipNormalizer
+from workspace import WorkspaceManager, publish
+from batch_runner import read_topics, run_batch
+from job_store import JobStore, run_worker
+from quota_ledger import QuotaDeferred, QuotaLedger
+from render_queue import (build_manifest, fetch_outputs, open_render_queue, run_render_worker,
+                          serve_render_queue)
+from scheduler import ScheduleDaemon
+from instrumentation import METRICS, instrumented
+from script_parser import parse_script_response, reask_message, validate_script
+from script_memo import DEFAULT_SCRIPT_SETTINGS, ScriptMemo, memo_key, prompt_digest
+from mp3_info import Mp3DurationCounter, mp3_duration, strip_mp3_header
 
 # Configuration
 CONFIG_FILE = "config.json"
+ELEVENLABS_TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech"
 VIDEOS_DIR = Path("generated_videos")
 VIDEOS_DIR.mkdir(exist_ok=True)
 
-class YouTubeAutomation:
+# Everything in the script prompt except the topic, sent as the system block.
+# At about 475 tokens it is under the 1024-token minimum Claude caches, so
+# prompt_caching only pays off once these instructions grow past that.
+SCRIPT_INSTRUCTIONS = """CRITICAL REQUIREMENTS:
+- Length: 150-200 words MAXIMUM (for ~30 seconds of natural speech)
+- Style: Direct, conversational, factual - speak naturally as if talking to a friend
+- NO meta-language: Never say "title", "description", "keywords", "script", "this video", "today we'll discuss"
+- Start immediately with the CONTENT - no preamble or introduction
+- Be SPECIFIC and FACTUAL - include real data, statistics, concrete benefits, or examples
+- End with a strong value statement - summarize what they just learned
+- NO generic CTAs like "subscribe", "hit the bell", or "comment below"
+
+FORMAT (use these exact labels):
+TITLE: [Compelling, curiosity-driven title under 60 characters]
+DESCRIPTION: [2-3 sentences with key points, include relevant #hashtags]
+TAGS: [8-10 relevant single-word tags separated by commas]
+KEYWORDS: [3-5 descriptive phrases for stock footage - be specific like "person meditating peaceful nature sunset" not just "meditation"]
+SCRIPT:
+[Direct narration only - NO labels, NO meta-talk, just pure content]
+
+GOOD EXAMPLE (meditation topic):
+"Meditation reduces cortisol by 30% in just 8 weeks. It physically increases gray matter in your brain, boosting memory and emotional control. Even 10 minutes daily lowers blood pressure and anxiety significantly. Your brain literally rewires itself to handle stress better."
+
+BAD EXAMPLE (avoid this):
+"Hey everyone, today's video is about meditation. Let me tell you why meditation matters. First, meditation has benefits. It's really important for your health. Thanks for watching, don't forget to subscribe!"
+
+Now create the script following the GOOD example style:
+
+Example of what the SCRIPT section should look like:
+Did you know that just 10 minutes of meditation can change your entire day? Today I'm sharing five powerful meditation techniques that actually work...
+
+[Continue to 150-200 words of engaging narration in total]
+"""
+
+
+class AsyncYouTubeAutomation:
+    """
+    The generation pipeline as coroutines. Pexels, ElevenLabs and clip
+    downloads share one httpx connection pool, Claude is called through
+    AsyncAnthropic and FFmpeg runs as asyncio subprocesses, so one event
+    loop can drive many videos at once (see run_many). The HTTP clients
+    are built on first use and belong to the first event loop that uses
+    them; the anthropic and httpx imports are deferred until then, so
+    commands that never call an API start quickly.
+    """
+    
     def __init__(self):
         self.config = self.load_config()
-        self.anthropic_client = Anthropic(api_key=self.config['api_keys']['anthropic'])
-        
+        METRICS.configure(self.config.get('metrics'))
+        self.script_settings = dict(DEFAULT_SCRIPT_SETTINGS)
+        self.script_settings.update(self.config.get('scripts') or {})
+        self._http = None
+        self._anthropic_client = None
+        self._downloader = None
+        self.script_memo = ScriptMemo.from_config(self.script_settings)
+        self.footage_search = FootageSearch(self.config['api_keys']['pexels'],
+                                            self.config.get('search'))
+        self.cache = AssetCache.from_config(self.config.get('cache'))
+        self.workspaces = WorkspaceManager(VIDEOS_DIR, self.config.get('workspace'))
+        self.normalizer = ClipNormalizer.from_config(self.config, self.cache,
+                                                     self.workspaces.root)
+        self._render_slots = None
+        self._render_queue = None
+    
+    @property
+    def render_queue(self):
+        """(settings, queue, blob store) when renders go to remote workers, else None"""
+        settings = self.config.get('render_queue') or {}
+        if not settings.get('enabled'):
+            return None
+        if self._render_queue is None:
+            self._render_queue = open_render_queue(settings)
+        return self._render_queue
+    
+    @property
+    def http(self):
+        """Shared httpx connection pool for Pexels, ElevenLabs and clip downloads"""
+        if self._http is None:
+            import httpx
+            max_connections = int(self.config.get('async', {}).get('max_connections', 32))
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections),
+                timeout=httpx.Timeout(60.0, connect=10.0))
+        return self._http
+    
+    @property
+    def anthropic_client(self):
+        if self._anthropic_client is None:
+            # The SDK alone takes about a second to import
+            from anthropic import AsyncAnthropic
+            self._anthropic_client = AsyncAnthropic(
+                api_key=self.config['api_keys']['anthropic'],
+                base_url=self.script_settings['base_url'])
+        return self._anthropic_client
+    
+    @property
+    def downloader(self):
+        if self._downloader is None:
+            self._downloader = AsyncStockDownloader(self.http, self.config.get('downloads'))
+        return self._downloader
+    
     def load_config(self):
         """Load configuration from config.json"""
         if not os.path.exists(CONFIG_FILE):
@@ -54,350 +175,1357 @@ class YouTubeAutomation:
                 "resolution": "1920x1080",
                 "fps": 30
             },
+            "render": {
+                "profile": "balanced",
+                "parallel_segments": 1,
+                "threads": None,
+                "min_segment_seconds": 10,
+                "outputs": [
+                    {"name": "main", "resolution": None, "fit": "pad", "bitrate": None}
+                ]
+            },
+            "scripts": {
+                "model": "claude-sonnet-4-5-20250929",
+                "max_tokens": 2000,
+                "prompt_caching": True,
+                "memo": True,
+                "memo_dir": ".asset_cache/scripts",
+                "batch_poll_seconds": 60,
+                "batch_timeout_hours": 24,
+                "max_reasks": 1,
+                "limits": {
+                    "max_title_chars": 60,
+                    "min_tags": 5,
+                    "max_tags": 15,
+                    "min_keywords": 3,
+                    "max_keywords": 5,
+                    "min_words": 135,
+                    "max_words": 220
+                }
+            },
+            "search": {
+                "cache_ttl_hours": 24,
+                "requests_per_hour": 200,
+                "burst": 10,
+                "per_phrase": 8,
+                "max_clips": 12,
+                "ideal_clip_seconds": 8,
+                "words_per_minute": 150
+            },
+            "normalize": {
+                "enabled": True,
+                "workers": 1,
+                "preset": "veryfast",
+                "crf": 18,
+                "gop_frames": 15
+            },
+            "voiceover": {
+                "streaming": True,
+                "parallel_min_words": 250,
+                "max_parallel": 4
+            },
+            "async": {
+                "max_connections": 32,
+                "max_jobs": 8,
+                "max_renders": 1
+            },
+            "downloads": {
+                "concurrency": 4,
+                "chunk_size": 1048576,
+                "per_host_interval": 0.25,
+                "retries": 3,
+                "timeout": 30
+            },
+            "cache": {
+                "enabled": True,
+                "dir": ".asset_cache",
+                "max_size_mb": 5120
+            },
+            "audio": {
+                "enabled": True,
+                "target_lufs": -14.0,
+                "true_peak": -1.5,
+                "lra": 11.0,
+                "music": None,
+                "music_level_lu": -18.0,
+                "ducking": True
+            },
+            "thumbnails": {
+                "enabled": True,
+                "upload": True,
+                "samples": 60,
+                "font": None,
+                "title": True
+            },
+            "workspace": {
+                "scratch_dir": "generated_videos/.jobs",
+                "tmpfs_dir": None,
+                "keep_failed": False,
+                "stale_hours": 24,
+                "retention_days": None,
+                "max_output_gb": None,
+                "min_age_minutes": 60,
+                "gc_interval_minutes": 30
+            },
+            "batch": {
+                "queue_size": 2,
+                "workers": {
+                    "script": 2,
+                    "voiceover": 2,
+                    "footage": 2,
+                    "download": 2,
+                    "render": 1,
+                    "upload": 1
+                }
+            },
+            "uploads": {
+                "initial_chunk_mb": 8,
+                "max_chunk_mb": 128,
+                "target_chunk_seconds": 8,
+                "max_retries": 8,
+                "session_file": "upload_sessions.json",
+                "concurrency": 2
+            },
+            "quota": {
+                "enabled": True,
+                "db": "quota.db",
+                "daily_units": 10000,
+                "reserve_units": 0,
+                "timezone": "America/Los_Angeles",
+                "costs": {
+                    "videos.insert": 1600,
+                    "thumbnails.set": 50
+                },
+                "max_wait_minutes": 0
+            },
+            "render_queue": {
+                "enabled": False,
+                "backend": "sqlite",
+                "path": None,
+                "url": "http://127.0.0.1:8765",
+                "blob_dir": "render_blobs",
+                "lease_seconds": 120,
+                "max_attempts": 3,
+                "timeout_minutes": 120,
+                "work_dir": "render_work",
+                "token": None
+            },
+            "jobs": {
+                "db": "jobs.db",
+                "lease_seconds": 600,
+                "max_attempts": 3
+            },
+            "metrics": {
+                "enabled": True,
+                "dir": "metrics",
+                "http_port": None
+            },
             "schedule": {
                 "enabled": False,
                 "time": "09:00",
-                "days": ["monday", "wednesday", "friday"]
+                "days": ["monday", "wednesday", "friday"],
+                "topics_file": None,
+                "upload": True,
+                "catch_up_limit": 3
             }
         }
         
         with open(CONFIG_FILE, 'w') as f:
             json.dump(template, f, indent=2)
     
-    def generate_script(self, topic=None):
+    @instrumented('script')
+    async def generate_script(self, topic=None):
         """Generate video script using Claude"""
         print("\n📝 Generating video script...")
         
-        if not topic:
-            topic = input("Enter video topic (or press Enter for AI suggestion): ").strip()
+        params, key = self.script_request(topic)
+        content = self.script_memo.get(key) if key and self.script_memo else None
+        if content:
+            script_data, problems = self.parse_script(content)
+            # Memo entries written before a prompt or limits change may not pass
+            if not problems:
+                METRICS.add(cache_hits=1)
+                print(f"✅ Script reused from memo: {script_data['title']}")
+                return script_data
         
-        prompt = f"""Create a compelling YouTube SHORT video script about: {topic if topic else 'a trending topic in ' + self.config['video_settings']['niche']}
-
-CRITICAL REQUIREMENTS:
-- Length: 150-200 words MAXIMUM (for ~30 seconds of natural speech)
-- Style: Direct, conversational, factual - speak naturally as if talking to a friend
-- NO meta-language: Never say "title", "description", "keywords", "script", "this video", "today we'll discuss"
-- Start immediately with the CONTENT - no preamble or introduction
-- Be SPECIFIC and FACTUAL - include real data, statistics, concrete benefits, or examples
-- End with a strong value statement - summarize what they just learned
-- NO generic CTAs like "subscribe", "hit the bell", or "comment below"
-
-FORMAT (use these exact labels):
-TITLE: [Compelling, curiosity-driven title under 60 characters]
-DESCRIPTION: [2-3 sentences with key points, include relevant #hashtags]
-TAGS: [8-10 relevant single-word tags separated by commas]
-KEYWORDS: [3-5 descriptive phrases for stock footage - be specific like "person meditating peaceful nature sunset" not just "meditation"]
-SCRIPT:
-[Direct narration only - NO labels, NO meta-talk, just pure content]
-
-GOOD EXAMPLE (meditation topic):
-"Meditation reduces cortisol by 30% in just 8 weeks. It physically increases gray matter in your brain, boosting memory and emotional control. Even 10 minutes daily lowers blood pressure and anxiety significantly. Your brain literally rewires itself to handle stress better."
-
-BAD EXAMPLE (avoid this):
-"Hey everyone, today's video is about meditation. Let me tell you why meditation matters. First, meditation has benefits. It's really important for your health. Thanks for watching, don't forget to subscribe!"
-
-Now create the script following the GOOD example style:
-
-Example of what the SCRIPT section should look like:
-Did you know that just 10 minutes of meditation can change your entire day? Today I'm sharing five powerful meditation techniques that actually work...
-
-[Continue with 400-500 words of engaging narration]
-"""
+        message = await self.anthropic_client.messages.create(**params)
+        record_claude_usage(message.usage)
+        content = message.content[0].text
+        script_data, problems = self.parse_script(content)
         
-        message = self.anthropic_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2000,
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
-        )
+        # A bad script costs one short follow-up call here, instead of a
+        # full voiceover and render that gets thrown away
+        reasks = 0
+        while problems and reasks < int(self.script_settings['max_reasks']):
+            reasks += 1
+            print(f"⚠️  Script failed validation ({'; '.join(problems)}), asking Claude to fix it...")
+            followup = dict(params, messages=params['messages'] + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": reask_message(problems)}
+            ])
+            message = await self.anthropic_client.messages.create(**followup)
+            record_claude_usage(message.usage)
+            METRICS.add(script_reasks=1)
+            content = message.content[0].text
+            script_data, problems = self.parse_script(content)
         
-        content = message.content[0].text
-        script_data = self.parse_script(content)
+        if problems:
+            print(f"❌ Script rejected: {'; '.join(problems)}")
+            return None
+        if key and self.script_memo:
+            self.script_memo.put(key, topic, content, params['model'])
         
         print(f"✅ Script generated: {script_data['title']}")
         print(f"   Keywords: {script_data['keywords']}")
         print(f"   Script length: {len(script_data['script'])} characters")
         return script_data
     
-    def parse_script(self, content):
-        """Parse the Claude response into structured data"""
-        lines = content.split('\n')
-        data = {
-            'title': '',
-            'description': '',
-            'tags': [],
-            'keywords': '',
-            'script': ''
+    def script_request(self, topic=None):
+        """
+        Messages API parameters for one script, plus its memo key
+        
+        AI-suggested topics (no topic given) are never memoized, so each
+        call can come up with something new.
+        
+        Returns:
+            (params, memo_key or None)
+        """
+        settings = self.script_settings
+        subject = topic if topic else 'a trending topic in ' + self.config['video_settings']['niche']
+        system_block = {"type": "text", "text": SCRIPT_INSTRUCTIONS}
+        if settings['prompt_caching']:
+            # Ignored by the API below the minimum cacheable prefix (1024
+            # tokens for Sonnet); see SCRIPT_INSTRUCTIONS
+            system_block["cache_control"] = {"type": "ephemeral"}
+        params = {
+            "model": settings['model'],
+            "max_tokens": settings['max_tokens'],
+            "system": [system_block],
+            "messages": [{
+                "role": "user",
+                "content": f"Create a compelling YouTube SHORT video script about: {subject}"
+            }]
         }
+        # Only explicit topics are memoized: a subject Claude picks itself
+        # should come out different every time
+        key = None
+        if topic:
+            prompt_hash = prompt_digest(SCRIPT_INSTRUCTIONS, settings['max_tokens'])
+            key = memo_key(settings['model'], prompt_hash, topic)
+        return params, key
+    
+    @instrumented('script_batch')
+    async def generate_scripts(self, topics):
+        """
+        Generate scripts for many topics through the Message Batches API
         
-        script_started = False
-        script_lines = []
+        Batched requests cost half as much but can take hours, so this is
+        meant for overnight runs: results go into the script memo, and later
+        runs for the same topics reuse them without calling Claude. Batches
+        are recorded in the memo when submitted, so a run that times out
+        leaves them for the next run to collect instead of resubmitting.
         
-        for line in lines:
-            line = line.strip()
-            if not line:
+        Returns:
+            List aligned with topics: script data, or None where it failed
+        """
+        settings = self.script_settings
+        results = [None] * len(topics)
+        # memo key -> index in topics, for scripts not in the memo yet
+        missing = {}
+        
+        for i, topic in enumerate(topics):
+            params, key = self.script_request(topic)
+            content = self.script_memo.get(key) if self.script_memo else None
+            script_data, problems = self.parse_script(content) if content else (None, True)
+            if not problems:
+                METRICS.add(cache_hits=1)
+                results[i] = script_data
+            else:
+                missing.setdefault(key, []).append(i)
+        
+        if not missing:
+            print(f"✅ All {len(topics)} scripts already in the memo")
+            return results
+        
+        batches = self.anthropic_client.messages.batches
+        # (batch, requests by custom_id, custom_id -> indices in topics)
+        waiting = []
+        for batch_id, requests in (self.script_memo.open_batches() if self.script_memo else []):
+            try:
+                batch = await batches.retrieve(batch_id)
+            except Exception as e:
+                if getattr(e, 'status_code', None) == 404:
+                    self.script_memo.forget_batch(batch_id)
+                print(f"⚠️  Could not check earlier batch {batch_id}: {e}")
                 continue
-                
-            if line.startswith('TITLE:'):
-                data['title'] = line.replace('TITLE:', '').strip()
-            elif line.startswith('DESCRIPTION:'):
-                data['description'] = line.replace('DESCRIPTION:', '').strip()
-            elif line.startswith('TAGS:'):
-                tags_str = line.replace('TAGS:', '').strip()
-                data['tags'] = [t.strip() for t in tags_str.split(',')]
-            elif line.startswith('KEYWORDS:'):
-                data['keywords'] = line.replace('KEYWORDS:', '').strip()
-            elif line.startswith('SCRIPT:'):
-                script_started = True
-            elif script_started:
-                script_lines.append(line)
-        
-        data['script'] = '\n'.join(script_lines).strip()
-        
-        # Fallback: if no structured data found, try to extract from content
-        if not data['title'] or not data['script']:
-            # Just use the whole content as script if parsing failed
-            data['script'] = content.strip()
-            # Generate basic metadata
-            data['title'] = content[:100].strip().split('\n')[0] if content else "AI Generated Video"
-            data['keywords'] = "ai content technology"
-            data['tags'] = ["AI", "Technology", "Education"]
-            data['description'] = content[:200].strip() if len(content) > 200 else content.strip()
-        
-        return data
-    
-    def generate_voiceover(self, script_text):
+            wanted = {custom_id: missing.pop(request['key'])
+                      for custom_id, request in requests.items() if request['key'] in missing}
+            # Finished batches are collected even for other topics; their results are paid for
+            if wanted or batch.processing_status == 'ended':
+                print(f"📨 Collecting earlier batch {batch_id} ({len(requests)} requests)")
+                waiting.append((batch, requests, wanted))
+        
+        if missing:
+            requests, wanted, entries = {}, {}, []
+            for key, indices in missing.items():
+                custom_id = f"topic-{indices[0]}"
+                params, _ = self.script_request(topics[indices[0]])
+                requests[custom_id] = {'topic': topics[indices[0]], 'key': key,
+                                       'model': params['model']}
+                wanted[custom_id] = indices
+                entries.append({"custom_id": custom_id, "params": params})
+            batch = await batches.create(requests=entries)
+            if self.script_memo:
+                self.script_memo.save_batch(batch.id, requests)
+            print(f"📨 Submitted {len(entries)} script requests as batch {batch.id}")
+            waiting.append((batch, requests, wanted))
+        
+        deadline = time.monotonic() + float(settings['batch_timeout_hours']) * 3600
+        while True:
+            for entry in [entry for entry in waiting if entry[0].processing_status == 'ended']:
+                batch, requests, wanted = entry
+                scripts = await self._collect_batch(batch.id, requests)
+                for custom_id, indices in wanted.items():
+                    for i in indices:
+                        results[i] = scripts.get(custom_id)
+                waiting.remove(entry)
+            if not waiting:
+                break
+            if time.monotonic() > deadline:
+                running = ', '.join(batch.id for batch, _, _ in waiting)
+                if self.script_memo:
+                    print(f"⚠️  Batch {running} still running; rerun later to collect results")
+                else:
+                    print(f"⚠️  Batch {running} still running; without the script memo "
+                          f"its results are lost")
+                return results
+            await asyncio.sleep(float(settings['batch_poll_seconds']))
+            waiting = [(await batches.retrieve(batch.id), requests, wanted)
+                       for batch, requests, wanted in waiting]
+        
+        done = sum(1 for script_data in results if script_data)
+        print(f"✅ {done}/{len(topics)} scripts ready")
+        return results
+    
+    async def _collect_batch(self, batch_id, requests):
+        """
+        Store the scripts of a finished batch in the memo and forget the batch
+        
+        Returns:
+            custom_id -> script data, for the scripts that passed validation
+        """
+        scripts = {}
+        async for entry in await self.anthropic_client.messages.batches.results(batch_id):
+            request = requests.get(entry.custom_id)
+            if not request:
+                continue
+            topic = request['topic']
+            if entry.result.type != 'succeeded':
+                print(f"❌ Script for '{topic}' {entry.result.type}")
+                continue
+            message = entry.result.message
+            record_claude_usage(message.usage, batch=True)
+            content = message.content[0].text
+            script_data, problems = self.parse_script(content)
+            if problems:
+                # Left out of the memo; generate_script will re-ask on demand
+                print(f"⚠️  Script for '{topic}' failed validation: {'; '.join(problems)}")
+                continue
+            if request['key'] and self.script_memo:
+                self.script_memo.put(request['key'], topic, content, request['model'])
+            scripts[entry.custom_id] = script_data
+        if self.script_memo:
+            self.script_memo.forget_batch(batch_id)
+        return scripts
+    
+    def parse_script(self, content):
+        """
+        Parse the Claude response into structured data and validate it
+        
+        Returns:
+            (script_data, problems); problems is empty when the script is usable
+        """
+        script_data = parse_script_response(content)
+        problems = validate_script(script_data, self.script_settings.get('limits'))
+        del script_data['missing']
+        return script_data, problems
+    
+    @instrumented('voiceover')
+    async def generate_voiceover(self, script_text, workspace=None):
         """Generate voiceover using ElevenLabs API"""
         print("\n🎤 Generating voiceover...")
         
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.config['video_settings']['voice_id']}"
+        voice_id = self.config['video_settings']['voice_id']
+        model_id = "eleven_multilingual_v2"
+        voice_settings = {
+            "stability": 0.5,
+            "similarity_boost": 0.75
+        }
+        
+        cache_key = voiceover_key(voice_id, model_id, voice_settings, script_text)
+        if self.cache:
+            cached_path = self.cache.get(cache_key)
+            if cached_path:
+                METRICS.add(cache_hits=1)
+                print(f"✅ Voiceover reused from cache: {cached_path}")
+                await self.analyze_loudness(cached_path)
+                return cached_path
+        
+        settings = self.config.get('voiceover', {})
+        audio_path = self._workspace(workspace).file(f"audio_{uuid.uuid4().hex[:8]}.mp3")
         
+        import httpx
+        METRICS.add(tts_characters=len(script_text))
+        try:
+            if not settings.get('streaming', True):
+                ok = await self._synthesize(script_text, audio_path, voice_id, model_id,
+                                            voice_settings)
+            elif len(script_text.split()) >= settings.get('parallel_min_words', 250):
+                ok = await self._synthesize_parallel(script_text, audio_path, voice_id, model_id,
+                                                     voice_settings,
+                                                     settings.get('max_parallel', 4))
+            else:
+                ok = await self._synthesize_stream(script_text, audio_path, voice_id, model_id,
+                                                   voice_settings)
+        except httpx.HTTPError as e:
+            print(f"❌ Error generating voiceover: {e}")
+            ok = False
+        
+        if not ok:
+            audio_path.unlink(missing_ok=True)
+            return None
+        
+        METRICS.add(bytes_downloaded=audio_path.stat().st_size)
+        if self.cache:
+            audio_path = await in_thread(self.cache.put, cache_key, audio_path,
+                                         {'voice_id': voice_id})
+        print(f"✅ Voiceover saved: {audio_path}")
+        await self.analyze_loudness(audio_path)
+        return audio_path
+    
+    async def analyze_loudness(self, audio_path):
+        """
+        Measure the voiceover's loudness once, caching the stats next to
+        it (see audio_mastering.py); done here so the pass overlaps the
+        footage downloads and the render only reads the sidecar
+        """
+        settings = self.config.get('audio') or {}
+        if not settings.get('enabled', True):
+            return None
+        stats = await in_thread(loudness_stats, audio_path, settings)
+        if stats:
+            METRICS.set(voice_lufs=round(stats['input_i'], 1))
+        return stats
+    
+    def _tts_request(self, text, voice_id, model_id, voice_settings, previous_text=None,
+                     next_text=None):
         headers = {
             "xi-api-key": self.config['api_keys']['elevenlabs'],
             "Content-Type": "application/json"
         }
-        
         data = {
-            "text": script_text,
-            "model_id": "eleven_multilingual_v2",
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.75
-            }
+            "text": text,
+            "model_id": model_id,
+            "voice_settings": voice_settings
         }
+        # Neighbouring text keeps intonation continuous across split parts
+        if previous_text:
+            data["previous_text"] = previous_text
+        if next_text:
+            data["next_text"] = next_text
+        return headers, data
+    
+    async def _synthesize(self, text, audio_path, voice_id, model_id, voice_settings):
+        """Buffered TTS request (streaming disabled)"""
+        headers, data = self._tts_request(text, voice_id, model_id, voice_settings)
+        response = await self.http.post(f"{ELEVENLABS_TTS_URL}/{voice_id}", json=data,
+                                        headers=headers)
         
-        response = requests.post(url, json=data, headers=headers)
-        
-        if response.status_code == 200:
-            audio_path = VIDEOS_DIR / f"audio_{int(time.time())}.mp3"
-            with open(audio_path, 'wb') as f:
-                f.write(response.content)
-            print(f"✅ Voiceover saved: {audio_path}")
-            return audio_path
-        else:
+        if response.status_code != 200:
             print(f"❌ Error generating voiceover: {response.status_code}")
             print(response.text)
-            return None
+            return False
+        with open(audio_path, 'wb') as f:
+            f.write(response.content)
+        return True
     
-    def fetch_stock_footage(self, keywords, num_videos=5):
-        """Fetch stock videos from Pexels"""
-        print(f"\n🎬 Fetching stock footage for: {keywords}")
+    async def _synthesize_stream(self, text, audio_path, voice_id, model_id, voice_settings,
+                                 previous_text=None, next_text=None):
+        """
+        Stream TTS audio to disk as it is generated, tracking its duration
+        from MP3 frame headers along the way
         
-        url = "https://api.pexels.com/videos/search"
-        headers = {
-            "Authorization": self.config['api_keys']['pexels']
-        }
-        params = {
-            "query": keywords,
-            "per_page": num_videos,
-            "orientation": "landscape"
-        }
+        Returns:
+            Duration in seconds, or None on failure
+        """
+        headers, data = self._tts_request(text, voice_id, model_id, voice_settings,
+                                          previous_text, next_text)
+        counter = Mp3DurationCounter()
         
-        response = requests.get(url, headers=headers, params=params)
+        async with self.http.stream('POST', f"{ELEVENLABS_TTS_URL}/{voice_id}/stream",
+                                    json=data, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                print(f"❌ Error generating voiceover: {response.status_code}")
+                print(response.text)
+                return None
+            with open(audio_path, 'wb') as f:
+                async for chunk in response.aiter_bytes(64 * 1024):
+                    f.write(chunk)
+                    counter.feed(chunk)
         
-        if response.status_code == 200:
-            videos = response.json().get('videos', [])
-            video_urls = []
-            
-            for video in videos:
-                # Get highest quality video file
-                video_files = video.get('video_files', [])
-                if video_files:
-                    # Sort by quality (width)
-                    best_quality = max(video_files, key=lambda x: x.get('width', 0))
-                    video_urls.append(best_quality['link'])
+        print(f"   Audio duration: {counter.duration:.1f}s")
+        return counter.duration or None
+    
+    async def _synthesize_parallel(self, text, audio_path, voice_id, model_id, voice_settings,
+                                   max_parallel):
+        """Split long scripts by sentence, synthesize parts concurrently, then stitch"""
+        sentences = [s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s]
+        parts_count = max(1, min(max_parallel, len(sentences)))
+        per_part = -(-len(sentences) // parts_count)
+        parts = [' '.join(sentences[i:i + per_part]) for i in range(0, len(sentences), per_part)]
+        part_paths = [audio_path.with_name(f"{audio_path.stem}_part{i}.mp3") for i in range(len(parts))]
+        
+        print(f"   Synthesizing {len(parts)} parts in parallel...")
+        
+        def synthesize(i):
+            return self._synthesize_stream(
+                parts[i], part_paths[i], voice_id, model_id, voice_settings,
+                previous_text=parts[i - 1] if i > 0 else None,
+                next_text=parts[i + 1] if i + 1 < len(parts) else None)
+        
+        try:
+            durations = await asyncio.gather(*(synthesize(i) for i in range(len(parts))))
+            if not all(durations):
+                return False
             
-            print(f"✅ Found {len(video_urls)} stock videos")
-            return video_urls
-        else:
-            print(f"❌ Error fetching stock footage: {response.status_code}")
+            # MP3 frames concatenate cleanly once per-part headers are dropped;
+            # part 0's too, as its Xing/Info frame counts only part 0's frames
+            with open(audio_path, 'wb') as out:
+                for part_path in part_paths:
+                    out.write(strip_mp3_header(part_path.read_bytes()))
+            return True
+        finally:
+            for part_path in part_paths:
+                part_path.unlink(missing_ok=True)
+    
+    @instrumented('footage')
+    async def fetch_stock_footage(self, keywords, target_seconds=None, orientation=None):
+        """
+        Fetch stock videos from Pexels
+        
+        Each KEYWORDS phrase is searched concurrently; the merged results are
+        deduplicated, ranked, and just enough clips are picked to cover
+        target_seconds of narration (five clips if it is unknown).
+        
+        Args:
+            orientation: Pexels orientation filter (defaults to the shape of
+                the first render output: landscape, portrait or square)
+        
+        Returns:
+            List of rendition URLs, best first
+        """
+        print(f"\n🎬 Fetching stock footage for: {keywords}")
+        search_settings = self.footage_search.settings
+        primary = self.render_outputs(VIDEOS_DIR / 'video.mp4')[0]
+        width, height = primary['width'], primary['height']
+        if orientation is None:
+            orientation = ('portrait' if height > width else
+                           'square' if height == width else 'landscape')
+        
+        phrases = split_keywords(keywords) or [keywords]
+        # Cached, coalesced with identical in-flight searches and rate limited
+        results = await self.footage_search.search_many_async(
+            self.http, phrases, per_page=search_settings['per_phrase'], orientation=orientation)
+        if not any(results):
             return []
+        
+        candidates = rank_candidates(results, width, height,
+                                     search_settings['ideal_clip_seconds'])
+        if target_seconds:
+            selected = select_clips(candidates, target_seconds, search_settings['max_clips'])
+        else:
+            selected = candidates[:5]
+        
+        video_urls = [candidate['rendition']['link'] for candidate in selected]
+        covered = sum(candidate['duration'] or 0 for candidate in selected)
+        print(f"✅ Selected {len(video_urls)} of {len(candidates)} stock videos "
+              f"from {len(phrases)} searches ({covered:.0f}s of footage)")
+        return video_urls
+    
+    def render_outputs(self, video_path):
+        """
+        Output profiles from the "render" block, with each output's file
+        derived from the first output's path (see resolve_outputs)
+        """
+        return resolve_outputs(video_path,
+                               self.config['video_settings'].get('resolution', '1920x1080'),
+                               (self.config.get('render') or {}).get('outputs'))
+    
+    def estimate_duration(self, script_text):
+        """Expected voiceover length, used to size the footage selection"""
+        words_per_minute = self.footage_search.settings['words_per_minute']
+        return estimate_narration_seconds(script_text, words_per_minute)
+    
+    def _workspace(self, workspace):
+        """The caller's job workspace, or a fresh one left for garbage collection"""
+        if workspace is None:
+            workspace = self.workspaces.create()
+            self.workspaces.release(workspace)
+        return workspace
     
-    def download_videos(self, urls):
-        """Download stock videos"""
+    @instrumented('download')
+    async def download_videos(self, urls, workspace=None):
+        """Download stock videos concurrently over the shared connection pool"""
         print("\n⬇️  Downloading stock videos...")
-        downloaded_files = []
         
-        # Download more videos for variety (5 instead of 3)
-        for i, url in enumerate(urls[:5]):
-            try:
-                response = requests.get(url, stream=True)
-                if response.status_code == 200:
-                    # Use timestamp to ensure unique filenames
-                    video_path = VIDEOS_DIR / f"stock_{int(time.time())}_{i}_{hash(url) % 10000}.mp4"
-                    with open(video_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    downloaded_files.append(video_path)
-                    print(f"✅ Downloaded video {i+1}/{min(len(urls), 5)}")
-                time.sleep(0.5)  # Shorter delay
-            except Exception as e:
-                print(f"⚠️  Failed to download video {i+1}: {e}")
+        # The footage selector already sized the list to cover the narration
+        selected = urls[:self.footage_search.settings['max_clips']]
+        results = [None] * len(selected)
+        jobs = []
+        # url -> indices in selected; a URL listed twice is downloaded once,
+        # since both jobs would write the same stock_<digest>.mp4
+        pending = {}
+        workspace = self._workspace(workspace)
+        
+        for i, url in enumerate(selected):
+            cached_path = self.cache.get(clip_key(url)) if self.cache else None
+            if cached_path:
+                METRICS.add(cache_hits=1)
+                results[i] = cached_path
+                print(f"✅ Reused cached video {i+1}/{len(selected)}")
+                continue
+            if url in pending:
+                pending[url].append(i)
+                continue
+            # Names are derived from the URL so an interrupted .part file
+            # can be resumed next time
+            url_digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+            jobs.append((url, workspace.file(f"stock_{url_digest}.mp4")))
+            pending[url] = [i]
         
-        return downloaded_files
+        for (url, indices), path in zip(pending.items(), await self.downloader.download_all(jobs)):
+            if path:
+                METRICS.add(bytes_downloaded=path.stat().st_size)
+            if path and self.cache:
+                # Hashing a large clip would stall the event loop
+                path = await in_thread(self.cache.put, clip_key(url), path, {'url': url})
+            for i in indices:
+                results[i] = path
+        
+        downloaded = [path for path in results if path]
+        # Convert each new clip to a render-ready mezzanine in the background
+        if self.normalizer:
+            for path in downloaded:
+                self.normalizer.submit(path)
+        return downloaded
     
-    def create_video(self, audio_path, video_files, script_data):
-        """Create final video using FFmpeg"""
+    @instrumented('render')
+    async def create_video(self, audio_path, video_files, script_data, workspace=None):
+        """
+        Create final video using a single FFmpeg pass
+        
+        Every output profile in the "render" block is encoded from the same
+        decode of the footage; outputs after the first are written next to
+        the returned path with their name as a suffix.
+        
+        Returns:
+            Path of the first output, or None on failure
+        """
         print("\n🎥 Creating final video...")
         
-        output_filename = f"video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+        output_filename = f"video_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.mp4"
         output_path = VIDEOS_DIR / output_filename
+        # Render inside the job's workspace and rename into place when done,
+        # so the output directory never holds a half-written video
+        workspace = self._workspace(workspace)
+        render_path = workspace.file(output_filename)
+        outputs = self.render_outputs(output_path)
+        rendered = self.render_outputs(render_path)
         
-        # Get audio duration
-        duration_cmd = f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{audio_path}"'
-        duration = float(subprocess.check_output(duration_cmd, shell=True).decode().strip())
+        # Get audio duration from MP3 frame headers (ffprobe for other formats)
+        duration = None
+        if str(audio_path).lower().endswith('.mp3'):
+            duration = await in_thread(mp3_duration, audio_path)
+        if duration is None:
+            duration = await in_thread(probe_duration, audio_path)
+        if duration is None:
+            print(f"❌ Could not read audio duration: {audio_path}")
+            return None
         
         if not video_files:
             print("⚠️  No video files available, creating video with solid background...")
-            # Create video with solid color background and text
-            cmd = f'''ffmpeg -f lavfi -i color=c=black:s=1920x1080:d={duration} -i "{audio_path}" \
-                -c:v libx264 -c:a aac -shortest -y "{output_path}"'''
-        else:
-            # Create concat file for multiple videos
-            concat_file = VIDEOS_DIR / "concat_list.txt"
-            with open(concat_file, 'w') as f:
-                for video_file in video_files:
-                    f.write(f"file '{video_file.absolute()}'\n")
-            
-            # Concatenate videos and add audio
-            temp_video = VIDEOS_DIR / "temp_concat.mp4"
-            
-            # First, concatenate videos
-            concat_cmd = f'ffmpeg -f concat -safe 0 -i "{concat_file}" -c copy -y "{temp_video}"'
-            subprocess.run(concat_cmd, shell=True, check=True)
-            
-            # Then, trim to audio length and add audio
-            cmd = f'''ffmpeg -i "{temp_video}" -i "{audio_path}" \
-                -t {duration} -c:v libx264 -c:a aac -shortest -y "{output_path}"'''
+        elif self.normalizer and all(output['width'] * self.normalizer.height ==
+                                     output['height'] * self.normalizer.width
+                                     for output in outputs):
+            # Use pre-normalized mezzanines where the background job has
+            # finished (only if no output would crop into their padding)
+            video_files = [self.normalizer.resolve(path) for path in video_files]
+        
+        # Scale/pad, trim, concatenate and mux audio in one encode (or in
+        # parallel keyframe-aligned segments, per the "render" block)
+        video_settings = self.config['video_settings']
+        
+        if self._render_slots is None:
+            self._render_slots = asyncio.Semaphore(
+                max(1, int(self.config.get('async', {}).get('max_renders', 1))))
         
         try:
-            subprocess.run(cmd, shell=True, check=True)
-            print(f"✅ Video created successfully: {output_path}")
+            # Loudness normalization and the music bed are applied by the
+            # render itself, from stats cached when the voiceover was made
+            mastering = await in_thread(plan_mastering, audio_path, self.config.get('audio'))
+            # Seconds into the encode at which each output was finished, by path
+            timings = {}
+            if self.render_queue:
+                # Remote workers bring their own CPUs, so the local render slots don't apply
+                elapsed = await self.render_remotely(audio_path, video_files, rendered,
+                                                     duration, mastering, timings)
+                if elapsed is None:
+                    return None
+            else:
+                # Network stages overlap freely; FFmpeg is CPU-bound, so only a
+                # few renders run at once
+                async with self._render_slots:
+                    started = time.monotonic()
+                    encodes = await render_video_async(
+                        audio_path, video_files, render_path, duration,
+                        resolution=video_settings.get('resolution', '1920x1080'),
+                        fps=video_settings.get('fps', 30),
+                        settings=self.config.get('render'),
+                        work_dir=workspace.intermediates_dir(),
+                        mastering=mastering,
+                        timings=timings
+                    )
+                    elapsed = time.monotonic() - started
+                # One encode writes every output at once, so their times are the same
+                METRICS.set(render_outputs_share_time=len(rendered) > 1 and encodes == 1)
+            frames = duration * video_settings.get('fps', 30)
+            METRICS.set(encode_fps=round(frames / elapsed, 1) if elapsed > 0 else None,
+                        output_seconds=round(duration, 2))
             
-            # Cleanup
-            if video_files:
-                temp_video.unlink(missing_ok=True)
-                concat_file.unlink(missing_ok=True)
+            # Each output's time is when the FFmpeg command that wrote it finished
+            for output, result in zip(outputs, rendered):
+                stat = result['path'].stat()
+                ready = timings.get(str(result['path']), elapsed)
+                await in_thread(publish, result['path'], output['path'])
+                METRICS.add(bytes_written=stat.st_size)
+                METRICS.set(**{f"render_{output['name']}_seconds": round(ready, 2),
+                               f"render_{output['name']}_bytes": stat.st_size})
+                print(f"   📼 {output['name']} {output['width']}x{output['height']}: "
+                      f"{stat.st_size / (1024 * 1024):.1f} MB, "
+                      f"{stat.st_size * 8 / 1000 / duration:.0f} kb/s, ready after {ready:.1f}s")
+            print(f"✅ Video created successfully: {output_path}")
             
+            # Outside the render slot: frame scoring is light next to an encode
+            await self.create_thumbnail(output_path, script_data, duration, workspace)
             return output_path
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
+            # OSError also covers an unreachable render queue
             print(f"❌ Error creating video: {e}")
+            for result in rendered:
+                result['path'].unlink(missing_ok=True)
             return None
     
-    def upload_to_youtube(self, video_path, script_data):
-        """Upload video to YouTube using official Google API"""
+    async def render_remotely(self, audio_path, video_files, rendered, duration,
+                              mastering=None, timings=None):
+        """
+        Publish a render job to the render queue and wait for a worker to
+        finish it, then download its outputs to the paths in rendered
+        
+        The worker's per-output finish times go into timings, by local path
+        
+        Returns:
+            The worker's encode time in seconds, or None on failure
+        """
+        settings, queue, blobs = self.render_queue
+        video_settings = self.config['video_settings']
+        manifest = await in_thread(
+            build_manifest, blobs, audio_path, video_files, duration, rendered[0]['path'].name,
+            video_settings.get('resolution', '1920x1080'), video_settings.get('fps', 30),
+            self.config.get('render'), mastering)
+        job_id = await in_thread(queue.submit, manifest)
+        print(f"📮 Render job {job_id} queued ({len(video_files)} clips)")
+        
+        queued = time.monotonic()
+        deadline = queued + settings['timeout_minutes'] * 60
+        while True:
+            status = await in_thread(queue.status, job_id)
+            if status and status['status'] in ('done', 'failed'):
+                break
+            if time.monotonic() > deadline:
+                print(f"❌ Render job {job_id} not finished after {settings['timeout_minutes']} min")
+                return None
+            await asyncio.sleep(settings['poll_seconds'])
+        
+        if status['status'] == 'failed':
+            print(f"❌ Render job {job_id} failed: {status['error']}")
+            return None
+        result = status['result']
+        if not await in_thread(fetch_outputs, blobs, result, rendered):
+            print(f"❌ Render job {job_id} returned missing or corrupted outputs")
+            return None
+        if timings is not None:
+            by_name = {output['name']: output for output in result['outputs']}
+            for output in rendered:
+                timings[str(output['path'])] = by_name[output['name']].get(
+                    'ready_seconds', result['render_seconds'])
+        waited = time.monotonic() - queued - result['render_seconds']
+        METRICS.set(render_worker=result.get('worker'), render_attempts=status['attempts'],
+                    queue_wait_seconds=round(waited, 2),
+                    render_outputs_share_time=len(rendered) > 1 and result.get('encodes') == 1)
+        print(f"✅ Render job {job_id} done by {result.get('worker')}")
+        return result['render_seconds']
+    
+    @instrumented('thumbnail')
+    async def create_thumbnail(self, video_path, script_data, duration=None, workspace=None):
+        """
+        Pick the best frame of the video and save it with the title as
+        <video>_thumb.jpg next to it (see thumbnails.py)
+        
+        Returns:
+            Path of the thumbnail, or None if disabled or it failed
+        """
+        settings = self.config.get('thumbnails') or {}
+        if not settings.get('enabled', True):
+            return None
+        
+        try:
+            from thumbnails import create_thumbnail
+        except ImportError as e:
+            print(f"⚠️  Thumbnails need numpy and Pillow ({e}), skipping")
+            return None
+        
+        video_path = Path(video_path)
+        if duration is None:
+            duration = await in_thread(probe_duration, video_path)
+        if not duration:
+            print(f"⚠️  Could not read video duration, skipping thumbnail: {video_path}")
+            return None
+        
+        output = self.render_outputs(video_path)[0]
+        thumbnail_path = thumbnail_for(video_path)
+        workspace = self._workspace(workspace)
+        try:
+            scratch_path = await in_thread(
+                create_thumbnail, video_path, script_data['title'], duration,
+                (output['width'], output['height']), workspace.file(thumbnail_path.name), settings)
+            await in_thread(publish, scratch_path, thumbnail_path)
+        except (subprocess.CalledProcessError, ValueError, OSError) as e:
+            print(f"⚠️  Could not create thumbnail: {e}")
+            return None
+        METRICS.add(bytes_written=thumbnail_path.stat().st_size)
+        print(f"🖼️  Thumbnail created: {thumbnail_path}")
+        return thumbnail_path
+    
+    @instrumented('upload')
+    async def upload_to_youtube(self, video_path, script_data, publish_at=None):
+        """
+        Upload video to YouTube using official Google API
+        
+        Raises:
+            QuotaDeferred if today's API quota can't fit the upload; the
+            video is kept so the upload can be retried after the reset
+        """
         print("\n📤 Uploading to YouTube...")
         
         try:
             from youtube_uploader import YouTubeUploader
             
-            uploader = YouTubeUploader(self.config['youtube']['credentials_file'])
+            uploader = YouTubeUploader(self.config['youtube']['credentials_file'],
+                                       upload_settings=self.config.get('uploads'),
+                                       quota_settings=self.config.get('quota'))
+            # Scheduled videos have a publish time to make, so they get quota first
+            priority = 10 if publish_at else 0
             
-            video_id = uploader.upload_video(
+            # The Google API client is blocking, so the upload runs on a worker thread
+            video_id = await in_thread(
+                uploader.upload_video,
                 video_file=str(video_path),
                 title=script_data['title'],
                 description=script_data['description'],
                 tags=script_data['tags'],
                 category='22',  # People & Blogs
-                privacy='public'
+                privacy='public',
+                publish_at=publish_at,
+                priority=priority
             )
             
-            if video_id:
-                return f"https://youtube.com/watch?v={video_id}"
-            return None
+            if not video_id:
+                return None
+            
+            # Set after the upload, since YouTube needs the video id; made
+            # here if the render stage did not (e.g. thumbnails were off then)
+            settings = self.config.get('thumbnails') or {}
+            if settings.get('enabled', True) and settings.get('upload', True):
+                thumbnail_path = thumbnail_for(video_path)
+                if not thumbnail_path.exists():
+                    thumbnail_path = await self.create_thumbnail(video_path, script_data)
+                if thumbnail_path:
+                    try:
+                        await in_thread(uploader.update_thumbnail, video_id, str(thumbnail_path),
+                                        priority + 1)
+                    except Exception as e:
+                        # The video is up; a missing thumbnail is not worth failing it for
+                        print(f"⚠️  Could not set thumbnail: {e}")
             
+            # Further render outputs (e.g. a vertical Short) go up as their own videos
+            for output in self.render_outputs(video_path)[1:]:
+                if not output['upload'] or not output['path'].exists():
+                    continue
+                title = script_data['title']
+                if output['height'] > output['width']:
+                    title = f"{title} #Shorts"
+                try:
+                    extra_id = await in_thread(
+                        uploader.upload_video,
+                        video_file=str(output['path']),
+                        title=title,
+                        description=script_data['description'],
+                        tags=script_data['tags'],
+                        category='22',
+                        privacy='public',
+                        publish_at=publish_at,
+                        priority=priority - 1
+                    )
+                except QuotaDeferred as e:
+                    # The main video is up, so don't fail (and retry) the whole job
+                    print(f"⏳ {output['name']} version not uploaded: {e}")
+                    print(f"   File: {output['path']}")
+                    continue
+                if extra_id:
+                    print(f"✅ {output['name']} version: https://youtube.com/watch?v={extra_id}")
+            return f"https://youtube.com/watch?v={video_id}"
+        
+        except QuotaDeferred as e:
+            print(f"⏳ {e}")
+            raise
         except ImportError:
             print("❌ youtube_uploader module not found")
-            print(f"\nVideo ready for manual upload:")
-            print(f"   File: {video_path}")
-            print(f"   Title: {script_data['title']}")
-            print(f"   Description: {script_data['description']}")
-            print(f"   Tags: {', '.join(script_data['tags'])}")
+            print_manual_upload(video_path, script_data)
             return None
         except Exception as e:
             print(f"❌ Error uploading to YouTube: {e}")
-            print(f"\nVideo ready for manual upload:")
+            print("\nVideo ready for manual upload:")
             print(f"   File: {video_path}")
             return None
     
-    def run_full_automation(self, topic=None):
-        """Run the complete automation pipeline"""
-        print("=" * 60)
-        print("🤖 YOUTUBE AUTOMATION PIPELINE STARTED")
-        print("=" * 60)
+    async def produce_video(self, topic=None):
+        """
+        Steps 1-5: script, voiceover, footage and render
+        
+        Returns:
+            (script_data, video_path), or None if the voiceover or render failed
+        """
+        # Step 1: Generate script
+        script_data = await self.generate_script(topic)
+        if not script_data:
+            return None
         
+        await in_thread(self.workspaces.maybe_collect)
+        workspace = self.workspaces.create()
+        final_video = None
         try:
-            # Step 1: Generate script
-            script_data = self.generate_script(topic)
+            # Step 2: Generate voiceover while Steps 3-4 fetch and download stock footage
+            async def footage():
+                video_urls = await self.fetch_stock_footage(
+                    script_data['keywords'], self.estimate_duration(script_data['script']))
+                return await self.download_videos(video_urls, workspace) if video_urls else []
             
-            # Step 2: Generate voiceover
-            audio_path = self.generate_voiceover(script_data['script'])
+            audio_path, video_files = await asyncio.gather(
+                self.generate_voiceover(script_data['script'], workspace), footage())
             if not audio_path:
-                return False
-            
-            # Step 3: Fetch stock footage
-            video_urls = self.fetch_stock_footage(script_data['keywords'])
-            
-            # Step 4: Download videos
-            video_files = self.download_videos(video_urls) if video_urls else []
+                return None
             
             # Step 5: Create final video
-            final_video = self.create_video(audio_path, video_files, script_data)
+            final_video = await self.create_video(audio_path, video_files, script_data,
+                                                  workspace)
             if not final_video:
+                return None
+            return script_data, final_video
+        finally:
+            # Audio and clips are only needed until the render is published
+            await in_thread(workspace.cleanup, failed=final_video is None)
+    
+    async def run_full_automation(self, topic=None, upload=False):
+        """
+        Run the complete automation pipeline
+        
+        Args:
+            topic: Video topic (a trending topic in the niche if empty)
+            upload: True/False, or a callable asked once the video is rendered
+        """
+        print("=" * 60)
+        print("🤖 YOUTUBE AUTOMATION PIPELINE STARTED")
+        print("=" * 60)
+        
+        try:
+            produced = await self.produce_video(topic)
+            if not produced:
                 return False
+            script_data, final_video = produced
             
             # Step 6: Upload to YouTube
-            print("\n" + "=" * 60)
-            print("Would you like to upload to YouTube now?")
-            print("1. Yes, upload automatically")
-            print("2. No, I'll upload manually later")
-            choice = input("Choice (1/2): ").strip()
+            if callable(upload):
+                upload = await in_thread(upload)
             
-            if choice == '1':
-                self.upload_to_youtube(final_video, script_data)
+            if upload:
+                try:
+                    await self.upload_to_youtube(final_video, script_data)
+                except QuotaDeferred:
+                    print_manual_upload(final_video, script_data)
             else:
-                print(f"\n✅ Video ready for manual upload:")
-                print(f"   File: {final_video}")
-                print(f"   Title: {script_data['title']}")
-                print(f"   Description: {script_data['description']}")
-                print(f"   Tags: {', '.join(script_data['tags'])}")
+                print("\n✅ Video ready for manual upload:")
+                print_manual_upload(final_video, script_data, header=False)
             
             print("\n" + "=" * 60)
             print("✅ AUTOMATION COMPLETED SUCCESSFULLY!")
             print("=" * 60)
             return True
-            
+        
         except Exception as e:
             print(f"\n❌ Error in automation pipeline: {e}")
             import traceback
             traceback.print_exc()
             return False
+    
+    async def run_many(self, topics, upload=False, concurrency=None):
+        """
+        Produce one video per topic, up to `concurrency` at once on this event loop
+        
+        Returns:
+            Report dict with per-job results and throughput
+        """
+        concurrency = concurrency or self.config.get('async', {}).get('max_jobs', 8)
+        semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+        
+        async def run_one(index, topic):
+            async with semaphore:
+                METRICS.set_job(f"{index}:{topic}")
+                result = {'topic': topic, 'video_path': None, 'video_url': None}
+                try:
+                    produced = await self.produce_video(topic)
+                    if not produced:
+                        result['error'] = "voiceover or render failed"
+                        return result
+                    script_data, result['video_path'] = produced
+                    if upload:
+                        result['video_url'] = await self.upload_to_youtube(
+                            result['video_path'], script_data)
+                        if not result['video_url']:
+                            result['error'] = "upload failed"
+                except QuotaDeferred as e:
+                    result['error'] = str(e)
+                    result['deferred'] = True
+                except Exception as e:
+                    result['error'] = str(e)
+                return result
+        
+        print("=" * 60)
+        print(f"🤖 CONCURRENT BATCH STARTED: {len(topics)} topics, {concurrency} at a time")
+        print("=" * 60)
+        
+        started = time.monotonic()
+        jobs = await asyncio.gather(*(run_one(i, topic) for i, topic in enumerate(topics)))
+        wall_seconds = time.monotonic() - started
+        succeeded = sum(1 for job in jobs if not job.get('error'))
+        
+        report = {
+            'total': len(jobs),
+            'succeeded': succeeded,
+            'failed': len(jobs) - succeeded,
+            'wall_seconds': wall_seconds,
+            'videos_per_hour': succeeded * 3600.0 / wall_seconds if wall_seconds > 0 else 0.0,
+            'deferred': sum(1 for job in jobs if job.get('deferred')),
+            'jobs': jobs
+        }
+        print("\n" + "=" * 60)
+        print(f"📊 Videos: {report['succeeded']}/{report['total']} succeeded in "
+              f"{wall_seconds:.1f}s ({report['videos_per_hour']:.1f} videos/hour)")
+        for job in jobs:
+            if job.get('error'):
+                print(f"   ❌ {job['topic']}: {job['error']}")
+        return report
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pools"""
+        if self._http is not None:
+            await self._http.aclose()
+        if self._anthropic_client is not None:
+            await self._anthropic_client.close()
+
+
+class YouTubeAutomation:
+    """
+    Blocking front end over AsyncYouTubeAutomation, used by the menu, the
+    batch runner, job workers and the scheduler. Calls from any thread run
+    on one event loop in a background thread, so concurrent callers still
+    share its connection pools.
+    """
+    
+    def __init__(self):
+        self.pipeline = AsyncYouTubeAutomation()
+        self.config = self.pipeline.config
+        self.workspaces = self.pipeline.workspaces
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='pipeline-loop',
+                         daemon=True).start()
+    
+    def _run(self, coro):
+        # The caller's context (e.g. its METRICS job label) travels with the coroutine
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    def close(self):
+        """Close connection pools and stop the event loop thread"""
+        self._run(self.pipeline.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+    
+    def generate_script(self, topic=None, prompt=True):
+        """
+        Generate video script using Claude
+        
+        Args:
+            topic: Video topic (None lets Claude suggest one)
+            prompt: Ask for a topic on stdin when none is given; batch and
+                scheduled runs pass False so they never wait on input
+        """
+        if not topic and prompt:
+            topic = input("Enter video topic (or press Enter for AI suggestion): ").strip()
+        return self._run(self.pipeline.generate_script(topic))
+    
+    def generate_scripts(self, topics):
+        return self._run(self.pipeline.generate_scripts(topics))
+    
+    def parse_script(self, content):
+        return self.pipeline.parse_script(content)
+    
+    def generate_voiceover(self, script_text, workspace=None):
+        return self._run(self.pipeline.generate_voiceover(script_text, workspace))
+    
+    def fetch_stock_footage(self, keywords, target_seconds=None, orientation=None):
+        return self._run(self.pipeline.fetch_stock_footage(keywords, target_seconds,
+                                                           orientation))
+    
+    def estimate_duration(self, script_text):
+        return self.pipeline.estimate_duration(script_text)
+    
+    def download_videos(self, urls, workspace=None):
+        return self._run(self.pipeline.download_videos(urls, workspace))
+    
+    def create_video(self, audio_path, video_files, script_data, workspace=None):
+        return self._run(self.pipeline.create_video(audio_path, video_files, script_data,
+                                                    workspace))
+    
+    def create_thumbnail(self, video_path, script_data, duration=None, workspace=None):
+        return self._run(self.pipeline.create_thumbnail(video_path, script_data, duration,
+                                                        workspace))
+    
+    def upload_to_youtube(self, video_path, script_data, publish_at=None):
+        return self._run(self.pipeline.upload_to_youtube(video_path, script_data, publish_at))
+    
+    def run_batch(self, topics, upload=False):
+        """Generate one video per topic through the pipelined batch executor"""
+        return run_batch(self, topics, upload=upload, settings=self.config.get('batch'))
+    
+    def run_many(self, topics, upload=False, concurrency=None):
+        """Generate one video per topic as concurrent jobs on the event loop"""
+        return self._run(self.pipeline.run_many(topics, upload, concurrency))
+    
+    def run_full_automation(self, topic=None, upload=None):
+        """
+        Run the complete automation pipeline
+        
+        Args:
+            topic: Video topic (prompted for if empty)
+            upload: True/False to skip the upload prompt, None to ask
+        """
+        if not topic:
+            topic = input("Enter video topic (or press Enter for AI suggestion): ").strip()
+        if upload is None:
+            upload = ask_upload
+        return self._run(self.pipeline.run_full_automation(topic, upload))
+
+
+def ask_upload():
+    """Interactive upload prompt shown once the video is rendered"""
+    print("\n" + "=" * 60)
+    print("Would you like to upload to YouTube now?")
+    print("1. Yes, upload automatically")
+    print("2. No, I'll upload manually later")
+    return input("Choice (1/2): ").strip() == '1'
+
+
+def print_manual_upload(video_path, script_data, header=True):
+    """Print what is needed to upload the video by hand"""
+    if header:
+        print("\nVideo ready for manual upload:")
+    print(f"   File: {video_path}")
+    if thumbnail_for(video_path).exists():
+        print(f"   Thumbnail: {thumbnail_for(video_path)}")
+    print(f"   Title: {script_data['title']}")
+    print(f"   Description: {script_data['description']}")
+    print(f"   Tags: {', '.join(script_data['tags'])}")
+
+
+def thumbnail_for(video_path):
+    """Where the thumbnail of a rendered video is saved"""
+    video_path = Path(video_path)
+    return video_path.with_name(f"{video_path.stem}_thumb.jpg")
+
+
+def record_claude_usage(usage, batch=False):
+    """Add a Messages API usage block to the active stage's counters"""
+    prefix = 'claude_batch' if batch else 'claude'
+    METRICS.add(**{
+        f'{prefix}_input_tokens': usage.input_tokens,
+        f'{prefix}_output_tokens': usage.output_tokens,
+        'claude_cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', None),
+        'claude_cache_read_tokens': getattr(usage, 'cache_read_input_tokens', None)
+    })
+
+
+async def in_thread(func, *args, **kwargs):
+    """Run a blocking call on the default executor, keeping the caller's context"""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+def parse_args(argv=None):
+    """Parse command-line options (no options = interactive menu)"""
+    parser = argparse.ArgumentParser(description="Faceless YouTube video automation")
+    parser.add_argument('--batch', metavar='TOPICS_FILE',
+                        help="Generate one video per line of TOPICS_FILE without prompts")
+    parser.add_argument('--concurrency', type=int, metavar='N',
+                        help="With --batch: run up to N videos at once on one asyncio event loop "
+                             "instead of the staged thread pipeline")
+    parser.add_argument('--upload', action='store_true',
+                        help="Upload each finished video to YouTube (batch/enqueue mode)")
+    parser.add_argument('--scripts', metavar='TOPICS_FILE',
+                        help="Pre-generate scripts for every topic via the Message Batches API "
+                             "(half price, may take hours); later runs reuse them")
+    parser.add_argument('--enqueue', metavar='TOPICS_FILE',
+                        help="Add one durable job per line of TOPICS_FILE to the job store")
+    parser.add_argument('--worker', action='store_true',
+                        help="Claim and run queued jobs, resuming from their last checkpoint")
+    parser.add_argument('--forever', action='store_true',
+                        help="Keep the worker (or render worker) polling for new jobs "
+                             "instead of exiting")
+    parser.add_argument('--jobs', action='store_true',
+                        help="List queued jobs and their progress")
+    parser.add_argument('--render-worker', action='store_true',
+                        help="Render jobs from the \"render_queue\" block's queue (with "
+                             "--forever, keep polling)")
+    parser.add_argument('--render-queue-server', action='store_true',
+                        help="Serve the render queue and its inputs over HTTP for workers "
+                             "on other machines")
+    parser.add_argument('--quota', action='store_true',
+                        help="Show today's YouTube API quota usage per project")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Run the scheduler from the config \"schedule\" block")
+    return parser.parse_args(argv)
+
+
+def load_job_store():
+    """Open the durable job store configured in config.json"""
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+    return JobStore.from_config(config.get('jobs'))
+
+
+def run_scheduler(automation):
+    """Run the schedule daemon until interrupted"""
+    schedule = automation.config.get('schedule', {})
+    if not schedule.get('enabled'):
+        print("⚠️  Scheduling is disabled. Set \"enabled\": true in the schedule block of config.json")
+        return
+    
+    daemon = ScheduleDaemon(automation, schedule)
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Scheduler stopped")
 
 
 def main():
     """Main entry point"""
+    args = parse_args()
+    
+    if args.enqueue:
+        store = load_job_store()
+        topics = read_topics(args.enqueue)
+        for topic in topics:
+            store.add_job(topic, upload=args.upload)
+        print(f"✅ Queued {len(topics)} job(s) in {store.db_path}")
+        return
+    
+    if args.scripts:
+        topics = read_topics(args.scripts)
+        if not topics:
+            print(f"❌ No topics found in {args.scripts}")
+            return
+        automation = YouTubeAutomation()
+        results = automation.generate_scripts(topics)
+        if not all(results):
+            exit(1)
+        return
+    
+    if args.jobs:
+        for job in load_job_store().list_jobs():
+            print(f"   #{job['id']} [{job['status']}] {job['topic']} "
+                  f"(attempts: {job['attempts']}, done: {', '.join(job['stages_done']) or '-'})")
+            if job['error']:
+                print(f"      ❌ {job['error']}")
+        return
+    
+    if args.render_worker or args.render_queue_server:
+        # Workers need no API keys, only the queue settings
+        with open(CONFIG_FILE, 'r') as f:
+            config = json.load(f)
+        if args.render_queue_server:
+            serve_render_queue(config.get('render_queue'))
+        else:
+            run_render_worker(config.get('render_queue'), stop_when_empty=not args.forever)
+        return
+    
+    if args.quota:
+        with open(CONFIG_FILE, 'r') as f:
+            config = json.load(f)
+        ledger = QuotaLedger(config.get('quota'))
+        usage = ledger.usage()
+        if not usage:
+            print("📊 No YouTube API quota used today")
+        for project in usage:
+            calls = ', '.join(f"{op} x{count}" for op, count in project['calls'].items())
+            print(f"📊 {project['project']}: {project['used']} units used, "
+                  f"{project['remaining']} left ({calls}), resets "
+                  f"{datetime.fromtimestamp(project['resets_at']):%Y-%m-%d %H:%M}")
+        return
+    
+    if args.worker:
+        automation = YouTubeAutomation()
+        store = JobStore.from_config(automation.config.get('jobs'))
+        run_worker(automation, store, stop_when_empty=not args.forever)
+        return
+    
+    if args.daemon:
+        run_scheduler(YouTubeAutomation())
+        return
+    
+    if args.batch:
+        topics = read_topics(args.batch)
+        if not topics:
+            print(f"❌ No topics found in {args.batch}")
+            return
+        automation = YouTubeAutomation()
+        if args.concurrency:
+            report = automation.run_many(topics, upload=args.upload,
+                                         concurrency=args.concurrency)
+        else:
+            report = automation.run_batch(topics, upload=args.upload)
+        if report['failed']:
+            exit(1)
+        return
+    
     print("""
     ╔═══════════════════════════════════════════════════════╗
     ║   FACELESS YOUTUBE VIDEO AUTOMATION (LOCAL)          ║
@@ -410,7 +1538,7 @@ def main():
     print("\nOptions:")
     print("1. Create video with specific topic")
     print("2. Create video with AI-suggested topic")
-    print("3. Run scheduled automation (coming soon)")
+    print("3. Run scheduled automation")
     
     choice = input("\nSelect option (1-3): ").strip()
     
@@ -420,7 +1548,7 @@ def main():
     elif choice == '2':
         automation.run_full_automation()
     elif choice == '3':
-        print("⏰ Scheduled automation will be available in the next version!")
+        run_scheduler(automation)
     else:
         print("Invalid choice!")
 
@@ -7,25 +7,56 @@ Handles authentication and uploading videos to YouTube
 import os
 import pickle
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from googleapiclient.errors import HttpError
+from instrumentation import METRICS, instrumented
+from quota_ledger import QuotaDeferred, QuotaLedger, is_quota_error, project_key
+from resumable_upload import DEFAULT_UPLOAD_SETTINGS, ResumableUploader, UploadError
 
 # YouTube API scopes
 SCOPES = ['https://www.googleapis.com/auth/youtube.upload']
 
-class YouTubeUploader:
-    def __init__(self, credentials_file='client_secrets.json'):
+# Refresh access tokens this long before they expire
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_REFRESH_RETRY = 60
+
+# One client per (credentials file, token file), shared by every thread
+_CLIENT_POOL = {}
+_CLIENT_POOL_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _discovery_document():
+    """Parsed YouTube v3 discovery document from the library's bundled copy"""
+    from googleapiclient.discovery_cache import get_static_doc
+    return json.loads(get_static_doc('youtube', 'v3'))
+
+
+class YouTubeClient:
+    """
+    Authenticated YouTube access for one channel. Credentials are loaded
+    once and refreshed in the background before they expire; API service
+    objects and HTTP sessions are built per thread (httplib2 is not
+    thread-safe) from the cached discovery document.
+    """
+
+    def __init__(self, credentials_file, token_file):
         self.credentials_file = credentials_file
-        self.token_file = 'token.pickle'
-        self.youtube = None
-        
+        self.token_file = token_file
+        self.credentials = None
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._refresh_timer = None
+
     def authenticate(self):
-        """Authenticate with YouTube API"""
+        """Load, refresh or obtain credentials; returns False if impossible"""
+        # The Google client libraries take ~0.5s to import, so they are only
+        # loaded once something actually talks to YouTube
+        from google.auth.transport.requests import Request
+
         creds = None
         
         # Token file stores the user's access and refresh tokens
@@ -48,19 +79,119 @@ class YouTubeUploader:
                     print("5. Download JSON and save as 'client_secrets.json'")
                     return False
                 
+                from google_auth_oauthlib.flow import InstalledAppFlow
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.credentials_file, SCOPES)
                 creds = flow.run_local_server(port=0)
             
             # Save credentials for next run
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
+            self._save_token(creds)
         
-        self.youtube = build('youtube', 'v3', credentials=creds)
+        self.credentials = creds
+        self._schedule_refresh()
         return True
+
+    def _save_token(self, creds):
+        tmp_path = f"{self.token_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as token:
+            pickle.dump(creds, token)
+        os.replace(tmp_path, self.token_file)
+
+    def _schedule_refresh(self, delay=None):
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        if not self.credentials.refresh_token:
+            return
+        if delay is None:
+            expiry = self.credentials.expiry
+            if not expiry:
+                return
+            # google-auth keeps expiry as naive UTC
+            delay = (expiry - datetime.utcnow()).total_seconds() - TOKEN_REFRESH_MARGIN
+        self._refresh_timer = threading.Timer(max(delay, 0), self._refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh(self):
+        from google.auth.transport.requests import Request
+
+        try:
+            with self.lock:
+                self.credentials.refresh(Request())
+                self._save_token(self.credentials)
+            self._schedule_refresh()
+        except Exception as e:
+            print(f"⚠️  YouTube token refresh failed, retrying: {e}")
+            self._schedule_refresh(TOKEN_REFRESH_RETRY)
+
+    def service(self):
+        """This thread's YouTube Data API service object"""
+        youtube = getattr(self._local, 'youtube', None)
+        if youtube is None:
+            import google_auth_httplib2
+            import httplib2
+            from googleapiclient.discovery import build_from_document
+
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            youtube = build_from_document(_discovery_document(), http=http)
+            self._local.youtube = youtube
+        return youtube
+
+    def session(self):
+        """This thread's authorized requests session (used for uploads)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            from google.auth.transport.requests import AuthorizedSession
+            session = AuthorizedSession(self.credentials)
+            self._local.session = session
+        return session
+
+
+def get_client(credentials_file='client_secrets.json', token_file='token.pickle'):
+    """
+    Return the process-wide client for a credentials/token pair,
+    authenticating on first use
+
+    Returns:
+        YouTubeClient, or None if authentication is not possible
+    """
+    key = (os.path.abspath(credentials_file), os.path.abspath(token_file))
+    with _CLIENT_POOL_LOCK:
+        client = _CLIENT_POOL.get(key)
+        if client is None:
+            client = YouTubeClient(credentials_file, token_file)
+            _CLIENT_POOL[key] = client
+    
+    # Per-client lock: threads for one channel wait for a single OAuth flow
+    with client.lock:
+        if client.credentials is None and not client.authenticate():
+            return None
+    return client
+
+
+class YouTubeUploader:
+    def __init__(self, credentials_file='client_secrets.json', token_file='token.pickle',
+                 upload_settings=None, quota_settings=None):
+        self.credentials_file = credentials_file
+        self.token_file = token_file
+        self.upload_settings = upload_settings
+        self.client = None
+        # Every API call is admitted through the shared quota ledger first
+        self.quota = QuotaLedger(quota_settings)
+        self.project = project_key(credentials_file)
     
+    @property
+    def youtube(self):
+        return self.client.service() if self.client else None
+        
+    def authenticate(self):
+        """Authenticate with YouTube API (shared across uploaders and threads)"""
+        self.client = get_client(self.credentials_file, self.token_file)
+        return self.client is not None
+    
+    @instrumented('youtube_upload')
     def upload_video(self, video_file, title, description, tags, category='22', 
-                    privacy='public', notify_subscribers=True):
+                    privacy='public', notify_subscribers=True, publish_at=None, priority=0):
         """
         Upload video to YouTube
         
@@ -72,9 +203,15 @@ class YouTubeUploader:
             category: YouTube category ID (22 = People & Blogs)
             privacy: 'public', 'private', or 'unlisted'
             notify_subscribers: Whether to notify subscribers
+            publish_at: Optional datetime; uploads as private and lets
+                YouTube publish it at that time
+            priority: Order among uploads waiting for API quota (higher first)
         
         Returns:
             Video ID if successful, None otherwise
+        
+        Raises:
+            QuotaDeferred if today's API quota can't fit the upload
         """
         if not self.youtube:
             if not self.authenticate():
@@ -94,64 +231,147 @@ class YouTubeUploader:
             'notifySubscribers': notify_subscribers
         }
         
-        # Create media upload object
-        media = MediaFileUpload(
-            video_file,
-            mimetype='video/*',
-            resumable=True,
-            chunksize=1024*1024  # 1MB chunks
-        )
+        if publish_at:
+            # Scheduled videos must be private until YouTube flips them public
+            body['status']['privacyStatus'] = 'private'
+            body['status']['publishAt'] = publish_at.astimezone().isoformat()
+        
+        reservation = self.quota.acquire(self.project, 'videos.insert', priority, label=title)
+        uploader = None
+        
+        def settle():
+            # Units are spent once the insert reaches the API, even if it is
+            # rejected; local failures and resumed sessions cost nothing
+            if uploader is not None and uploader.reached_api:
+                self.quota.commit(reservation)
+            else:
+                self.quota.refund(reservation)
         
         try:
             print(f"\n📤 Uploading video: {title}")
             print("This may take a few minutes...")
             
-            # Call the API's videos.insert method
-            request = self.youtube.videos().insert(
-                part=','.join(body.keys()),
-                body=body,
-                media_body=media
-            )
+            # Resumable upload: adaptive chunks, retries from the
+            # server-acknowledged offset, session persisted across restarts
+            uploader = ResumableUploader(self.client.session(), self.upload_settings)
             
-            response = None
-            while response is None:
-                status, response = request.next_chunk()
-                if status:
-                    progress = int(status.progress() * 100)
-                    print(f"Upload progress: {progress}%", end='\r')
+            def show_progress(done, total):
+                print(f"Upload progress: {done * 100 // max(total, 1)}%", end='\r')
             
+            response = uploader.upload(video_file, body, part=','.join(body.keys()),
+                                       progress=show_progress)
+            
+            settle()
+            METRICS.add(bytes_uploaded=os.path.getsize(video_file))
             video_id = response['id']
             video_url = f"https://www.youtube.com/watch?v={video_id}"
             
-            print(f"\n✅ Video uploaded successfully!")
+            print("\n✅ Video uploaded successfully!")
             print(f"🔗 Video URL: {video_url}")
             print(f"📊 Video ID: {video_id}")
             
             return video_id
             
-        except HttpError as e:
-            print(f"\n❌ An HTTP error occurred: {e}")
+        except UploadError as e:
+            if is_quota_error(e):
+                # Spent elsewhere (another tool, the web UI); stop trying today
+                self.quota.refund(reservation)
+                self.quota.mark_exhausted(self.project)
+                raise QuotaDeferred(self.project, 'videos.insert', self.quota.next_reset())
+            settle()
+            print(f"\n❌ Upload failed: {e}")
             return None
         except Exception as e:
+            settle()
             print(f"\n❌ An error occurred: {e}")
             return None
     
-    def update_thumbnail(self, video_id, thumbnail_file):
+    def update_thumbnail(self, video_id, thumbnail_file, priority=0):
         """Upload custom thumbnail for video"""
         if not self.youtube:
             if not self.authenticate():
                 return False
         
+        settings = dict(DEFAULT_UPLOAD_SETTINGS)
+        settings.update(self.upload_settings or {})
         try:
-            self.youtube.thumbnails().set(
-                videoId=video_id,
-                media_body=MediaFileUpload(thumbnail_file)
-            ).execute()
-            print(f"✅ Thumbnail updated for video {video_id}")
-            return True
-        except HttpError as e:
+            reservation = self.quota.acquire(self.project, 'thumbnails.set', priority,
+                                             label=video_id)
+        except QuotaDeferred as e:
+            print(f"⏳ Thumbnail not set: {e}")
+            return False
+        
+        try:
+            with open(thumbnail_file, 'rb') as f:
+                data = f.read()
+            content_type = 'image/png' if str(thumbnail_file).lower().endswith('.png') \
+                else 'image/jpeg'
+            response = self.client.session().post(
+                settings['thumbnail_url'],
+                params={'videoId': video_id, 'uploadType': 'media'},
+                data=data,
+                headers={'Content-Type': content_type},
+                timeout=settings['timeout'])
+        except Exception as e:
+            self.quota.refund(reservation)
             print(f"❌ Error updating thumbnail: {e}")
             return False
+        
+        if response.status_code == 200:
+            self.quota.commit(reservation)
+            print(f"✅ Thumbnail updated for video {video_id}")
+            return True
+        if response.status_code == 403 and is_quota_error(response.text):
+            self.quota.refund(reservation)
+            self.quota.mark_exhausted(self.project)
+        else:
+            self.quota.commit(reservation)
+        print(f"❌ Error updating thumbnail: {response.status_code} {response.text}")
+        return False
+
+
+def upload_many(uploads, upload_settings=None, quota_settings=None):
+    """
+    Upload several videos concurrently, e.g. one per channel
+
+    Args:
+        uploads: List of dicts with upload_video keyword arguments plus
+            optional 'credentials_file' and 'token_file' for the channel
+        upload_settings: The config "uploads" block
+        quota_settings: The config "quota" block
+
+    Returns:
+        List of video IDs (None for failures and uploads deferred for
+        quota), aligned with uploads
+    """
+    settings = dict(DEFAULT_UPLOAD_SETTINGS)
+    settings.update(upload_settings or {})
+    uploaders = {}
+    
+    # Authenticate up front, one uploader per channel, so interactive OAuth
+    # prompts never happen inside worker threads
+    for upload in uploads:
+        key = (upload.get('credentials_file', 'client_secrets.json'),
+               upload.get('token_file', 'token.pickle'))
+        if key not in uploaders:
+            uploader = YouTubeUploader(key[0], key[1], settings, quota_settings)
+            uploaders[key] = uploader if uploader.authenticate() else None
+    
+    def run(upload):
+        kwargs = dict(upload)
+        key = (kwargs.pop('credentials_file', 'client_secrets.json'),
+               kwargs.pop('token_file', 'token.pickle'))
+        uploader = uploaders[key]
+        if not uploader:
+            return None
+        try:
+            return uploader.upload_video(**kwargs)
+        except QuotaDeferred as e:
+            print(f"⏳ {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, int(settings['concurrency']))) as pool:
+        return list(pool.map(run, uploads))
 
 
 def setup_youtube_credentials():